@@ -0,0 +1 @@
+"""Benchmarks for the Python task manager apps, run with ``python -m benchmarks.<name>``."""
@@ -0,0 +1,355 @@
+"""Time process collection, filtering, sorting and table population on synthetic process tables.
+
+Runs headless: the Tk apps are driven under Xvfb (started here when there is
+no DISPLAY) and the PyQt app on Qt's offscreen platform. psutil is replaced
+by a seeded SyntheticProvider, so numbers are comparable between runs.
+
+Usage: python -m benchmarks.refresh [--sizes 1000 10000 50000] [--rounds 20]
+                                    [--json results.json] [--baseline old.json]
+"""
+import argparse
+import gc
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from monitor.anomaly import ProcessAnomalies
+from monitor.collector import Collector
+from monitor.process_history import ProcessHistory
+from monitor.process_tree import ProcessTree
+from monitor.rates import CounterRates, RateHistory, RateSample
+from monitor.rules import DEFAULT_RULES, RuleEngine
+from monitor.search_index import ProcessSearchIndex
+from monitor.snapshot_store import TOP_K, VIEW_MODES, row_keys
+from monitor.synthetic import SyntheticProvider
+
+
+class _FixedSampler:
+    """Stands in for ProcessSampler, handing the app whatever snapshot the benchmark sets."""
+
+    local = True
+    interval = None
+    busy = False
+    last_duration = 0.0
+    last_blocks = None
+
+    def __init__(self):
+        self.snapshot = None
+
+    def start(self):
+        return self
+
+    def refresh(self):
+        pass
+
+    def poll(self):
+        snapshot, self.snapshot = self.snapshot, None
+        return snapshot
+
+
+def _percentile(samples, q):
+    return float(np.percentile(samples, q)) * 1000 if samples else float("nan")
+
+
+class Bench:
+    def __init__(self, size, rounds):
+        self.size = size
+        self.rounds = rounds
+        self.provider = SyntheticProvider(size, churn=0.01, busy=0.1, seed=size)
+        self.collector = Collector(self.provider, self.provider.names)
+        self.results = {}
+
+    def snapshot(self):
+        return self.collector.sample()
+
+    def time_stage(self, name, setup, stage):
+        """Time ``stage(setup())`` over the rounds; memory is measured on one extra traced round."""
+        durations = []
+        for _ in range(self.rounds):
+            argument = setup()
+            gc.collect()
+            start = time.perf_counter()
+            stage(argument)
+            durations.append(time.perf_counter() - start)
+
+        argument = setup()
+        tracemalloc.start()
+        stage(argument)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        self.results[name] = {"p50_ms": _percentile(durations, 50), "p99_ms": _percentile(durations, 99),
+                              "peak_kb": peak / 1024}
+
+
+def bench_core(bench):
+    bench.time_stage("collect", lambda: None, lambda _: bench.snapshot())
+
+    index = ProcessSearchIndex()
+    index.update(bench.snapshot())
+    bench.time_stage("index update", bench.snapshot, index.update)
+
+    tree = ProcessTree()
+    tree.update(bench.snapshot())
+    bench.time_stage("tree update", bench.snapshot, tree.update)
+
+    history = ProcessHistory()
+    history.update(bench.snapshot())
+    bench.time_stage("history update", bench.snapshot, history.update)
+
+    # Per-process I/O counter deltas, as the collector computes them
+    provider = bench.provider
+    io_rates = CounterRates()
+
+    def io_counters():
+        provider.step()
+        return (row_keys(provider.pid, provider.create_time),
+                np.column_stack((provider.read_bytes, provider.write_bytes)), provider.timestamp)
+
+    io_rates.update(*io_counters())
+    bench.time_stage("io rates", io_counters, lambda arguments: io_rates.update(*arguments))
+
+    anomalies = ProcessAnomalies()
+    anomalies.update(bench.snapshot())
+    bench.time_stage("anomaly update", bench.snapshot, anomalies.update)
+
+    # A name rule, a cmdline rule and a threshold rule, as a rules file might combine them
+    rules = RuleEngine(rules=DEFAULT_RULES + [{"name": "miner", "match": {"cmdline": "*--pool*"}, "action": "notify"},
+                                              {"name": "hog", "cpu_above": 90, "for_seconds": 60, "tag": "hog"}],
+                       details=lambda pid: {"cmdline": "", "user": "", "exe": ""})
+    rules.evaluate(bench.snapshot())
+    bench.time_stage("rules", bench.snapshot, rules.evaluate)
+
+    snapshot = bench.snapshot()
+    index.update(snapshot)
+    bench.time_stage("filter", lambda: snapshot, lambda s: index.rows(s, "gcc"))
+    bench.time_stage("sort", lambda: snapshot, lambda s: s.order("cpu_percent", descending=True))
+    bench.time_stage("top 50", lambda: snapshot, lambda s: s.top_k("cpu_percent", 50))
+
+
+def bench_rates(bench, cores=128, disks=16, nics=8):
+    """Time the per-core, disk and NIC rate engine on a large box, independent of the process count."""
+    core_rates, disk_rates, nic_rates = CounterRates(wrap=0), CounterRates(), CounterRates()
+    history = RateHistory()
+    rng = np.random.default_rng(cores)
+    state = {"timestamp": 0.0, "cores": np.zeros((cores, 2)), "disks": np.zeros((disks, 2)),
+             "nics": np.zeros((nics, 2))}
+    disk_names = [f"nvme{i}n1" for i in range(disks)]
+    nic_names = [f"eth{i}" for i in range(nics)]
+
+    def counters():
+        state["timestamp"] += 1.0
+        state["cores"] += rng.uniform(0, 100, (cores, 2))
+        state["disks"] += rng.exponential(1e6, (disks, 2))
+        state["nics"] += rng.exponential(1e6, (nics, 2))
+        return state["timestamp"]
+
+    def sample(timestamp):
+        rates = core_rates.update(np.arange(cores), state["cores"], timestamp)
+        busy = 100.0 * rates[:, 1] / np.maximum(rates[:, 0], 1e-9)
+        history.append(RateSample(timestamp, busy,
+                                  disk_names, disk_rates.update(np.arange(disks), state["disks"], timestamp),
+                                  nic_names, nic_rates.update(np.arange(nics), state["nics"], timestamp)))
+        history.core_matrix()
+
+    sample(counters())
+    bench.time_stage(f"rates ({cores} cores)", counters, sample)
+
+
+def _clear(root):
+    for child in root.winfo_children():
+        child.destroy()
+
+
+def bench_tk(bench, root):
+    import task
+    import task_manager_gui
+
+    def flush():
+        root.update_idletasks()
+
+    sampler = _FixedSampler()
+    app = task_manager_gui.TaskManagerApp(root, sampler)
+    app.apply_snapshot(bench.snapshot())
+    flush()
+
+    def refresh(snapshot):
+        app.apply_snapshot(snapshot)
+        flush()
+
+    def search(query):
+        app.search_entry.delete(0, "end")
+        app.search_entry.insert(0, query)
+        app.filter_processes()
+        flush()
+
+    bench.time_stage("tk refresh_processes (task_manager_gui)", bench.snapshot, refresh)
+    bench.time_stage("tk filter_processes (task_manager_gui)", lambda: "gcc", search)
+    search("")
+    bench.time_stage("tk sort_treeview (task_manager_gui)", lambda: "CPU%",
+                     lambda column: (app.sort_treeview(column), flush()))
+    app.view_mode.set(list(VIEW_MODES)[1])
+    bench.time_stage(f"tk refresh top {TOP_K} (task_manager_gui)", bench.snapshot, refresh)
+    _clear(root)
+
+    app = task.TaskManagerApp(root, sampler)
+
+    def refresh_simple(snapshot):
+        app.snapshot = snapshot
+        app.apply_rules()
+        app.refresh_processes()
+        flush()
+
+    refresh_simple(bench.snapshot())
+    bench.time_stage("tk refresh_processes (task)", bench.snapshot, refresh_simple)
+    _clear(root)
+
+    try:
+        import task1
+    except ImportError as e:
+        print(f"  skipping task1.py: {e}")
+        return
+
+    app = task1.TaskManagerApp(root, sampler)
+    app.notebook.select(app.processes_tab)
+    app.on_tab_changed()  # Builds the process tab, as the first visit does
+
+    def update_processes(snapshot):
+        app.snapshot = snapshot
+        app.search_index.update(snapshot)
+        app.update_processes()
+        flush()
+
+    update_processes(bench.snapshot())
+    bench.time_stage("tk update_processes (task1)", bench.snapshot, update_processes)
+    _clear(root)
+
+
+def bench_qt(bench, application):
+    import task2
+
+    sampler = _FixedSampler()
+    window = task2.SystemMonitor(sampler)  # Never shown, so its scheduler stays idle
+    window.tabs.setCurrentWidget(window.process_tab)
+
+    def update_stats(snapshot):
+        sampler.snapshot = snapshot
+        window.update_stats()
+        application.processEvents()
+
+    update_stats(bench.snapshot())
+    bench.time_stage("qt update_stats (task2)", bench.snapshot, update_stats)
+    window.view_box.setCurrentIndex(1)
+    bench.time_stage(f"qt update_stats top {TOP_K} (task2)", bench.snapshot, update_stats)
+    window.close()
+    window.deleteLater()
+    application.processEvents()
+
+
+def _ensure_display():
+    """Start Xvfb when there is no display; return the process to stop, or None."""
+    if os.environ.get("DISPLAY"):
+        return None
+    if not shutil.which("Xvfb"):
+        return None
+    display = ":99"
+    process = subprocess.Popen(["Xvfb", display, "-screen", "0", "1280x1024x24"],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    time.sleep(1.0)
+    os.environ["DISPLAY"] = display
+    return process
+
+
+def _tk_root():
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception as e:
+        print(f"  skipping Tk benchmarks: {e}")
+        return None
+    root.withdraw()
+    return root
+
+
+def _qt_application():
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from PyQt5.QtWidgets import QApplication
+    except ImportError as e:
+        print(f"  skipping Qt benchmarks: {e}")
+        return None
+    return QApplication.instance() or QApplication(sys.argv[:1])
+
+
+def compare(results, baseline, tolerance):
+    """Return the (size, stage, old p50, new p50) entries that regressed by more than ``tolerance``."""
+    regressions = []
+    for size, stages in results.items():
+        for stage, numbers in stages.items():
+            old = baseline.get(size, {}).get(stage)
+            if old and numbers["p50_ms"] > old["p50_ms"] * (1 + tolerance):
+                regressions.append((size, stage, old["p50_ms"], numbers["p50_ms"]))
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the process table refresh paths.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000],
+                        help="synthetic process counts (default: 1000 10000 50000)")
+    parser.add_argument("--rounds", type=int, default=20, help="timed rounds per stage (default: 20)")
+    parser.add_argument("--no-gui", action="store_true", help="only time collection, filtering and sorting")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare p50 against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed p50 slowdown against the baseline (default: 0.25)")
+    return parser.parse_args(argv)
+
+
+def main(args):
+    xvfb = None if args.no_gui else _ensure_display()
+    root = None if args.no_gui else _tk_root()
+    application = None if args.no_gui else _qt_application()
+
+    results = {}
+    try:
+        for size in args.sizes:
+            print(f"{size} processes")
+            bench = Bench(size, args.rounds)
+            bench_core(bench)
+            bench_rates(bench)
+            if root is not None:
+                bench_tk(bench, root)
+            if application is not None:
+                bench_qt(bench, application)
+            results[str(size)] = bench.results
+            for stage, numbers in bench.results.items():
+                print(f"  {stage:<42} p50 {numbers['p50_ms']:9.2f} ms   p99 {numbers['p99_ms']:9.2f} ms   "
+                      f"peak {numbers['peak_kb']:10.0f} KB")
+    finally:
+        if root is not None:
+            root.destroy()
+        if xvfb is not None:
+            xvfb.terminate()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for size, stage, old, new in regressions:
+            print(f"REGRESSION {size} processes, {stage}: p50 {old:.2f} ms -> {new:.2f} ms")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
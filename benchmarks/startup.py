@@ -0,0 +1,189 @@
+"""Time how long each app takes to start: imports, construction, first frame and graphs.
+
+Every run starts a fresh interpreter, so Python's imports are cold (the OS file
+cache stays warm). The child reports, in ms since it started importing:
+"import" (the app module with its GUI toolkit), "toolkit" (Tk root or
+QApplication), "construct" (the app object), "first frame" (the window's
+first paint has been flushed) and, for apps with deferred graphs, "graphs"
+(the plotting library is loaded and the graphs are drawn). "launch" is the
+wall time from starting the interpreter to the first frame. Like
+benchmarks.refresh it runs headless and can fail on regressions.
+
+Usage: python -m benchmarks.startup [--apps task task_manager_gui task1 task2] [--runs 5]
+                                    [--json startup.json] [--baseline old.json]
+"""
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+APPS = ("task", "task_manager_gui", "task1", "task2")
+TIMEOUT = 30.0  # Seconds a child gets to show its first frame and graphs
+
+
+def _elapsed(start):
+    return (time.perf_counter() - start) * 1000
+
+
+def _child_tk(name, start):
+    timings = {}
+    module = importlib.import_module(name)
+    timings["import"] = _elapsed(start)
+    import tkinter as tk
+    root = module.ctk.CTk() if hasattr(module, "ctk") else tk.Tk()
+    timings["toolkit"] = _elapsed(start)
+    app = module.TaskManagerApp(root)
+    timings["construct"] = _elapsed(start)
+
+    def first_frame():
+        timings.setdefault("first frame", _elapsed(start))
+        timings.setdefault("first frame time", time.time())
+
+    def exposed(event):
+        # After idle, then after 0: runs once the redraws the expose queued are done
+        root.after_idle(root.after, 0, first_frame)
+
+    root.bind("<Expose>", exposed, add="+")
+
+    def check():
+        if "graphs" not in timings and getattr(app, "graphs_loaded", False):
+            timings["graphs"] = _elapsed(start)
+        loaded = "graphs" in timings or not hasattr(app, "graphs_loaded")
+        if ("first frame" in timings and loaded) or _elapsed(start) > TIMEOUT * 1000:
+            root.quit()
+        else:
+            root.after(5, check)
+
+    check()
+    root.mainloop()
+    root.destroy()
+    return timings
+
+
+def _child_qt(name, start):
+    timings = {}
+    module = importlib.import_module(name)
+    timings["import"] = _elapsed(start)
+    from PyQt5.QtCore import QEvent, QObject, QTimer
+    from PyQt5.QtWidgets import QApplication
+    application = QApplication(sys.argv[:1])
+    timings["toolkit"] = _elapsed(start)
+    window = module.SystemMonitor()
+    timings["construct"] = _elapsed(start)
+
+    def first_frame():
+        timings.setdefault("first frame", _elapsed(start))
+        timings.setdefault("first frame time", time.time())
+
+    class PaintWatcher(QObject):
+        def eventFilter(self, watched, event):
+            if event.type() == QEvent.Paint:
+                QTimer.singleShot(0, first_frame)  # After the backing store is flushed
+            return False
+
+    watcher = PaintWatcher()
+    window.installEventFilter(watcher)
+    window.show()
+
+    def check():
+        if "graphs" not in timings and window.graphs_loaded:
+            timings["graphs"] = _elapsed(start)
+        if ("first frame" in timings and "graphs" in timings) or _elapsed(start) > TIMEOUT * 1000:
+            application.quit()
+        else:
+            QTimer.singleShot(5, check)
+
+    check()
+    application.exec_()
+    return timings
+
+
+def run_child(name):
+    """Start app ``name`` in this interpreter and print its timings as JSON."""
+    start = time.perf_counter()
+    timings = _child_qt(name, start) if name == "task2" else _child_tk(name, start)
+    print(json.dumps(timings))
+    sys.stdout.flush()
+    os._exit(0)  # The sampler and toolkit threads have nothing left to clean up
+
+
+def measure(name):
+    """Start app ``name`` in a fresh interpreter; return its timings in ms."""
+    launched = time.time()
+    result = subprocess.run([sys.executable, "-m", "benchmarks.startup", "--child", name],
+                            capture_output=True, text=True, timeout=TIMEOUT * 2)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        error = (result.stderr.strip().splitlines() or ["no output"])[-1]
+        raise RuntimeError(error)
+    timings = json.loads(lines[-1])
+    if "first frame" not in timings:
+        raise RuntimeError("no frame was painted")
+    timings["launch"] = (timings.pop("first frame time") - launched) * 1000
+    return timings
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark how fast each app shows its first frame.")
+    parser.add_argument("--apps", nargs="+", choices=APPS, default=list(APPS), help="apps to start (default: all)")
+    parser.add_argument("--runs", type=int, default=5, help="fresh starts per app (default: 5)")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare p50 against results saved with --json")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed p50 slowdown against the baseline (default: 0.25)")
+    parser.add_argument("--child", choices=APPS, help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def main(args):
+    # Imported here so the children, which run this module too, start with nothing but the stdlib loaded
+    from benchmarks.refresh import _ensure_display, compare
+
+    xvfb = _ensure_display()
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    results = {}
+    try:
+        for name in args.apps:
+            print(name)
+            runs = []
+            try:
+                for _ in range(args.runs):
+                    runs.append(measure(name))
+            except (RuntimeError, subprocess.TimeoutExpired) as e:
+                print(f"  skipping {name}: {e}")
+                continue
+            stages = {}
+            for stage in ("import", "toolkit", "construct", "first frame", "graphs", "launch"):
+                samples = [run[stage] for run in runs if stage in run]
+                if samples:
+                    stages[stage] = {"p50_ms": statistics.median(samples), "max_ms": max(samples)}
+                    print(f"  {stage:<12} p50 {stages[stage]['p50_ms']:9.1f} ms   max {stages[stage]['max_ms']:9.1f} ms")
+            results[name] = stages
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for name, stage, old, new in regressions:
+            print(f"REGRESSION {name}, {stage}: p50 {old:.1f} ms -> {new:.1f} ms")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    if args.child:
+        run_child(args.child)
+    sys.exit(main(args))
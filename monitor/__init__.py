@@ -0,0 +1 @@
+"""Shared collection and data helpers for the Python task manager apps."""
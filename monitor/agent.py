@@ -0,0 +1,153 @@
+"""Stream snapshots of this machine to remote viewers.
+
+Usage: python -m monitor.agent --interval 1
+       python -m monitor.agent --listen 0.0.0.0:7070
+       python -m monitor.agent --listen unix:/run/monitor.sock
+
+Viewers are not authenticated and see every process, so the agent only
+listens on loopback unless another address is given.
+"""
+import argparse
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+
+from monitor.collector import BACKENDS, Collector
+from monitor.remote import DeltaEncoder, format_address, hello_frame, parse_address
+
+
+class _Viewer:
+    def __init__(self, sock, queue_size, hello):
+        self.sock = sock
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.hello = hello
+        self.needs_keyframe = True
+        self.closed = False
+
+    def send_loop(self):
+        try:
+            self.sock.sendall(self.hello)
+            while True:
+                frame = self.queue.get()
+                if frame is None:
+                    break
+                self.sock.sendall(frame)
+        except OSError:
+            pass
+        finally:
+            self.closed = True
+            self.sock.close()
+
+
+class Agent:
+    """Sample this machine and stream delta-encoded snapshots to every connected viewer.
+
+    Each tick is encoded once and the same bytes go to all viewers, so the
+    cost per viewer does not depend on how many processes changed. A viewer
+    that falls more than ``queue_size`` frames behind has its backlog
+    dropped and is resynchronised with a keyframe.
+    """
+
+    def __init__(self, address, collector=None, interval=1.0, queue_size=4):
+        self.interval = interval
+        self.queue_size = queue_size
+        self.collector = collector or Collector()
+        self.encoder = DeltaEncoder()
+        self._viewers = []
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        family, bind_address = parse_address(address)
+        if family == socket.AF_UNIX and os.path.exists(bind_address):
+            os.remove(bind_address)  # Left over from a previous run
+        self._server = socket.socket(family, socket.SOCK_STREAM)
+        if family == socket.AF_INET:
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._server.bind(bind_address)
+        self._server.listen()
+        self.address = format_address(family, self._server.getsockname())
+
+    @property
+    def viewer_count(self):
+        with self._lock:
+            return len(self._viewers)
+
+    def serve_forever(self):
+        """Accept viewers and stream to them until ``stop()`` is called."""
+        threading.Thread(target=self._accept_loop, name="agent-accept", daemon=True).start()
+        next_tick = time.monotonic()
+        while not self._stopped.is_set():
+            self.broadcast(self.collector.sample())
+            next_tick += self.interval
+            self._stopped.wait(max(0.0, next_tick - time.monotonic()))
+
+    def broadcast(self, snapshot):
+        """Encode ``snapshot`` once and queue it for every viewer."""
+        delta = self.encoder.encode(snapshot)
+        keyframe = None
+        with self._lock:
+            self._viewers = [viewer for viewer in self._viewers if not viewer.closed]
+            viewers = list(self._viewers)
+
+        for viewer in viewers:
+            if not viewer.needs_keyframe:
+                try:
+                    viewer.queue.put_nowait(delta)
+                    continue
+                except queue.Full:
+                    self._drain(viewer)
+            if keyframe is None:
+                keyframe = self.encoder.keyframe()
+            viewer.queue.put_nowait(keyframe)
+            viewer.needs_keyframe = False
+
+    def stop(self):
+        self._stopped.set()
+        self._server.close()
+        with self._lock:
+            for viewer in self._viewers:
+                self._drain(viewer)
+                viewer.queue.put_nowait(None)
+
+    def _accept_loop(self):
+        while not self._stopped.is_set():
+            try:
+                sock, _ = self._server.accept()
+            except OSError:
+                return
+            viewer = _Viewer(sock, self.queue_size, hello_frame(self.interval))
+            threading.Thread(target=viewer.send_loop, name="agent-viewer", daemon=True).start()
+            with self._lock:
+                self._viewers.append(viewer)
+
+    @staticmethod
+    def _drain(viewer):
+        while True:
+            try:
+                viewer.queue.get_nowait()
+            except queue.Empty:
+                return
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Stream snapshots of this machine to remote viewers.")
+    parser.add_argument("--listen", default="127.0.0.1:7070",
+                        help="host:port or unix:/path to listen on (default: 127.0.0.1:7070, this machine only; "
+                             "0.0.0.0:7070 serves every network, without authentication)")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between samples (default: 1)")
+    parser.add_argument("--backend", choices=BACKENDS, help="process collection backend (default: psutil)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    agent = Agent(args.listen, Collector(args.backend), args.interval)
+    print(f"Streaming to viewers on {agent.address}")
+    try:
+        agent.serve_forever()
+    except KeyboardInterrupt:
+        agent.stop()
+    sys.exit(0)
@@ -0,0 +1,284 @@
+"""Fleet view: follow many monitor.agent hosts from one asyncio process.
+
+Usage: python -m monitor.aggregator host1:7070 host2:7070 ...
+       python -m monitor.aggregator --hosts-file hosts.txt
+       python -m monitor.aggregator --simulate 500
+"""
+import argparse
+import asyncio
+import multiprocessing
+import socket
+import sys
+import time
+
+import numpy as np
+
+from monitor.remote import (FRAME_HEADER, DeltaDecoder, DeltaEncoder, ProtocolError, check_length, hello_frame,
+                            parse_address)
+from monitor.synthetic import SyntheticProvider
+
+
+class HostState:
+    """What the aggregator knows about one host."""
+
+    def __init__(self, address):
+        self.address = address
+        self.connected = False
+        self.snapshot = None
+        self.last_frame = None  # time.monotonic() of the last frame
+        self.interval = 0.0  # The agent's sampling interval, from its hello frame
+        self.frames = 0
+        self.bytes = 0
+        self.reconnects = 0
+        self.error = None
+        self.cpu_percent = 0.0
+        self.memory_percent = 0.0
+        self.process_count = 0
+        self.top_process = ""
+        self.top_cpu = 0.0
+
+    def update(self, snapshot, size):
+        """Record a newly decoded snapshot."""
+        self.snapshot = snapshot
+        self.last_frame = time.monotonic()
+        self.frames += 1
+        self.bytes += size
+        self.cpu_percent = snapshot.cpu_percent
+        self.memory_percent = snapshot.memory_percent
+        self.process_count = len(snapshot)
+        if len(snapshot):
+            top = int(np.argmax(snapshot.cpu))
+            self.top_process = snapshot.name(top)
+            self.top_cpu = float(snapshot.cpu[top])
+
+    def age(self, now=None):
+        """Seconds since the last frame, or None if none arrived yet."""
+        if self.last_frame is None:
+            return None
+        return (now or time.monotonic()) - self.last_frame
+
+    def status(self, stale_after, now=None):
+        """Return "down", "stale" or "ok"; a host is not stale before it has missed two of its own intervals."""
+        if not self.connected:
+            return "down"
+        age = self.age(now)
+        if age is None or age > max(stale_after, 2 * self.interval):
+            return "stale"
+        return "ok"
+
+
+async def _open_connection(address):
+    family, target = parse_address(address)
+    if family == socket.AF_UNIX:
+        return await asyncio.open_unix_connection(target)
+    return await asyncio.open_connection(*target)
+
+
+class Aggregator:
+    """Keep one lightweight asyncio connection per host and merge their snapshots into a fleet table.
+
+    Each host is followed by its own coroutine that reads, decodes and
+    stores only the latest snapshot, so nothing queues up inside the
+    aggregator. A slow or silent host only ever delays its own coroutine:
+    reads time out after ``timeout`` seconds plus two of the agent's
+    sampling intervals and the host is reconnected, as it is after a
+    corrupt frame or one of another protocol version, and if the aggregator
+    itself cannot keep up, TCP flow control pushes back on the agent, which
+    drops its backlog and resynchronises with a keyframe. A host whose last
+    frame is older than ``stale_after`` seconds (or two of its intervals)
+    is reported as stale.
+    """
+
+    def __init__(self, addresses, stale_after=3.0, timeout=10.0, retry_delay=2.0):
+        self.hosts = {address: HostState(address) for address in addresses}
+        self.stale_after = stale_after
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self._tasks = []
+
+    async def run(self):
+        """Follow every host until cancelled."""
+        self._tasks = [asyncio.create_task(self._follow(host)) for host in self.hosts.values()]
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            for task in self._tasks:
+                task.cancel()
+
+    def fleet_table(self, now=None):
+        """Return one row per host, busiest first.
+
+        Rows are (address, status, age in seconds or None, CPU %, memory %,
+        process count, top process name, top process CPU %).
+        """
+        now = now or time.monotonic()
+        rows = [(host.address, host.status(self.stale_after, now), host.age(now), host.cpu_percent,
+                 host.memory_percent, host.process_count, host.top_process, host.top_cpu)
+                for host in self.hosts.values()]
+        rows.sort(key=lambda row: row[3], reverse=True)
+        return rows
+
+    def status_counts(self, now=None):
+        """Return a dict of host counts per status."""
+        counts = {"ok": 0, "stale": 0, "down": 0}
+        for host in self.hosts.values():
+            counts[host.status(self.stale_after, now)] += 1
+        return counts
+
+    async def _follow(self, host):
+        while True:
+            try:
+                reader, writer = await asyncio.wait_for(_open_connection(host.address), self.timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                host.error = str(e) or type(e).__name__
+                await asyncio.sleep(self.retry_delay)
+                continue
+
+            host.connected = True
+            host.error = None
+            decoder = DeltaDecoder()
+            try:
+                while True:
+                    timeout = self.timeout + 2 * decoder.interval
+                    header = await asyncio.wait_for(reader.readexactly(FRAME_HEADER.size), timeout)
+                    length, frame_type = FRAME_HEADER.unpack(header)
+                    check_length(length)
+                    body = await asyncio.wait_for(reader.readexactly(length), timeout)
+                    snapshot = decoder.apply(frame_type, body)
+                    host.interval = decoder.interval
+                    if snapshot is not None:
+                        host.update(snapshot, len(header) + length)
+            except (ProtocolError, OSError, asyncio.IncompleteReadError, asyncio.TimeoutError) as e:
+                # Only this host is affected; a bad frame must not end the gather() following every other host
+                host.error = str(e) or type(e).__name__
+            finally:
+                host.connected = False
+                host.reconnects += 1
+                writer.close()
+            await asyncio.sleep(self.retry_delay)
+
+
+class SimulatedHost:
+    """An in-process stand-in for monitor.agent that streams a synthetic process table."""
+
+    def __init__(self, seed, processes=200, interval=1.0, max_buffer=1024 * 1024):
+        self.provider = SyntheticProvider(processes, seed=seed)
+        self.encoder = DeltaEncoder()
+        self.interval = interval
+        self.max_buffer = max_buffer
+        self.address = None
+        self._writers = []
+        self._server = None
+
+    async def start(self, host="127.0.0.1"):
+        self._server = await asyncio.start_server(self._on_connect, host, 0)
+        self.address = "%s:%d" % self._server.sockets[0].getsockname()[:2]
+        self.encoder.encode(self.provider.sample())
+        asyncio.create_task(self._tick())
+        return self.address
+
+    async def _on_connect(self, reader, writer):
+        writer.write(hello_frame(self.interval))
+        writer.write(self.encoder.keyframe())
+        self._writers.append(writer)
+
+    async def _tick(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            frame = self.encoder.encode(self.provider.sample())
+            for writer in list(self._writers):
+                if writer.is_closing():
+                    self._writers.remove(writer)
+                elif writer.transport.get_write_buffer_size() > self.max_buffer:
+                    # The viewer is not keeping up: drop it, as the real agent does with its backlog
+                    self._writers.remove(writer)
+                    writer.close()
+                else:
+                    writer.write(frame)
+
+
+async def start_simulated_hosts(count, processes=200, interval=1.0):
+    """Start ``count`` simulated hosts on localhost and return their addresses."""
+    hosts = [SimulatedHost(seed, processes, interval) for seed in range(count)]
+    return [await host.start() for host in hosts]
+
+
+def _simulation_process(count, processes, interval, connection):
+    async def main():
+        connection.send(await start_simulated_hosts(count, processes, interval))
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def spawn_simulated_hosts(count, processes=200, interval=1.0):
+    """Run simulated hosts in a child process, so they do not share the aggregator's core.
+
+    Returns (process, addresses).
+    """
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(target=_simulation_process, args=(count, processes, interval, child),
+                                      daemon=True)
+    process.start()
+    return process, parent.recv()
+
+
+async def _report(aggregator, every):
+    loop = asyncio.get_running_loop()
+    last_wall, last_cpu = time.monotonic(), time.process_time()
+    last_frames = 0
+    while True:
+        expected = loop.time() + every
+        await asyncio.sleep(every)
+        lag = loop.time() - expected
+        wall, cpu = time.monotonic(), time.process_time()
+        frames = sum(host.frames for host in aggregator.hosts.values())
+        counts = aggregator.status_counts()
+        print(f"hosts ok={counts['ok']} stale={counts['stale']} down={counts['down']}  "
+              f"frames/s={(frames - last_frames) / (wall - last_wall):.0f}  "
+              f"aggregator CPU={100 * (cpu - last_cpu) / (wall - last_wall):.0f}%  loop lag={lag * 1000:.0f} ms")
+        for row in aggregator.fleet_table()[:5]:
+            address, status, age, cpu_percent, memory_percent, count, top_name, top_cpu = row
+            print(f"  {address:<22} {status:<5} cpu={cpu_percent:5.1f}% mem={memory_percent:5.1f}% "
+                  f"procs={count:<6} top={top_name} ({top_cpu:.1f}%)")
+        last_wall, last_cpu, last_frames = wall, cpu, frames
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Follow many monitor.agent hosts and print a fleet table.")
+    parser.add_argument("addresses", nargs="*", help="host:port or unix:/path of each agent")
+    parser.add_argument("--hosts-file", help="file with one agent address per line")
+    parser.add_argument("--simulate", type=int, metavar="N", help="start N simulated hosts on localhost")
+    parser.add_argument("--processes", type=int, default=200, help="processes per simulated host (default: 200)")
+    parser.add_argument("--interval", type=float, default=1.0, help="simulated hosts' sampling interval")
+    parser.add_argument("--stale-after", type=float, default=3.0, help="seconds without a frame before a host is stale")
+    parser.add_argument("--report-every", type=float, default=5.0, help="seconds between fleet reports")
+    return parser.parse_args(argv)
+
+
+def main(args):
+    addresses = list(args.addresses)
+    if args.hosts_file:
+        with open(args.hosts_file) as f:
+            addresses.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    if args.simulate:
+        _, simulated = spawn_simulated_hosts(args.simulate, args.processes, args.interval)
+        addresses.extend(simulated)
+    if not addresses:
+        sys.exit("No hosts given")
+
+    aggregator = Aggregator(addresses, stale_after=args.stale_after)
+
+    async def run():
+        asyncio.create_task(_report(aggregator, args.report_every))
+        await aggregator.run()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args()))
@@ -0,0 +1,197 @@
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+
+from monitor.snapshot_store import row_keys
+
+SPIKE, SHIFT = 1, 2
+KINDS = {SPIKE: "spike", SHIFT: "shift up"}
+
+Anomaly = namedtuple("Anomaly", ["timestamp", "pid", "name", "series", "kind", "value", "baseline"])
+
+
+class StreamDetector:
+    """Streaming anomaly detection over a block of series, one NumPy pass per tick.
+
+    Every series keeps O(1) state: an EWMA baseline and variance, a sample
+    count and a one-sided CUSUM of upward deviations. Each tick scores the new values against
+    the baseline as a z-score (an exponentially weighted rolling z-score,
+    with the standard deviation floored at ``min_std`` so flat series do
+    not flag noise). A value more than ``z_threshold`` deviations above
+    the baseline is a spike; the CUSUM of the clipped z-scores catches
+    sustained rises such as leaks, which the baseline would otherwise
+    absorb, and restarts once it fires. Values come as (metrics x series)
+    arrays; ``take`` reorders the series as processes come and go.
+    """
+
+    def __init__(self, min_std, alpha=0.05, z_threshold=4.0, drift=0.5, threshold=8.0, warmup=10):
+        self.min_std = np.asarray(min_std, dtype=np.float64)[:, None]  # One floor per metric
+        self.alpha = alpha
+        self.z_threshold = z_threshold
+        self.drift = drift
+        self.threshold = threshold
+        self.warmup = warmup  # Samples a series needs before it can flag anything
+        # Baseline, variance and CUSUM rows per metric, then the sample count; one column per series
+        self._state = np.zeros((3 * len(self.min_std) + 1, 0))
+        self._split()
+
+    def __len__(self):
+        return self._state.shape[1]
+
+    def take(self, rows):
+        """Keep the series at ``rows``, in that order; a row of -1 starts a new series."""
+        new = rows < 0
+        if len(self):
+            self._state = self._state[:, np.where(new, 0, rows)]
+            if new.any():
+                self._state[:, new] = 0.0
+        else:
+            self._state = np.zeros((len(self._state), len(rows)))
+        self._split()
+
+    def _split(self):
+        # Each metric's state is a contiguous row of the block, so the math runs on plain views
+        metrics = len(self.min_std)
+        self.mean = self._state[:metrics]
+        self.var = self._state[metrics:2 * metrics]
+        self.cusum = self._state[2 * metrics:3 * metrics]
+        self.count = self._state[-1]
+
+    def update(self, values):
+        """Score ``values`` (metrics x series) and fold them in; return (z-scores, kinds).
+
+        Kinds are 0, SPIKE or SHIFT per value; the baseline the values were
+        scored against stays in ``baseline`` for reporting.
+        """
+        first = self.count == 0
+        if first.any():
+            self.mean[:, first] = values[:, first]  # A new series starts at its first value
+        self.baseline = self.mean.copy()
+        deviation = values - self.mean
+        z = deviation / np.maximum(np.sqrt(self.var), self.min_std)
+
+        # The state arrays are views into one block, so they are updated in place
+        ready = self.count >= self.warmup
+        np.maximum(0.0, self.cusum + np.minimum(z, self.z_threshold) - self.drift, out=self.cusum)
+        self.cusum *= ready
+        spike = (z > self.z_threshold) & ready
+        shift = (self.cusum > self.threshold) & ready
+        kinds = np.where(spike, np.int8(SPIKE), np.where(shift, np.int8(SHIFT), np.int8(0)))
+        np.copyto(self.cusum, 0.0, where=shift)
+
+        # Plain running mean and variance while warming up, so the baseline is settled once flags start
+        alpha = np.maximum(self.alpha, 1 / (self.count + 1))
+        increment = alpha * deviation
+        self.mean += increment
+        self.var += deviation * increment
+        self.var *= 1 - alpha
+        self.count += 1
+        return z, kinds
+
+
+class SystemAnomalies:
+    """Detector for the system-wide CPU% and memory% series."""
+
+    def __init__(self, **options):
+        self.detector = StreamDetector(min_std=(2.0, 0.5), **options)
+        self.detector.take(np.array([-1]))
+
+    def update(self, cpu, memory, timestamp=None):
+        """Fold in one system sample; return the anomalies it shows."""
+        if timestamp is None:
+            timestamp = time.time()
+        values = np.array([[cpu], [memory]], dtype=np.float64)
+        _, kinds = self.detector.update(values)
+        baseline = self.detector.baseline
+        return [Anomaly(timestamp, None, "System", series, KINDS[int(kinds[m, 0])], float(values[m, 0]),
+                        float(baseline[m, 0]))
+                for m, series in enumerate(("CPU", "Memory")) if kinds[m, 0]]
+
+
+class ProcessAnomalies:
+    """Detectors for the CPU% and memory of every process, updated in one vectorized pass per snapshot.
+
+    Series are keyed by (pid, create_time) through ``row_keys``: exited
+    processes drop out and new ones start warming up. Only the
+    ``max_per_update`` strongest anomalies of a snapshot are returned, so a
+    host-wide event does not flood the alerts.
+    """
+
+    def __init__(self, max_per_update=10, **options):
+        self.detector = StreamDetector(min_std=(5.0, 16.0), **options)
+        self.max_per_update = max_per_update
+        self._keys = np.zeros(0, dtype=np.int64)  # Keys of the tracked rows, and the order sorting them
+        self._key_order = np.zeros(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def update(self, snapshot):
+        """Fold in a snapshot; return its anomalies, strongest first."""
+        keys = row_keys(snapshot.pid, snapshot.create_time)
+        rows = np.full(len(keys), -1, dtype=np.int64)
+        if len(self._keys):
+            position = np.minimum(np.searchsorted(self._keys, keys, sorter=self._key_order), len(self._keys) - 1)
+            old_rows = self._key_order[position]
+            found = self._keys[old_rows] == keys
+            rows[found] = old_rows[found]
+        self.detector.take(rows)
+        self._keys, self._key_order = keys, np.argsort(keys, kind="stable")
+
+        values = np.stack((snapshot.cpu, snapshot.memory_mb)).astype(np.float64)
+        z, kinds = self.detector.update(values)
+        metrics, flagged = np.nonzero(kinds)
+        if len(flagged) > self.max_per_update:
+            strongest = np.argpartition(-z[metrics, flagged], self.max_per_update - 1)[:self.max_per_update]
+            metrics, flagged = metrics[strongest], flagged[strongest]
+        strongest_first = np.argsort(-z[metrics, flagged], kind="stable")
+
+        baseline = self.detector.baseline
+        anomalies = []
+        for m, i in zip(metrics[strongest_first].tolist(), flagged[strongest_first].tolist()):
+            anomalies.append(Anomaly(snapshot.timestamp, int(snapshot.pid[i]), snapshot.name(i),
+                                     ("CPU", "Memory")[m], KINDS[int(kinds[m, i])], float(values[m, i]),
+                                     float(baseline[m, i])))
+        return anomalies
+
+
+class AlertLog:
+    """The most recent anomalies, newest last, with the system ones kept for graph markers."""
+
+    def __init__(self, maxlen=500):
+        self.alerts = deque(maxlen=maxlen)
+        self.system = {"CPU": deque(maxlen=maxlen), "Memory": deque(maxlen=maxlen)}  # (time, value) per series
+
+    def __len__(self):
+        return len(self.alerts)
+
+    def extend(self, anomalies):
+        for anomaly in anomalies:
+            self.alerts.append(anomaly)
+            if anomaly.pid is None:
+                self.system[anomaly.series].append((anomaly.timestamp, anomaly.value))
+
+    def clear(self):
+        """Forget every alert, so the graphs drop their markers too."""
+        self.alerts.clear()
+        for points in self.system.values():
+            points.clear()
+
+    def markers(self, series, start):
+        """Return (times, values) arrays of the system anomalies of ``series`` since ``start``."""
+        points = [point for point in self.system[series] if point[0] >= start]
+        if not points:
+            return np.zeros(0), np.zeros(0)
+        times, values = zip(*points)
+        return np.array(times), np.array(values)
+
+
+def format_alert(anomaly):
+    """Return the (time, source, series, kind, value, baseline) cells of an alerts panel row."""
+    if anomaly.pid is None:
+        source, unit = anomaly.name, "%"
+    else:
+        source, unit = f"{anomaly.name} ({anomaly.pid})", "%" if anomaly.series == "CPU" else " MB"
+    return (time.strftime("%H:%M:%S", time.localtime(anomaly.timestamp)), source, anomaly.series, anomaly.kind,
+            f"{anomaly.value:.1f}{unit}", f"{anomaly.baseline:.1f}{unit}")
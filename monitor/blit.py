@@ -0,0 +1,67 @@
+import time
+from collections import deque
+
+
+class BlitRenderer:
+    """Redraw only a figure's moving artists over a cached background.
+
+    A full ``canvas.draw()`` re-renders axes, grids, titles and ticks. Here
+    that happens only when the cached background is invalid (first frame,
+    resize, theme or axis-limit change); every other frame restores the
+    background and draws just the animated artists. Frame times are
+    recorded, and when rendering takes more than ``max_duty`` of the wall
+    clock, frames are skipped until it catches up: the latest data is drawn
+    by the next frame that runs.
+    """
+
+    def __init__(self, canvas, artists, max_duty=0.1):
+        self.canvas = canvas
+        self.artists = list(artists)
+        self.max_duty = max_duty
+        self.frame_times = deque(maxlen=120)
+        self.skipped = 0
+        self._background = None
+        self._next_frame = 0.0
+        for artist in self.artists:
+            artist.set_animated(True)
+        # Fires after every full draw, including the ones Tk triggers on resize
+        canvas.mpl_connect("draw_event", self._on_draw)
+
+    def invalidate(self):
+        """Force a full redraw on the next frame, e.g. after a theme or limit change."""
+        self._background = None
+
+    def render(self):
+        """Draw a frame; return False if it was skipped because rendering is behind."""
+        start = time.perf_counter()
+        if start < self._next_frame:
+            self.skipped += 1
+            return False
+
+        if self._background is None:
+            self.canvas.draw()
+        else:
+            self.canvas.restore_region(self._background)
+            self._draw_artists()
+            self.canvas.blit(self.canvas.figure.bbox)
+
+        end = time.perf_counter()
+        elapsed = end - start
+        self.frame_times.append(elapsed)
+        # Keep rendering under max_duty of the time: a slow frame delays the next one
+        self._next_frame = end + elapsed * (1 / self.max_duty - 1)
+        return True
+
+    def last_frame_ms(self):
+        """Return the duration of the last rendered frame in milliseconds."""
+        return self.frame_times[-1] * 1000 if self.frame_times else 0.0
+
+    def _on_draw(self, event):
+        canvas = self.canvas
+        self._background = canvas.copy_from_bbox(canvas.figure.bbox)
+        self._draw_artists()
+
+    def _draw_artists(self):
+        figure = self.canvas.figure
+        for artist in self.artists:
+            figure.draw_artist(artist)
@@ -0,0 +1,204 @@
+import os
+import time
+
+import numpy as np
+
+from monitor.rates import CounterRates
+from monitor.snapshot_store import row_keys
+
+UNKNOWN = "?"  # Group of processes whose cgroup could not be read
+
+
+def find_cgroup_root(root="/sys/fs/cgroup"):
+    """Return where the cgroup v2 hierarchy is mounted: ``root``, or its "unified" part on hybrid v1/v2 hosts."""
+    unified = os.path.join(root, "unified")
+    if not os.path.exists(os.path.join(root, "cgroup.controllers")) and os.path.isdir(unified):
+        return unified
+    return root
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def read_cgroup(proc_root, pid):
+    """Return the cgroup v2 path of a process (e.g. "/system.slice/sshd.service"), or UNKNOWN."""
+    try:
+        data = _read(f"{proc_root}/{pid}/cgroup")
+    except OSError:
+        return UNKNOWN
+    for line in data.splitlines():
+        # v2 has a single "0::/path" line; hybrid hosts list the v1 controllers as well
+        if line.startswith(b"0::"):
+            return line[3:].decode("utf-8", "replace") or "/"
+    return UNKNOWN
+
+
+class CgroupTree:
+    """Processes grouped by cgroup v2, with per-group totals, shaped like a ProcessTree for display.
+
+    The groups are the roots and their member processes the children, so
+    a ProcessTreeSync shows it with the same lazy drill-down. Groups are
+    keyed by negative ids and processes by ``row_keys``. A process's cgroup
+    is read from ``/proc/[pid]/cgroup`` once, when it first appears, and
+    cached under its (pid, create_time) key; ``update`` matches snapshots
+    with NumPy, so only new, exited and changed processes reach Python.
+
+    A group's CPU% and memory come from its own ``cpu.stat`` (usage_usec,
+    as a rate) and ``memory.current`` under ``cgroup_root``, which also
+    count exited members and kernel memory; where those cannot be read
+    (cgroup v1, the root group) the members' values are summed. Both roots
+    can point at a fake directory tree for testing.
+    """
+
+    def __init__(self, proc_root="/proc", cgroup_root=None):
+        self.proc_root = proc_root
+        self.cgroup_root = cgroup_root if cgroup_root is not None else find_cgroup_root()
+        self.snapshot = None
+        self.generation = 0  # Number of updates applied
+        self.paths = []  # Group id -> cgroup path
+        self._group_ids = {}  # Cgroup path -> group id
+        self._members = {}  # Group id -> keys of its live processes
+        self._totals = {}  # Group id -> (CPU%, memory MB, from the kernel's files)
+        self._cpu_usage = CounterRates(wrap=0)  # usage_usec never wraps
+        self._cpu_groups = np.zeros(0, dtype=np.int64)  # Groups whose usage was read last time
+        self._keys = np.zeros(0, dtype=np.int64)  # Keys of the snapshot rows, and the order sorting them
+        self._key_order = np.zeros(0, dtype=np.int64)
+        self._group = np.zeros(0, dtype=np.int64)  # Group id of each row
+        self._shown = np.zeros((0, 4), dtype=np.int64)  # CPU% x10, memory KB and read and write KB/s x10 of each row
+        # What the last update changed
+        self.removed = set()
+        self.added = set()
+        self.moved = set()  # Always empty: a process's cgroup is only read once
+        self.changed = set()
+
+    def __len__(self):
+        return len(self._members)
+
+    @staticmethod
+    def group_key(group_id):
+        return -1 - group_id
+
+    @staticmethod
+    def is_group(key):
+        return key < 0
+
+    def roots(self):
+        return [self.group_key(group_id) for group_id in self._members]
+
+    def parent(self, key):
+        if self.is_group(key):
+            return None
+        return self.group_key(int(self._group[self.row(key)]))
+
+    def children(self, key):
+        return list(self._members.get(-1 - key, ())) if self.is_group(key) else []
+
+    def has_children(self, key):
+        return self.is_group(key) and bool(self._members.get(-1 - key))
+
+    def path(self, key):
+        """Return the cgroup path of a group key."""
+        return self.paths[-1 - key]
+
+    def totals(self, key):
+        """Return a group's (CPU%, memory MB, number of processes)."""
+        group_id = -1 - key
+        cpu, memory = self._totals[group_id]
+        return cpu, memory, len(self._members[group_id])
+
+    def row(self, key):
+        """Return the row of process ``key`` in the current snapshot."""
+        return int(self._key_order[np.searchsorted(self._keys, key, sorter=self._key_order)])
+
+    def _intern(self, path):
+        group_id = self._group_ids.get(path)
+        if group_id is None:
+            group_id = self._group_ids[path] = len(self.paths)
+            self.paths.append(path)
+        return group_id
+
+    def update(self, snapshot):
+        """Apply the differences between the previous snapshot and ``snapshot``."""
+        keys = row_keys(snapshot.pid, snapshot.create_time)
+        key_order = np.argsort(keys, kind="stable")
+        shown = np.column_stack((np.rint(snapshot.cpu * 10), np.rint(snapshot.memory_mb * 1024),
+                                 np.rint(snapshot.read_bps / 102.4),
+                                 np.rint(snapshot.write_bps / 102.4))).astype(np.int64)
+
+        old_keys, old_order = self._keys, self._key_order
+        if len(old_keys):
+            position = np.minimum(np.searchsorted(old_keys, keys, sorter=old_order), len(old_keys) - 1)
+            old_rows = old_order[position]
+            found = old_keys[old_rows] == keys
+        else:
+            old_rows = np.zeros(len(keys), dtype=np.int64)
+            found = np.zeros(len(keys), dtype=bool)
+        gone = np.ones(len(old_keys), dtype=bool)
+        gone[old_rows[found]] = False
+        group = np.empty(len(keys), dtype=np.int64)
+        group[found] = self._group[old_rows[found]]
+        kept = np.flatnonzero(found)
+        value_changed = kept[(self._shown[old_rows[kept]] != shown[kept]).any(axis=1)]
+
+        self.removed, self.added, self.changed = set(), set(), set()
+        members = self._members
+        emptied = set()
+        for key, group_id in zip(old_keys[gone].tolist(), self._group[gone].tolist()):
+            members[group_id].discard(key)
+            self.removed.add(key)
+            emptied.add(group_id)
+        for i in np.flatnonzero(~found).tolist():
+            group_id = group[i] = self._intern(read_cgroup(self.proc_root, int(snapshot.pid[i])))
+            key = int(keys[i])
+            if group_id not in members:
+                members[group_id] = set()
+                self.added.add(self.group_key(group_id))
+            members[group_id].add(key)
+            self.added.add(key)
+        self.changed.update(keys[value_changed].tolist())
+        for group_id in emptied:
+            if members[group_id]:
+                continue
+            del members[group_id]
+            self._totals.pop(group_id, None)
+            self.removed.add(self.group_key(group_id))
+
+        self.snapshot = snapshot
+        self.generation += 1
+        self._keys, self._key_order, self._group, self._shown = keys, key_order, group, shown
+        self._update_totals(snapshot, group)
+
+    def _update_totals(self, snapshot, group):
+        # Members' sums, then the kernel's own numbers wherever the group's files can be read
+        count = len(self.paths)
+        cpu = np.bincount(group, weights=snapshot.cpu, minlength=count)
+        memory = np.bincount(group, weights=snapshot.memory_mb, minlength=count)
+        live = sorted(self._members)
+        usage = np.full(len(live), np.nan)
+        for index, group_id in enumerate(live):
+            base = f"{self.cgroup_root}{self.paths[group_id].rstrip('/')}/"
+            try:
+                # The first line is "usage_usec <microseconds>"
+                usage[index] = float(_read(base + "cpu.stat").split(None, 2)[1])
+            except (OSError, IndexError, ValueError):
+                pass
+            try:
+                memory[group_id] = int(_read(base + "memory.current")) / (1024 ** 2)
+            except (OSError, ValueError):
+                pass
+
+        # Usage is a % of one CPU, like process CPU%; a group's first reading has no rate yet
+        readable = ~np.isnan(usage)
+        ids = np.array(live, dtype=np.int64)[readable]
+        rates = self._cpu_usage.update(ids, usage[readable, None], time.monotonic())[:, 0]
+        seen = np.isin(ids, self._cpu_groups)
+        cpu[ids[seen]] = rates[seen] / 1e4
+        self._cpu_groups = ids
+
+        for group_id in live:
+            totals = (round(float(cpu[group_id]), 1), round(float(memory[group_id]), 2))
+            if self._totals.get(group_id) != totals:
+                self._totals[group_id] = totals
+                self.changed.add(self.group_key(group_id))
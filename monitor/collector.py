@@ -0,0 +1,87 @@
+import os
+import time
+from operator import itemgetter
+
+import numpy as np
+import psutil
+
+from monitor.procfs import ProcfsCollector
+from monitor.rates import CounterRates
+from monitor.registry import ProcessRegistry
+from monitor.snapshot_store import NameTable, ProcessSnapshot, row_keys
+
+BACKENDS = ("psutil", "procfs", "auto")
+
+
+def create_backend(name=None):
+    """Return a process collection backend with a ``scan()`` method.
+
+    ``name`` is "psutil", "procfs" (Linux only) or "auto", which prefers
+    procfs where available. It defaults to the MONITOR_BACKEND environment
+    variable, or "psutil".
+    """
+    name = name or os.environ.get("MONITOR_BACKEND", "psutil")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}, expected one of {', '.join(BACKENDS)}")
+
+    if name == "procfs" or (name == "auto" and ProcfsCollector.available()):
+        return ProcfsCollector()
+    return ProcessRegistry()
+
+
+def _total_time(times):
+    return sum(times) - getattr(times, "guest", 0.0) - getattr(times, "guest_nice", 0.0)
+
+
+class SystemMetrics:
+    """Read system-wide CPU % and memory % without blocking.
+
+    ``psutil.cpu_percent(interval=None)`` keeps one global baseline, so a GUI
+    timer and the sampler thread calling it would each measure only the time
+    since the other's call. Every SystemMetrics keeps its own baseline.
+    """
+
+    def __init__(self):
+        self._last_times = psutil.cpu_times()
+
+    def read(self):
+        """Return (CPU %, memory %) since the previous read."""
+        times = psutil.cpu_times()
+        last = self._last_times
+        self._last_times = times
+
+        # On Linux guest time is already counted in user/nice time
+        total = _total_time(times) - _total_time(last)
+        idle = (times.idle + getattr(times, "iowait", 0.0)) - (last.idle + getattr(last, "iowait", 0.0))
+        cpu_percent = round(100.0 * (total - idle) / total, 1) if total > 0 else 0.0
+        return max(0.0, min(cpu_percent, 100.0)), psutil.virtual_memory().percent
+
+
+class Collector:
+    """Sample system metrics and running processes into ProcessSnapshots.
+
+    This is the one place the apps, the sampler thread and the headless
+    daemon collect from. The backend and the name table persist between
+    samples, so CPU% and the per-process I/O rates are measured against the
+    previous sample.
+    """
+
+    def __init__(self, backend=None, names=None):
+        # A backend name, or any object with a scan() method (e.g. a SyntheticProvider)
+        self.backend = backend if hasattr(backend, "scan") else create_backend(backend)
+        self.names = names or NameTable()
+        self.system = SystemMetrics()
+        self.io_rates = CounterRates()
+
+    def sample(self):
+        """Return a snapshot of the system and every running process."""
+        records = self.backend.scan()
+        cpu_percent, memory_percent = self.system.read()
+        snapshot = ProcessSnapshot.from_records(records, self.names, time.time(), cpu_percent, memory_percent)
+        # read_bytes and write_bytes, one fromiter pass each
+        counters = np.column_stack([np.fromiter(map(itemgetter(field), records), np.float64, len(records))
+                                    for field in (6, 7)])
+        rates = self.io_rates.update(row_keys(snapshot.pid, snapshot.create_time), counters, snapshot.timestamp)
+        snapshot.read_bps = rates[:, 0].astype(np.float32)
+        snapshot.write_bps = rates[:, 1].astype(np.float32)
+        return snapshot
@@ -0,0 +1,72 @@
+"""Headless collector: sample system and process metrics into a time-series log.
+
+Usage: python -m monitor.daemon --log-dir /var/lib/monitor --interval 1
+"""
+import argparse
+import signal
+import sys
+import time
+
+import psutil
+
+from monitor.collector import BACKENDS, Collector
+from monitor.tslog import DEFAULT_SEGMENT_SIZE, LogWriter
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sample system and process metrics into a time-series log.")
+    parser.add_argument("--log-dir", required=True, help="directory holding the log segments")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds between samples (default: 1)")
+    parser.add_argument("--backend", choices=BACKENDS, help="process collection backend (default: psutil)")
+    parser.add_argument("--segment-size", type=int, default=DEFAULT_SEGMENT_SIZE // (1024 * 1024),
+                        help="segment size in MB (default: 64)")
+    parser.add_argument("--max-segments", type=int, help="delete the oldest segments beyond this many")
+    parser.add_argument("--flush-interval", type=float, default=10.0,
+                        help="seconds between forcing the log to disk (default: 10)")
+    parser.add_argument("--count", type=int, help="stop after this many samples")
+    return parser.parse_args(argv)
+
+
+def run(args):
+    collector = Collector(args.backend)
+    writer = LogWriter(args.log_dir, args.segment_size * 1024 * 1024, args.max_segments)
+    stopping = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+
+    samples = 0
+    error = None
+    next_sample = last_flush = time.monotonic()
+    try:
+        while not stopping and (args.count is None or samples < args.count):
+            try:
+                snapshot = collector.sample()
+            except (psutil.Error, OSError) as e:
+                # Retried on the next tick; a failure that persists is only logged once
+                if str(e) != error:
+                    print(f"Sampling failed, retrying every {args.interval} s: {type(e).__name__}: {e}",
+                          file=sys.stderr)
+                error = str(e)
+            else:
+                if error is not None:
+                    print("Sampling recovered", file=sys.stderr)
+                    error = None
+                writer.append(snapshot)
+                samples += 1
+
+            now = time.monotonic()
+            if now - last_flush >= args.flush_interval:
+                writer.flush()
+                last_flush = now
+
+            # Stay on the schedule even when a sample takes a while
+            next_sample += args.interval
+            time.sleep(max(0.0, next_sample - time.monotonic()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        writer.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(run(parse_args()))
@@ -0,0 +1,146 @@
+import cProfile
+import gc
+import json
+import os
+import platform
+import sys
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import numpy as np
+import psutil
+
+STAGE_COLUMNS = ("Stage", "Calls", "Last ms", "p50 ms", "p95 ms", "Max ms", "Blocks")
+RECENT = 240  # Timings kept per stage for the percentiles
+
+
+class _Stage:
+    __slots__ = ("calls", "total", "max", "blocks", "recent")
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.blocks = None  # Net memory blocks allocated by the last call, None if not measured
+        self.recent = deque(maxlen=RECENT)
+
+
+class Diagnostics:
+    """What the monitor itself costs: stage timings, allocations, event-loop lag, own CPU and RSS.
+
+    Hot paths are wrapped in ``stage(name)``, which adds about a
+    microsecond: two clock reads and two reads of the interpreter's
+    allocated block count. The block delta is the net number of objects
+    a call left allocated (process-wide, so a busy sampler thread can blur
+    it). Stages timed elsewhere, such as collection on the sampler thread,
+    are added with ``record``. ``watch_loop`` measures how late the GUI's
+    event loop runs a timer, which is what users feel as a frozen window.
+    Everything is exported with ``export``; ``start_profile`` /
+    ``stop_profile`` dump a cProfile of the GUI thread for a closer look.
+    """
+
+    def __init__(self):
+        self.stages = {}  # name -> _Stage, in first-use order
+        self.loop_lag = deque(maxlen=RECENT)  # Seconds each probe ran late
+        self.started = time.time()
+        self._process = psutil.Process(os.getpid())
+        self._process.cpu_percent(None)  # Start the CPU measurement window
+        self._profile = None
+
+    @contextmanager
+    def stage(self, name):
+        """Time the block as one call of stage ``name``."""
+        blocks = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, sys.getallocatedblocks() - blocks)
+
+    def record(self, name, seconds, blocks=None):
+        """Add one call of stage ``name`` that took ``seconds``."""
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = _Stage()
+        stage.calls += 1
+        stage.total += seconds
+        stage.max = max(stage.max, seconds)
+        stage.blocks = blocks
+        stage.recent.append(seconds)
+
+    def watch_loop(self, call_later, interval=0.25):
+        """Measure event-loop lag with a timer every ``interval`` seconds armed through ``call_later(ms, callback)``."""
+        def probe(expected):
+            now = time.perf_counter()
+            self.loop_lag.append(max(0.0, now - expected))
+            call_later(int(interval * 1000), lambda: probe(now + interval))
+
+        call_later(int(interval * 1000), lambda: probe(time.perf_counter() + interval))
+
+    def stage_rows(self):
+        """Return one row of display strings per stage, matching STAGE_COLUMNS."""
+        rows = []
+        for name, stage in self.stages.items():
+            p50, p95 = np.percentile(stage.recent, (50, 95)) * 1000
+            blocks = "" if stage.blocks is None else f"{stage.blocks:+d}"
+            rows.append((name, stage.calls, f"{stage.recent[-1] * 1000:.2f}", f"{p50:.2f}", f"{p95:.2f}",
+                         f"{stage.max * 1000:.2f}", blocks))
+        return rows
+
+    def usage(self):
+        """Return the monitor's own resource use and event-loop lag as a dict."""
+        with self._process.oneshot():
+            usage = {"cpu_percent": self._process.cpu_percent(None),
+                     "rss_mb": self._process.memory_info().rss / 1024 ** 2,
+                     "threads": self._process.num_threads()}
+        lag = np.array(self.loop_lag) * 1000 if self.loop_lag else np.zeros(1)
+        usage.update(loop_lag_ms=float(lag[-1]), loop_lag_p95_ms=float(np.percentile(lag, 95)),
+                     loop_lag_max_ms=float(lag.max()), gc_collections=sum(s["collections"] for s in gc.get_stats()),
+                     allocated_blocks=sys.getallocatedblocks())
+        return usage
+
+    def summary(self):
+        """Return a one-line summary of ``usage()`` for a status label."""
+        usage = self.usage()
+        return (f"Own CPU {usage['cpu_percent']:.1f}%   RSS {usage['rss_mb']:.1f} MB   "
+                f"Threads {usage['threads']}   Loop lag {usage['loop_lag_ms']:.1f} ms "
+                f"(p95 {usage['loop_lag_p95_ms']:.1f}, max {usage['loop_lag_max_ms']:.1f})   "
+                f"GC runs {usage['gc_collections']}")
+
+    def export(self, path=None):
+        """Write the stage timings and resource use as JSON; return the path written."""
+        if path is None:
+            path = time.strftime("monitor-diagnostics-%Y%m%d-%H%M%S.json")
+        stages = {}
+        for name, stage in self.stages.items():
+            stages[name] = {"calls": stage.calls, "mean_ms": stage.total / stage.calls * 1000,
+                            "max_ms": stage.max * 1000, "last_blocks": stage.blocks,
+                            "recent_ms": [seconds * 1000 for seconds in stage.recent]}
+        report = {"exported": time.time(), "started": self.started, "python": sys.version,
+                  "platform": platform.platform(), "usage": self.usage(), "stages": stages,
+                  "loop_lag_ms": [seconds * 1000 for seconds in self.loop_lag]}
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        return path
+
+    @property
+    def profiling(self):
+        return self._profile is not None
+
+    def start_profile(self):
+        """Start profiling the calling (GUI) thread."""
+        if self._profile is None:
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+
+    def stop_profile(self, path=None):
+        """Stop profiling and dump the stats for pstats or snakeviz; return the path written."""
+        profile, self._profile = self._profile, None
+        if profile is None:
+            return None
+        profile.disable()
+        if path is None:
+            path = time.strftime("monitor-profile-%Y%m%d-%H%M%S.prof")
+        profile.dump_stats(path)
+        return path
@@ -0,0 +1,62 @@
+import tkinter as tk
+from tkinter import ttk
+
+from monitor.diagnostics import STAGE_COLUMNS
+from monitor.table_sync import TreeviewSync
+
+PROFILE_SECONDS = 10
+
+
+class DiagnosticsPanel(ttk.Frame):
+    """Tk view of a Diagnostics: the monitor's own usage, one row per stage, export and profile buttons.
+
+    Call ``refresh`` periodically while the panel is shown; only the stage
+    rows whose numbers changed are rewritten.
+    """
+
+    def __init__(self, parent, diagnostics):
+        super().__init__(parent)
+        self.diagnostics = diagnostics
+
+        self.usage_label = ttk.Label(self, text="", font=("Arial", 10))
+        self.usage_label.pack(fill=tk.X, padx=5, pady=5)
+
+        self.tree = ttk.Treeview(self, columns=STAGE_COLUMNS, show="headings", height=12)
+        for column in STAGE_COLUMNS:
+            self.tree.heading(column, text=column)
+            self.tree.column(column, width=90, anchor=tk.E)
+        self.tree.column("Stage", width=160, anchor=tk.W)
+        self.tree.pack(fill=tk.BOTH, expand=True, padx=5)
+        self.tree_sync = TreeviewSync(self.tree)
+
+        button_frame = ttk.Frame(self)
+        button_frame.pack(fill=tk.X, pady=5)
+        ttk.Button(button_frame, text="Export", command=self.export).pack(side=tk.LEFT, padx=5)
+        self.profile_button = ttk.Button(button_frame, text=f"Profile {PROFILE_SECONDS} s", command=self.profile)
+        self.profile_button.pack(side=tk.LEFT, padx=5)
+        self.status_label = ttk.Label(button_frame, text="")
+        self.status_label.pack(side=tk.LEFT, padx=5)
+
+    def refresh(self):
+        self.usage_label.config(text=self.diagnostics.summary())
+        self.tree_sync.update([((row[0], 0), row, ()) for row in self.diagnostics.stage_rows()])
+
+    def export(self):
+        try:
+            self.status_label.config(text=f"Wrote {self.diagnostics.export()}")
+        except OSError as e:
+            self.status_label.config(text=f"Export failed: {e}")
+
+    def profile(self):
+        """Profile the GUI thread for a few seconds, then dump the stats."""
+        self.diagnostics.start_profile()
+        self.profile_button.state(["disabled"])
+        self.status_label.config(text="Profiling...")
+        self.after(PROFILE_SECONDS * 1000, self.finish_profile)
+
+    def finish_profile(self):
+        self.profile_button.state(["!disabled"])
+        try:
+            self.status_label.config(text=f"Wrote {self.diagnostics.stop_profile()}")
+        except OSError as e:
+            self.status_label.config(text=f"Profile failed: {e}")
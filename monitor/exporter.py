@@ -0,0 +1,214 @@
+"""Serve system and top process metrics for Prometheus to scrape.
+
+Usage: python -m monitor.exporter --listen 0.0.0.0:9464 --interval 5 --top 20
+"""
+import argparse
+import gzip
+import socket
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import psutil
+
+from monitor.collector import BACKENDS, Collector
+from monitor.remote import format_address, parse_address
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+MB = 1024 * 1024
+STALE_TICKS = 3  # Intervals without a new sample after which scrapes get a 503 instead of old metrics
+
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render(snapshot, top=20, min_age=60.0, collect_seconds=None):
+    """Return the Prometheus text exposition of a snapshot.
+
+    Only the ``top`` processes by CPU and the ``top`` by memory get their own
+    series, and only once they have run for ``min_age`` seconds, so
+    short-lived PIDs never turn into series of their own; everything else
+    is summed into the "other" series.
+    """
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{labels} {value:.10g}")
+
+    metric("monitor_cpu_percent", "gauge", "System-wide CPU utilisation in percent.",
+           [("", snapshot.cpu_percent)])
+    metric("monitor_memory_percent", "gauge", "System-wide memory in use, in percent.",
+           [("", snapshot.memory_percent)])
+    metric("monitor_processes", "gauge", "Number of running processes.", [("", len(snapshot))])
+
+    settled = np.flatnonzero(snapshot.create_time <= snapshot.timestamp - min_age)
+    shown = np.union1d(snapshot.top_k("cpu_percent", top, settled), snapshot.top_k("memory_mb", top, settled))
+    labels = [f'{{pid="{snapshot.pid[i]}",name="{_escape(snapshot.name(i))}"}}' for i in shown.tolist()]
+    cpu = snapshot.cpu[shown].tolist()
+    memory = (snapshot.memory_mb[shown].astype(np.float64) * MB).tolist()
+    metric("monitor_process_cpu_percent", "gauge",
+           f"CPU of the top {top} processes by CPU or memory, in percent of one core.", zip(labels, cpu))
+    metric("monitor_process_memory_bytes", "gauge",
+           f"Resident memory of the top {top} processes by CPU or memory.", zip(labels, memory))
+
+    rest = np.ones(len(snapshot), dtype=bool)
+    rest[shown] = False
+    metric("monitor_process_other_cpu_percent", "gauge", "Summed CPU of the processes without their own series.",
+           [("", float(snapshot.cpu[rest].sum(dtype=np.float64)))])
+    metric("monitor_process_other_memory_bytes", "gauge",
+           "Summed resident memory of the processes without their own series.",
+           [("", float(snapshot.memory_mb[rest].sum(dtype=np.float64)) * MB)])
+
+    metric("monitor_last_sample_timestamp_seconds", "gauge", "When the metrics were collected, as a Unix time.",
+           [("", snapshot.timestamp)])
+    if collect_seconds is not None:
+        metric("monitor_collect_duration_seconds", "gauge", "How long collecting the last sample took.",
+               [("", collect_seconds)])
+    lines.append("")
+    return "\n".join(lines).encode()
+
+
+class MetricsExporter:
+    """Sample on a timer and serve the rendered metrics over HTTP.
+
+    Each tick renders the response once, plain and gzipped, and swaps it in
+    as a whole; scrapes only copy those bytes out, so any number of
+    scrapers costs no extra collection or rendering. ``/metrics`` serves
+    the latest sample, anything else is a 404. A failed sample keeps the
+    previous response, but once ``STALE_TICKS`` intervals pass without a
+    new one (collection keeps failing, or the sampler thread died) scrapes
+    get a 503 naming the last error, so Prometheus marks the target down
+    rather than recording stale values as current.
+    """
+
+    def __init__(self, address, collector=None, interval=5.0, top=20, min_age=60.0):
+        self.collector = collector or Collector()
+        self.interval = interval
+        self.top = top
+        self.min_age = min_age
+        self.ticks = 0
+        self.scrapes = 0
+        self.error = None  # The last failed sample's error, until a sample succeeds
+        self._response = None  # (plain bytes, gzipped bytes), replaced as a whole every tick
+        self._rendered = None  # time.monotonic() of the last tick that rendered one
+        self._ready = threading.Event()
+        self._stopped = threading.Event()
+
+        family, bind_address = parse_address(address)
+        if family != socket.AF_INET:
+            raise ValueError("The metrics exporter listens on host:port only")
+        self._server = ThreadingHTTPServer(bind_address, self._handler())
+        self._server.daemon_threads = True
+        self.address = format_address(family, self._server.server_address)
+
+    def tick(self):
+        """Collect a sample and render the response scrapes get until the next tick."""
+        start = time.monotonic()
+        snapshot = self.collector.sample()
+        body = render(snapshot, self.top, self.min_age, time.monotonic() - start)
+        response = (body, gzip.compress(body, compresslevel=5))
+        self._rendered = time.monotonic()
+        self._response = response
+        self.error = None
+        self.ticks += 1
+        self._ready.set()
+
+    def start(self):
+        """Serve scrapes and sample on background threads; return the exporter."""
+        threading.Thread(target=self._server.serve_forever, name="exporter-http", daemon=True).start()
+        threading.Thread(target=self._sample_loop, name="exporter-sampler", daemon=True).start()
+        return self
+
+    def serve_forever(self):
+        """Sample on a background thread and serve scrapes on this one until ``stop``."""
+        threading.Thread(target=self._sample_loop, name="exporter-sampler", daemon=True).start()
+        self._server.serve_forever()
+
+    def wait_ready(self, timeout=None):
+        """Wait for the first rendered response; return False on timeout."""
+        return self._ready.wait(timeout)
+
+    def stop(self):
+        self._stopped.set()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _sample_loop(self):
+        next_tick = time.monotonic()
+        while not self._stopped.is_set():
+            try:
+                self.tick()
+            except (psutil.Error, OSError) as e:
+                self.error = f"{type(e).__name__}: {e}"  # The previous response stays; the next tick retries
+            except Exception as e:
+                self.error = f"sampler stopped: {type(e).__name__}: {e}"
+                raise
+            next_tick += self.interval
+            self._stopped.wait(max(0.0, next_tick - time.monotonic()))
+
+    def stale_reason(self):
+        """Return why scrapes get a 503 instead of metrics, or None while the response is current."""
+        if self._response is None:
+            return f"No sample collected yet ({self.error})" if self.error else "No sample collected yet"
+        age = time.monotonic() - self._rendered
+        if age <= STALE_TICKS * self.interval:
+            return None
+        return f"Last sample is {age:.0f} s old" + (f" ({self.error})" if self.error else "")
+
+    def _handler(self):
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                reason = exporter.stale_reason()
+                if reason is not None:
+                    self.send_error(503, reason)
+                    return
+                response = exporter._response
+                exporter.scrapes += 1
+                compressed = "gzip" in self.headers.get("Accept-Encoding", "")
+                body = response[1] if compressed else response[0]
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                if compressed:
+                    self.send_header("Content-Encoding", "gzip")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Scrapes every few seconds would flood stderr
+
+        return Handler
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve system and top process metrics for Prometheus.")
+    parser.add_argument("--listen", default="0.0.0.0:9464", help="host:port to serve /metrics on (default: 0.0.0.0:9464)")
+    parser.add_argument("--interval", type=float, default=5.0, help="seconds between samples (default: 5)")
+    parser.add_argument("--top", type=int, default=20,
+                        help="processes by CPU and by memory that get their own series (default: 20)")
+    parser.add_argument("--min-age", type=float, default=60.0,
+                        help="seconds a process must run before it gets its own series (default: 60)")
+    parser.add_argument("--backend", choices=BACKENDS, help="process collection backend (default: psutil)")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    exporter = MetricsExporter(args.listen, Collector(args.backend), args.interval, args.top, args.min_age)
+    print(f"Serving metrics on http://{exporter.address}/metrics")
+    try:
+        exporter.serve_forever()
+    except KeyboardInterrupt:
+        exporter.stop()
+    sys.exit(0)
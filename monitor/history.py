@@ -0,0 +1,95 @@
+import time
+
+import numpy as np
+
+# (seconds per point, points kept): 1 h of raw samples, then a day at 10 s and 1 min, a week at 10 min
+TIERS = ((1, 3600), (10, 8640), (60, 1440), (600, 1008))
+
+SPANS = {"1 min": 60, "10 min": 600, "1 hour": 3600, "1 day": 86400}
+
+
+class RingBuffer:
+    """Fixed-capacity ring of (time, min, avg, max) rows backed by one NumPy array."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._data = np.full((capacity, 4), np.nan)
+        self._next = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, timestamp, low, average, high):
+        """Store a row, overwriting the oldest one once full."""
+        self._data[self._next] = (timestamp, low, average, high)
+        self._next = (self._next + 1) % self.capacity
+        self._count = min(self._count + 1, self.capacity)
+
+    def rows(self):
+        """Return the stored rows, oldest first."""
+        if self._count < self.capacity:
+            return self._data[:self._count]
+        return np.concatenate((self._data[self._next:], self._data[:self._next]))
+
+    def since(self, start):
+        """Return the rows stamped at or after ``start``, oldest first."""
+        rows = self.rows()
+        return rows[np.searchsorted(rows[:, 0], start):]
+
+
+class MetricHistory:
+    """History of one metric at several resolutions, in bounded memory.
+
+    Every sample goes into the raw tier and is folded into the pending
+    bucket of each coarser tier, which is stored as (min, avg, max) when its
+    period ends. Appends are constant time and the memory is fixed by TIERS.
+    """
+
+    def __init__(self, tiers=TIERS):
+        self.tiers = [(resolution, RingBuffer(capacity)) for resolution, capacity in tiers]
+        # Per coarse tier: [bucket start, count, sum, min, max]
+        self._pending = [[None, 0, 0.0, 0.0, 0.0] for _ in self.tiers[1:]]
+
+    def append(self, value, timestamp=None):
+        """Record a sample taken at ``timestamp`` (default: now)."""
+        if timestamp is None:
+            timestamp = time.time()
+        self.tiers[0][1].append(timestamp, value, value, value)
+
+        for (resolution, ring), bucket in zip(self.tiers[1:], self._pending):
+            start = timestamp - timestamp % resolution
+            if bucket[0] != start:
+                if bucket[1]:
+                    ring.append(bucket[0], bucket[3], bucket[2] / bucket[1], bucket[4])
+                bucket[:] = [start, 0, 0.0, value, value]
+            bucket[1] += 1
+            bucket[2] += value
+            if value < bucket[3]:
+                bucket[3] = value
+            if value > bucket[4]:
+                bucket[4] = value
+
+    def latest(self):
+        """Return the most recent sample, or None if there is none yet."""
+        rows = self.tiers[0][1].rows()
+        return rows[-1, 2] if len(rows) else None
+
+    def pick_tier(self, span, max_points):
+        """Return the finest tier that covers ``span`` seconds in at most ``max_points`` points."""
+        for resolution, ring in self.tiers:
+            if span / resolution <= max_points and resolution * ring.capacity >= span:
+                return resolution, ring
+        return self.tiers[-1]
+
+    def series(self, span, max_points, now=None):
+        """Return (times, min, avg, max) arrays for the last ``span`` seconds.
+
+        ``max_points`` is normally the pixel width of the plot, so the tier
+        chosen never holds more points than can be drawn.
+        """
+        if now is None:
+            now = time.time()
+        _, ring = self.pick_tier(span, max(max_points, 1))
+        rows = ring.since(now - span)
+        return rows[:, 0], rows[:, 1], rows[:, 2], rows[:, 3]
@@ -0,0 +1,98 @@
+import tkinter as tk
+from tkinter import ttk
+
+from monitor.process_history import METRICS, sparkline_points
+
+SPARK_SIZE = (180, 32)
+DETAIL_SIZE = (180, 120)
+
+
+class ProcessHistoryPanel(ttk.Frame):
+    """Tk side panel with the recent history of one process: a sparkline per metric and a detail graph.
+
+    ``show(key, name)`` picks the process, e.g. when a table row is selected;
+    call ``refresh`` after each update of the history. Clicking a sparkline
+    shows its metric in the detail graph.
+    """
+
+    def __init__(self, parent, history):
+        super().__init__(parent)
+        self.history = history
+        self.key = None
+        self.detail = 0  # Index into METRICS
+
+        self.title_label = ttk.Label(self, text="Select a process", font=("Arial", 10, "bold"))
+        self.title_label.pack(anchor=tk.W, padx=5, pady=5)
+
+        self.value_labels = []
+        self.sparklines = []
+        for index, (label, _, _) in enumerate(METRICS):
+            value_label = ttk.Label(self, text=label)
+            value_label.pack(anchor=tk.W, padx=5)
+            canvas = tk.Canvas(self, width=SPARK_SIZE[0], height=SPARK_SIZE[1], highlightthickness=0,
+                               background="#1e1e1e")
+            canvas.pack(padx=5, pady=(0, 5))
+            canvas.create_line(0, 0, 0, 0, fill="lime", tags="line")
+            canvas.bind("<Button-1>", lambda event, index=index: self.set_detail(index))
+            self.value_labels.append(value_label)
+            self.sparklines.append(canvas)
+
+        self.detail_label = ttk.Label(self, text="")
+        self.detail_label.pack(anchor=tk.W, padx=5, pady=(5, 0))
+        self.detail_canvas = tk.Canvas(self, width=DETAIL_SIZE[0], height=DETAIL_SIZE[1], highlightthickness=0,
+                                       background="#1e1e1e")
+        self.detail_canvas.pack(padx=5, pady=(0, 5))
+        for fraction in (0.25, 0.5, 0.75):
+            y = DETAIL_SIZE[1] * fraction
+            self.detail_canvas.create_line(0, y, DETAIL_SIZE[0], y, fill="gray25", dash=(2, 2))
+        self.detail_canvas.create_line(0, 0, 0, 0, fill="cyan", width=2, tags="line")
+        self.detail_canvas.create_text(3, 2, anchor=tk.NW, fill="white", font=("Arial", 8), tags="top")
+
+    def show(self, key, name):
+        """Show the history of the process with row key ``key`` (pid, create_time)."""
+        self.key = key
+        self.title_label.config(text=f"{name} ({key[0]})")
+        self.refresh()
+
+    def set_detail(self, index):
+        self.detail = index
+        self.refresh()
+
+    def refresh(self):
+        if self.key is None:
+            return
+        series = self.history.series(*self.key)
+        if series is None:
+            for canvas in self.sparklines + [self.detail_canvas]:
+                canvas.coords("line", 0, 0, 0, 0)
+            for (label, _, _), value_label in zip(METRICS, self.value_labels):
+                value_label.config(text=f"{label}: no history (budget full or exited)")
+            self.detail_label.config(text="")
+            return
+
+        # Every graph spans the same window, so a young process's line starts partway and an exited one's stops short
+        times = series[0]
+        start, end = self.history.window()
+        span = max(end - start, 1.0)
+        for (label, unit, index), value_label, canvas in zip(METRICS, self.value_labels, self.sparklines):
+            values = series[index]
+            if len(values):
+                value_label.config(text=f"{label}: {values[-1]:.1f}{unit}   (max {values.max():.1f}{unit})")
+            else:
+                value_label.config(text=f"{label}: exited")
+            self._draw(canvas, times, values, SPARK_SIZE, span, end)
+
+        label, unit, index = METRICS[self.detail]
+        self.detail_label.config(text=f"{label}, last {span / 60:.0f} min" if span >= 60 else f"{label}, last {span:.0f} s")
+        top = self._draw(self.detail_canvas, times, series[index], DETAIL_SIZE, span, end)
+        self.detail_canvas.itemconfigure("top", text=f"{top:.1f}{unit}")
+
+    @staticmethod
+    def _draw(canvas, times, values, size, span, now):
+        # Some headroom above the largest value, so a flat series does not sit on the top edge
+        top = max(float(values.max()) * 1.1, 1.0) if len(values) else 1.0
+        points = sparkline_points(times, values, size[0], size[1], span, top, now)
+        if len(points) < 4:
+            points = (points * 2)[:4] or [0, 0, 0, 0]  # A single sample draws as a dot
+        canvas.coords("line", *points)
+        return top
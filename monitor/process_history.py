@@ -0,0 +1,157 @@
+import numpy as np
+
+from monitor.snapshot_store import row_keys
+
+POINTS = 120  # Samples kept per process: 10 minutes at the default 5 s refresh
+BUDGET_MB = 16
+IDLE_CPU = 0.1  # CPU% at or below which a process counts as idle, and so as unused, for eviction
+METRICS = (("CPU", "%", 1), ("Memory", " MB", 2))  # Label, unit and index in a ``series`` tuple
+
+
+class ProcessHistory:
+    """Recent CPU% and memory of every tracked process, in a fixed memory budget.
+
+    Each tracked process owns a slot: a row of ``points`` float32 samples per
+    metric in preallocated arrays, written as a ring. Every process in a
+    snapshot is sampled at the same time, so one shared ring of timestamps
+    serves all slots and an update is a handful of vectorized writes however
+    many processes there are. Slots are keyed by (pid, create_time) through
+    ``row_keys``, so a reused PID starts a new series.
+
+    The arrays grow by doubling up to the number of slots ``budget_mb`` pays
+    for. Once they are full, a new process only gets a slot while it is busy,
+    taking the least recently used one: the longest-exited or longest-idle
+    process. Being busy or having its series viewed counts as use.
+    """
+
+    def __init__(self, points=POINTS, budget_mb=BUDGET_MB):
+        self.points = points
+        # Two float32 rows of samples, plus the key and three tick counters, per slot
+        self.slot_bytes = points * 2 * 4 + 4 * 8
+        self.max_slots = max(1, int(budget_mb * 1024 * 1024) // self.slot_bytes)
+        self.tick = -1  # Number of the last update
+        self.times = np.zeros(points)  # Timestamp of each update, by tick % points
+        self.count = 0
+        self._allocate(0)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in (self.cpu, self.memory, self.slot_key, self.first, self.last,
+                                              self.used, self.times))
+
+    def _allocate(self, capacity):
+        self.cpu = np.zeros((capacity, self.points), dtype=np.float32)
+        self.memory = np.zeros((capacity, self.points), dtype=np.float32)
+        self.slot_key = np.full(capacity, -1, dtype=np.int64)  # -1 marks a free slot
+        self.first = np.zeros(capacity, dtype=np.int64)  # Tick of a slot's first sample
+        self.last = np.zeros(capacity, dtype=np.int64)  # Tick of its latest sample
+        self.used = np.zeros(capacity, dtype=np.int64)  # Tick it was last busy or viewed
+        self._index()
+
+    def _grow(self, capacity):
+        old = (self.cpu, self.memory, self.slot_key, self.first, self.last, self.used)
+        self._allocate(capacity)
+        for new, array in zip((self.cpu, self.memory, self.slot_key, self.first, self.last, self.used), old):
+            new[:len(array)] = array
+        self._index()
+
+    def _index(self):
+        # Slots sorted by key, for vectorized lookups; free slots sort first
+        self._order = np.argsort(self.slot_key, kind="stable")
+        self._sorted_keys = self.slot_key[self._order]
+
+    def _lookup(self, keys):
+        """Return the slot of each key, -1 where it is not tracked."""
+        slots = np.full(len(keys), -1, dtype=np.int64)
+        if self.count:
+            position = np.minimum(np.searchsorted(self._sorted_keys, keys), len(self._sorted_keys) - 1)
+            found = self._sorted_keys[position] == keys
+            slots[found] = self._order[position[found]]
+        return slots
+
+    def update(self, snapshot):
+        """Record a snapshot's CPU% and memory for the tracked processes, admitting new ones."""
+        self.tick += 1
+        tick = self.tick
+        column = tick % self.points
+        self.times[column] = snapshot.timestamp
+
+        keys = row_keys(snapshot.pid, snapshot.create_time)
+        slots = self._lookup(keys)
+        busy = snapshot.cpu > IDLE_CPU
+        self.used[slots[(slots >= 0) & busy]] = tick
+        new = np.flatnonzero(slots < 0)
+        if len(new):
+            self._admit(keys, slots, new, busy[new])
+
+        tracked = slots >= 0
+        rows = slots[tracked]
+        self.cpu[rows, column] = snapshot.cpu[tracked]
+        self.memory[rows, column] = snapshot.memory_mb[tracked]
+        self.last[rows] = tick
+
+    def _admit(self, keys, slots, new, busy):
+        # Give the rows ``new`` slots: free ones first, then, for busy rows only, the least recently used
+        if self.count + len(new) > len(self.slot_key) and len(self.slot_key) < self.max_slots:
+            self._grow(min(self.max_slots, max(2 * len(self.slot_key), self.count + len(new), 64)))
+        free = np.flatnonzero(self.slot_key < 0)[:len(new)]
+        admitted = new[:len(free)]
+        given = free
+
+        waiting = new[len(free):][busy[len(free):]]
+        if len(waiting):
+            candidates = np.flatnonzero((self.slot_key >= 0) & (self.used < self.tick))
+            if len(waiting) < len(candidates):
+                candidates = candidates[np.argpartition(self.used[candidates], len(waiting) - 1)[:len(waiting)]]
+            waiting = waiting[:len(candidates)]
+            slots[np.isin(slots, candidates)] = -1  # Evicted processes still in the snapshot lose their slot
+            self.count -= len(candidates)
+            admitted = np.concatenate((admitted, waiting))
+            given = np.concatenate((given, candidates))
+
+        slots[admitted] = given
+        self.slot_key[given] = keys[admitted]
+        self.first[given] = self.tick
+        self.used[given] = self.tick
+        self.count += len(given)
+        self._index()
+
+    def window(self):
+        """Return the (start, end) times of the last ``points`` updates."""
+        if self.tick < 0:
+            return 0.0, 0.0
+        return self.times[max(0, self.tick - self.points + 1) % self.points], self.times[self.tick % self.points]
+
+    def series(self, pid, create_time):
+        """Return (times, cpu, memory) of a process, oldest first, or None if it is not tracked.
+
+        Only the samples of the last ``points`` updates are returned, so an
+        exited process's series empties out. Viewing a series counts as use.
+        """
+        slot = int(self._lookup(row_keys([pid], [create_time]))[0])
+        if slot < 0:
+            return None
+        self.used[slot] = max(self.used[slot], self.tick)
+        ticks = np.arange(max(self.first[slot], self.tick - self.points + 1), self.last[slot] + 1)
+        columns = ticks % self.points
+        return self.times[columns], self.cpu[slot, columns], self.memory[slot, columns]
+
+
+def sparkline_points(times, values, width, height, span, top=None, now=None):
+    """Return the flat [x0, y0, x1, y1, ...] coordinates drawing ``values`` in a ``width`` x ``height`` box.
+
+    x covers the ``span`` seconds up to ``now`` (default: the last time);
+    y runs from 0 at the bottom to ``top`` (default: the largest value).
+    """
+    if not len(values):
+        return []
+    if now is None:
+        now = times[-1]
+    if top is None:
+        top = float(values.max())
+    x = (np.asarray(times) - (now - span)) * ((width - 1) / span)
+    y = (height - 1) - np.asarray(values, dtype=np.float64) * ((height - 1) / max(top, 1e-9))
+    return np.column_stack((x, y)).ravel().tolist()
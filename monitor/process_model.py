@@ -0,0 +1,323 @@
+from contextlib import nullcontext
+
+import numpy as np
+from PyQt5.QtCore import QAbstractProxyModel, QAbstractTableModel, QModelIndex, Qt, pyqtSignal
+
+from monitor.snapshot_store import SORT_COLUMNS, row_keys
+
+HEADERS = ("PID", "Name", "CPU (%)", "Memory (MB)", "Read/s", "Write/s")
+KEY_ROLE = Qt.UserRole  # The packed (pid, create_time) key of a row
+MAX_REMOVED_RUNS = 64  # More runs of rows leaving the proxy than this are applied as one layout change
+
+
+def _runs(positions):
+    """Split sorted row positions into (first, last) runs of consecutive rows."""
+    if not len(positions):
+        return []
+    breaks = np.flatnonzero(np.diff(positions) != 1)
+    starts = np.concatenate(([0], breaks + 1))
+    ends = np.concatenate((breaks, [len(positions) - 1]))
+    return list(zip(positions[starts].tolist(), positions[ends].tolist()))
+
+
+class _RowArrays:
+    """Parallel NumPy columns with spare capacity, one entry per model row.
+
+    Runs of rows removed from the bottom up leave a gap that the rows above
+    only cross once, so signalling hundreds of removed runs copies each
+    column about once instead of once per run. Reading a column closes the
+    gap first.
+    """
+
+    def __init__(self, *columns):
+        self.count = 0
+        self._columns = [np.zeros((0,) + tuple(shape), dtype=dtype) for dtype, shape in columns]
+        self._gap_start = self._gap_end = 0  # Physical rows [start, end) are removed but not yet compacted
+
+    def __getitem__(self, column):
+        self._close_gap()
+        return self._columns[column][:self.count]
+
+    def remove(self, first, last):
+        """Remove rows ``first`` to ``last``; cheapest when called for runs from the bottom up."""
+        if self._gap_start != self._gap_end and last + 1 > self._gap_start:
+            self._close_gap()
+        if self._gap_start == self._gap_end:
+            self._gap_start, self._gap_end = first, last + 1
+        else:
+            # Move the rows between this run and the gap down, behind the gap
+            moved = self._gap_start - (last + 1)
+            for column in self._columns:
+                column[self._gap_end - moved:self._gap_end] = column[last + 1:self._gap_start]
+            self._gap_start, self._gap_end = first, self._gap_end - moved
+        self.count -= last - first + 1
+
+    def append(self, *values):
+        self._close_gap()
+        count = self.count + len(values[0])
+        if count > len(self._columns[0]):
+            capacity = max(count, 2 * len(self._columns[0]))
+            self._columns = [np.resize(column, (capacity,) + column.shape[1:]) for column in self._columns]
+        for column, value in zip(self._columns, values):
+            column[self.count:count] = value
+        self.count = count
+
+    def assign(self, column, values):
+        self[column][:] = values
+
+    def _close_gap(self):
+        if self._gap_start == self._gap_end:
+            return
+        end = self.count + self._gap_end - self._gap_start
+        for column in self._columns:
+            column[self._gap_start:self.count] = column[self._gap_end:end]
+        self._gap_start = self._gap_end = 0
+
+
+def _remove_runs(model, table, positions):
+    """Remove the rows at sorted ``positions`` from ``table``, signalling each run of rows on ``model``."""
+    # Bottom up, like QSortFilterProxyModel: rows above a removed run keep their numbers
+    for first, last in reversed(_runs(positions)):
+        model.beginRemoveRows(QModelIndex(), first, last)
+        table.remove(first, last)
+        model.endRemoveRows()
+
+
+class ProcessTableModel(QAbstractTableModel):
+    """Table model over the latest ProcessSnapshot, with no per-cell objects.
+
+    Rows keep the order in which processes first appeared. ``update`` emits
+    ``rowsRemoved`` for processes that exited, ``dataChanged`` only for rows
+    whose shown name, CPU% (to 0.1), memory (to 0.01 MB) or I/O rates (to
+    0.1 KB/s) changed and
+    ``rowsInserted`` for new processes. Cell strings are formatted in
+    ``data`` on demand, which a view only asks for the rows on screen.
+    """
+
+    updated = pyqtSignal()  # Emitted once a snapshot has been applied
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.snapshot = None
+        self.changed_keys = np.zeros(0, dtype=np.int64)  # Rows updated by the last snapshot
+        # Per row: key, snapshot row, and what is shown (name id, CPU% x10, memory MB x100, read and write KB/s x10)
+        self._table = _RowArrays((np.int64, ()), (np.int64, ()), (np.int64, (5,)))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._table.count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.snapshot.format_cell(int(self._table[1][index.row()]), index.column())
+        if role == KEY_ROLE:
+            return int(self._table[0][index.row()])
+        if role == Qt.TextAlignmentRole and index.column() != 1:
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def keys(self):
+        """Return the key of every model row."""
+        return self._table[0]
+
+    def snapshot_rows(self):
+        """Return the snapshot row shown by every model row."""
+        return self._table[1]
+
+    def pid_at(self, row):
+        return int(self.snapshot.pid[self._table[1][row]])
+
+    def key_at(self, row):
+        return self.snapshot.key(self._table[1][row])
+
+    def update(self, snapshot):
+        """Show ``snapshot``, signalling only the rows that went, changed or arrived."""
+        table = self._table
+        keys = row_keys(snapshot.pid, snapshot.create_time)
+        shown = np.column_stack((snapshot.name_id, np.rint(snapshot.cpu * 10), np.rint(snapshot.memory_mb * 100),
+                                 np.rint(snapshot.read_bps / 102.4),
+                                 np.rint(snapshot.write_bps / 102.4))).astype(np.int64)
+        self.snapshot = snapshot
+
+        # Exited processes, removed one run of consecutive rows at a time
+        _remove_runs(self, table, np.flatnonzero(~np.isin(table[0], keys)))
+
+        # Surviving processes point at their row in the new snapshot
+        by_key = np.argsort(keys, kind="stable")
+        rows = by_key[np.searchsorted(keys, table[0], sorter=by_key)]
+        table.assign(1, rows)
+        changed = np.flatnonzero((shown[rows] != table[2]).any(axis=1))
+        table.assign(2, shown[rows])
+        self.changed_keys = table[0][changed]
+        for first, last in _runs(changed):
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(HEADERS) - 1), [Qt.DisplayRole])
+
+        added = np.flatnonzero(~np.isin(keys, table[0]))
+        if len(added):
+            start = table.count
+            self.beginInsertRows(QModelIndex(), start, start + len(added) - 1)
+            table.append(keys[added], added, shown[added])
+            self.endInsertRows()
+
+        self.updated.emit()
+
+
+class ProcessProxyModel(QAbstractProxyModel):
+    """Filter and sort a ProcessTableModel with NumPy instead of per-row callbacks.
+
+    The visible rows are computed in one pass from the search index and
+    ``ProcessSnapshot.order``. Going from the old visible rows to the new
+    ones is signalled as removed runs, rows appended at the end and then one
+    layout change for the new order, with the persistent indexes (the
+    selection) moved along, so the view keeps its selection and never
+    resets. When many scattered rows leave at once, the whole change is a
+    single layout change instead.
+    """
+
+    def __init__(self, search_index, parent=None, diagnostics=None):
+        super().__init__(parent)
+        self.search_index = search_index
+        self.diagnostics = diagnostics  # Times the filter and sort passes when set
+        self.filter_text = ""
+        self.sort_column = None  # Index into SORT_COLUMNS, None for the source order
+        self.descending = False
+        self._table = _RowArrays((np.int64, ()), (np.int64, ()))  # Per proxy row: key, source row
+        self._proxy_rows = np.zeros(0, dtype=np.int64)  # source row -> proxy row, or -1 when filtered out
+
+    def setSourceModel(self, model):
+        super().setSourceModel(model)
+        model.updated.connect(self.refresh)
+        self.refresh()
+
+    def index(self, row, column, parent=QModelIndex()):
+        if parent.isValid() or not (0 <= row < self._table.count) or not (0 <= column < len(HEADERS)):
+            return QModelIndex()
+        return self.createIndex(row, column)
+
+    def parent(self, index=QModelIndex()):
+        return QModelIndex()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._table.count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal:
+            return self.sourceModel().headerData(section, orientation, role)
+        return super().headerData(section, orientation, role)
+
+    def mapToSource(self, index):
+        if not index.isValid():
+            return QModelIndex()
+        return self.sourceModel().index(int(self._table[1][index.row()]), index.column())
+
+    def mapFromSource(self, index):
+        if not index.isValid() or index.row() >= len(self._proxy_rows):
+            return QModelIndex()
+        row = int(self._proxy_rows[index.row()])
+        return self.createIndex(row, index.column()) if row >= 0 else QModelIndex()
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sort_column = column if 0 <= column < len(SORT_COLUMNS) else None
+        self.descending = order == Qt.DescendingOrder
+        self.refresh()
+
+    def set_filter(self, text):
+        self.filter_text = text
+        self.refresh()
+
+    def pid_at(self, row):
+        return self.sourceModel().pid_at(int(self._table[1][row]))
+
+    def key_at(self, row):
+        return self.sourceModel().key_at(int(self._table[1][row]))
+
+    def refresh(self):
+        """Recompute the visible rows after a new snapshot, filter or sort order."""
+        source = self.sourceModel()
+        snapshot = source.snapshot
+        if snapshot is None:
+            return
+        table = self._table
+
+        # Snapshot rows to show, in display order, mapped to source rows
+        with self._stage("filter"):
+            indices = self.search_index.rows(snapshot, self.filter_text)
+        if self.sort_column is not None:
+            with self._stage("sort"):
+                indices = snapshot.order(SORT_COLUMNS[self.sort_column], self.descending, indices)
+        source_of_snapshot = np.empty(len(snapshot), dtype=np.int64)
+        source_of_snapshot[source.snapshot_rows()] = np.arange(source.rowCount())
+        source_rows = source_of_snapshot[indices]
+        if self.sort_column is None:
+            source_rows = np.sort(source_rows)
+        keys = source.keys()[source_rows]
+
+        removed = np.flatnonzero(~np.isin(table[0], keys))
+        if len(_runs(removed)) > MAX_REMOVED_RUNS:
+            # Views handle every removed run on its own; past a few dozen one relayout is cheaper
+            self._relayout(keys, source_rows)
+        else:
+            _remove_runs(self, table, removed)
+
+            # Rows that stayed may have moved in the source
+            table.assign(1, source_rows[self._find(keys, table[0])])
+            added = ~np.isin(keys, table[0])
+            if added.any():
+                start = table.count
+                self.beginInsertRows(QModelIndex(), start, start + int(added.sum()) - 1)
+                table.append(keys[added], source_rows[added])
+                self.endInsertRows()
+
+            if not np.array_equal(table[0], keys):
+                self._relayout(keys, source_rows)
+            else:
+                self._map_source(source.rowCount())
+
+        changed = np.sort(self._find(table[0], source.changed_keys, missing=-1))
+        for first, last in _runs(changed[changed >= 0]):
+            self.dataChanged.emit(self.index(first, 0), self.index(last, len(HEADERS) - 1), [Qt.DisplayRole])
+
+    def _stage(self, name):
+        return self.diagnostics.stage(name) if self.diagnostics is not None else nullcontext()
+
+    def _relayout(self, keys, source_rows):
+        """Show ``keys`` in one layout change, moving persistent indexes (the selection) by key."""
+        table = self._table
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        old_keys = table[0][[index.row() for index in persistent]]
+        if table.count:
+            table.remove(0, table.count - 1)
+        table.append(keys, source_rows)
+        new_rows = self._find(keys, old_keys, missing=-1)
+        self.changePersistentIndexList(persistent, [self.index(int(row), index.column()) if row >= 0 else QModelIndex()
+                                                    for row, index in zip(new_rows, persistent)])
+        self._map_source(self.sourceModel().rowCount())
+        self.layoutChanged.emit()
+
+    def _map_source(self, source_count):
+        self._proxy_rows = np.full(source_count, -1, dtype=np.int64)
+        self._proxy_rows[self._table[1]] = np.arange(self._table.count)
+
+    @staticmethod
+    def _find(keys, wanted, missing=None):
+        """Return the positions of ``wanted`` in ``keys``; all must be present unless ``missing`` is given."""
+        if not len(keys):
+            return np.full(len(wanted), -1 if missing is None else missing, dtype=np.int64)
+        by_key = np.argsort(keys)
+        found = by_key[np.minimum(np.searchsorted(keys, wanted, sorter=by_key), len(keys) - 1)]
+        if missing is None:
+            return found
+        return np.where(keys[found] == wanted, found, missing)
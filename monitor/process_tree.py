@@ -0,0 +1,189 @@
+import numpy as np
+
+from monitor.snapshot_store import row_keys
+
+
+class _Node:
+    __slots__ = ("pid", "create_time", "parent", "children", "cpu", "memory", "total_cpu", "total_memory")
+
+    def __init__(self, pid, create_time, cpu, memory):
+        self.pid = pid
+        self.create_time = create_time
+        self.parent = None  # Key of the parent node, None for a root
+        self.children = set()
+        self.cpu = self.total_cpu = cpu
+        self.memory = self.total_memory = memory
+
+
+class ProcessTree:
+    """Parent/child tree of the processes in consecutive snapshots, with subtree totals.
+
+    Every node carries its own CPU% and memory and the totals of its whole
+    subtree. ``update`` diffs the new snapshot against the previous one and
+    only touches what changed: a process whose values changed adds the
+    difference to itself and its ancestors, a process that exited or was
+    reparented moves its subtree totals from its old ancestors to its new
+    ones, so one cycle costs about (changed processes x tree depth) instead
+    of a walk over the whole tree.
+
+    Nodes are keyed by ``row_keys`` (pid and create_time), so a reused PID
+    is a different node. A parent must have been created no later than its
+    child; a process whose parent is not in the snapshot is a root. Totals
+    are kept in whole units of 0.1 CPU% and 1 KB, so they never drift.
+    """
+
+    def __init__(self):
+        self.snapshot = None
+        self.generation = 0  # Number of updates applied
+        self._nodes = {}  # key -> _Node
+        self._by_pid = {}  # pid -> key of the live process with that pid
+        self._roots = set()
+        self._keys = np.zeros(0, dtype=np.int64)  # Keys of the snapshot rows, and the order sorting them
+        self._key_order = np.zeros(0, dtype=np.int64)
+        self._ppid = np.zeros(0, dtype=np.int32)
+        self._shown = np.zeros((0, 4), dtype=np.int64)  # CPU% x10, memory KB and read and write KB/s x10 of each row
+        # What the last update changed
+        self.removed = set()
+        self.added = set()
+        self.moved = set()  # Still running, under a new parent
+        self.changed = set()  # Own values or subtree totals changed
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def __contains__(self, key):
+        return key in self._nodes
+
+    def roots(self):
+        return list(self._roots)
+
+    def parent(self, key):
+        return self._nodes[key].parent
+
+    def children(self, key):
+        return list(self._nodes[key].children)
+
+    def has_children(self, key):
+        return bool(self._nodes[key].children)
+
+    def totals(self, key):
+        """Return the subtree's (CPU%, memory MB), the process itself included."""
+        node = self._nodes[key]
+        return node.total_cpu / 10, node.total_memory / 1024
+
+    def row(self, key):
+        """Return the row of ``key`` in the current snapshot."""
+        return int(self._key_order[np.searchsorted(self._keys, key, sorter=self._key_order)])
+
+    def update(self, snapshot):
+        """Apply the differences between the previous snapshot and ``snapshot``."""
+        keys = row_keys(snapshot.pid, snapshot.create_time)
+        key_order = np.argsort(keys, kind="stable")
+        shown = np.column_stack((np.rint(snapshot.cpu * 10), np.rint(snapshot.memory_mb * 1024),
+                                 np.rint(snapshot.read_bps / 102.4),
+                                 np.rint(snapshot.write_bps / 102.4))).astype(np.int64)
+        ppid = snapshot.ppid
+
+        # Match the new rows against the previous ones with NumPy; only the differences reach Python
+        old_keys, old_order = self._keys, self._key_order
+        if len(old_keys):
+            position = np.minimum(np.searchsorted(old_keys, keys, sorter=old_order), len(old_keys) - 1)
+            old_rows = old_order[position]
+            found = old_keys[old_rows] == keys
+        else:
+            old_rows = np.zeros(len(keys), dtype=np.int64)
+            found = np.zeros(len(keys), dtype=bool)
+        kept = np.flatnonzero(found)
+        gone = np.ones(len(old_keys), dtype=bool)
+        gone[old_rows[kept]] = False
+        value_changed = kept[(self._shown[old_rows[kept]] != shown[kept]).any(axis=1)]
+        parent_changed = kept[self._ppid[old_rows[kept]] != ppid[kept]]
+        added = np.flatnonzero(~found)
+
+        self.removed, self.added, self.moved, self.changed = set(), set(), set(), set()
+        orphans = set()
+        for key in old_keys[gone].tolist():
+            self._remove(key, orphans)
+        for key, cpu, memory in zip(keys[value_changed].tolist(), shown[value_changed, 0].tolist(),
+                                    shown[value_changed, 1].tolist()):
+            node = self._nodes[key]
+            self._add_to_path(key, cpu - node.cpu, memory - node.memory)
+            node.cpu, node.memory = cpu, memory
+            self.changed.add(key)  # Its I/O rates may be all that changed
+        for i in added.tolist():
+            key = int(keys[i])
+            self._nodes[key] = _Node(int(snapshot.pid[i]), float(snapshot.create_time[i]),
+                                     int(shown[i, 0]), int(shown[i, 1]))
+            self._by_pid[int(snapshot.pid[i])] = key
+            self._roots.add(key)
+            self.added.add(key)
+
+        # Attach new processes and move reparented ones; orphans not reparented yet stay roots
+        relink = np.concatenate((added, parent_changed))
+        for key, parent_pid in zip(keys[relink].tolist(), ppid[relink].tolist()):
+            self._link(key, parent_pid)
+        self.moved |= orphans - self.removed
+
+        self.snapshot = snapshot
+        self.generation += 1
+        self._keys, self._key_order, self._shown, self._ppid = keys, key_order, shown, ppid.copy()
+        self.changed -= self.removed
+
+    def _remove(self, key, orphans):
+        node = self._nodes.pop(key)
+        self._detach(key, node)
+        for child in node.children:
+            self._nodes[child].parent = None
+            self._roots.add(child)
+            orphans.add(child)
+        if self._by_pid.get(node.pid) == key:
+            del self._by_pid[node.pid]
+        self._roots.discard(key)
+        self.removed.add(key)
+
+    def _link(self, key, parent_pid):
+        node = self._nodes[key]
+        parent = self._by_pid.get(parent_pid)
+        if parent is not None and (parent == key or self._nodes[parent].create_time > node.create_time
+                                   or self._is_ancestor(key, parent)):
+            parent = None  # A reused PID or a loop, not the real parent
+        if parent == node.parent:
+            return
+        self._detach(key, node)
+        if parent is None:
+            self._roots.add(key)
+        else:
+            self._roots.discard(key)
+            node.parent = parent
+            self._nodes[parent].children.add(key)
+            self._add_to_path(parent, node.total_cpu, node.total_memory)
+        if key not in self.added:
+            self.moved.add(key)
+
+    def _detach(self, key, node):
+        if node.parent is None:
+            return
+        self._nodes[node.parent].children.discard(key)
+        self._add_to_path(node.parent, -node.total_cpu, -node.total_memory)
+        node.parent = None
+
+    def _is_ancestor(self, key, other):
+        """Return True if ``key`` is ``other`` or one of its ancestors."""
+        while other is not None:
+            if other == key:
+                return True
+            other = self._nodes[other].parent
+        return False
+
+    def _add_to_path(self, key, cpu, memory):
+        """Add to the totals of ``key`` and all of its ancestors."""
+        if not cpu and not memory:
+            return
+        nodes = self._nodes
+        changed = self.changed
+        while key is not None:
+            node = nodes[key]
+            node.total_cpu += cpu
+            node.total_memory += memory
+            changed.add(key)
+            key = node.parent
@@ -0,0 +1,187 @@
+import os
+import time
+from collections import namedtuple
+
+import numpy as np
+import psutil
+
+WRAP = 2 ** 32  # Counters that go backwards from the top half of this range are taken to be 32-bit and wrapped
+POINTS = 120  # Samples kept by a RateHistory: 2 minutes at one sample a second
+DEVICE_COLUMNS = ("Device", "Kind", "In/s", "Out/s")  # Read or received, written or sent
+
+# Per-core busy %, then names and (rows x 2) byte rates of the disks (read, write) and NICs (received, sent)
+RateSample = namedtuple("RateSample", ["timestamp", "core_percent", "disks", "disk_rates", "nics", "nic_rates"])
+
+
+class CounterRates:
+    """Per-second rates of cumulative counters, for rows that come and go between samples.
+
+    Rows are matched to the previous sample by int64 key in one vectorized
+    pass: rows that appear (a hot-plugged disk, a new process) start at a
+    rate of 0 and rows that vanish are dropped. A counter that went
+    backwards either wrapped, if it was in the top half of ``wrap`` (the
+    range of 32-bit NIC counters on some platforms), or was reset, e.g. a
+    device plugged back in under the same name; a reset counts as 0.
+    """
+
+    def __init__(self, wrap=WRAP):
+        self.wrap = wrap
+        self._keys = np.zeros(0, dtype=np.int64)
+        self._order = np.zeros(0, dtype=np.int64)
+        self._counters = np.zeros((0, 0))
+        self._timestamp = None
+
+    def update(self, keys, counters, timestamp):
+        """Return the per-second rates (rows x counters) of ``counters`` since the previous update."""
+        keys = np.asarray(keys, dtype=np.int64)
+        counters = np.asarray(counters, dtype=np.float64)
+        if counters.ndim != 2:
+            counters = counters.reshape(len(keys), -1 if len(keys) else 0)
+        rates = np.zeros(counters.shape)
+        elapsed = timestamp - self._timestamp if self._timestamp is not None else 0.0
+        if len(self._keys) and elapsed > 0 and counters.shape[1] == self._counters.shape[1]:
+            position = np.minimum(np.searchsorted(self._keys, keys, sorter=self._order), len(self._keys) - 1)
+            rows = self._order[position]
+            found = self._keys[rows] == keys
+            previous = self._counters[rows[found]]
+            delta = counters[found] - previous
+            backwards = delta < 0
+            wrapped = backwards & (previous >= self.wrap / 2) & (previous < self.wrap)
+            delta[wrapped] += self.wrap
+            delta[backwards & ~wrapped] = 0.0
+            rates[found] = delta / elapsed
+        self._keys, self._order = keys, np.argsort(keys, kind="stable")
+        self._counters, self._timestamp = counters, timestamp
+        return rates
+
+
+def _whole_disks(names):
+    """Return a mask of the disks that are not partitions, so totals do not count bytes twice."""
+    if os.path.isdir("/sys/block"):
+        disks = set(os.listdir("/sys/block"))
+        return np.array([name in disks for name in names], dtype=bool)
+    return np.ones(len(names), dtype=bool)
+
+
+class SystemRates:
+    """Per-core CPU% and per-disk and per-NIC byte rates, from psutil's cumulative counters.
+
+    Each ``sample`` reads the counters of every core, disk and NIC and turns
+    them into rates in one NumPy pass per kind, so 128 cores cost about
+    what 4 do. Devices are keyed by name, so one that is unplugged and
+    comes back keeps its key; cores are keyed by position.
+    """
+
+    def __init__(self):
+        self.cores = CounterRates(wrap=0)  # CPU times are floats and never wrap
+        self.disks = CounterRates()
+        self.nics = CounterRates()
+        self._device_keys = {}  # Device name -> key
+        self.sample()  # The first sample is the baseline for the next
+
+    def _keys(self, names):
+        return [self._device_keys.setdefault(name, len(self._device_keys)) for name in names]
+
+    def sample(self, timestamp=None):
+        """Return a RateSample of the rates since the previous sample."""
+        if timestamp is None:
+            timestamp = time.time()
+
+        # Busy % per core from the total and idle time deltas; guest time is already in user time on Linux
+        times = psutil.cpu_times(percpu=True)
+        fields = times[0]._fields
+        matrix = np.array(times, dtype=np.float64)
+        guest = [fields.index(name) for name in ("guest", "guest_nice") if name in fields]
+        idle = [fields.index(name) for name in ("idle", "iowait") if name in fields]
+        total = matrix.sum(axis=1) - matrix[:, guest].sum(axis=1)
+        rates = self.cores.update(np.arange(len(times)), np.column_stack((total, matrix[:, idle].sum(axis=1))),
+                                  timestamp)
+        busy = np.zeros(len(times))
+        ticking = rates[:, 0] > 0
+        busy[ticking] = 100.0 * (1.0 - rates[ticking, 1] / rates[ticking, 0])
+        np.clip(busy, 0.0, 100.0, out=busy)
+
+        disks = psutil.disk_io_counters(perdisk=True) or {}
+        disk_counters = [(counters.read_bytes, counters.write_bytes) for counters in disks.values()]
+        disk_rates = self.disks.update(self._keys(disks), disk_counters, timestamp)
+
+        nics = psutil.net_io_counters(pernic=True) or {}
+        nic_counters = [(counters.bytes_recv, counters.bytes_sent) for counters in nics.values()]
+        nic_rates = self.nics.update(self._keys(nics), nic_counters, timestamp)
+
+        return RateSample(timestamp, busy, list(disks), disk_rates, list(nics), nic_rates)
+
+
+class RateHistory:
+    """The last ``points`` RateSamples: per-core CPU% for a heatmap and disk and network totals.
+
+    Totals leave out partitions (their bytes are already in their disk's)
+    and loopback interfaces. A change in the number of cores (CPUs taken
+    offline or brought back) restarts the heatmap.
+    """
+
+    def __init__(self, points=POINTS):
+        self.points = points
+        self.times = np.zeros(points)
+        self.disk = np.zeros((points, 2))
+        self.network = np.zeros((points, 2))
+        self.cores = np.zeros((points, 0), dtype=np.float32)
+        self.count = 0
+        self.latest = None
+
+    def __len__(self):
+        return min(self.count, self.points)
+
+    def append(self, sample):
+        if sample.core_percent.shape[0] != self.cores.shape[1]:
+            self.cores = np.zeros((self.points, len(sample.core_percent)), dtype=np.float32)
+            self.count = 0
+        row = self.count % self.points
+        self.times[row] = sample.timestamp
+        self.cores[row] = sample.core_percent
+        # Diskless VMs and containers may have no disks, and then no (rows x 2) shape to sum over
+        self.disk[row] = sample.disk_rates[_whole_disks(sample.disks)].sum(axis=0) if len(sample.disks) else 0.0
+        loopback = np.array([name == "lo" or name.startswith("Loopback") for name in sample.nics], dtype=bool)
+        self.network[row] = sample.nic_rates[~loopback].sum(axis=0) if len(sample.nics) else 0.0
+        self.count += 1
+        self.latest = sample
+
+    def _order(self):
+        # Ring rows, oldest first
+        if self.count <= self.points:
+            return np.arange(self.count)
+        return (np.arange(self.points) + self.count) % self.points
+
+    def core_matrix(self):
+        """Return the per-core CPU% as (cores x samples), oldest sample first."""
+        return self.cores[self._order()].T
+
+    def series(self):
+        """Return (times, disk read/write, network received/sent) rows, oldest first."""
+        order = self._order()
+        return self.times[order], self.disk[order], self.network[order]
+
+
+def device_rows(sample):
+    """Return the display strings (DEVICE_COLUMNS) of every disk and NIC in a RateSample."""
+    return [(name, kind, format_rate(rate[0]), format_rate(rate[1]))
+            for kind, names, rates in (("Disk", sample.disks, sample.disk_rates),
+                                       ("Network", sample.nics, sample.nic_rates))
+            for name, rate in zip(names, rates.tolist())]
+
+
+def heat_palette(count=101):
+    """Return ``count`` RGB colours (uint8) from idle dark blue through green and yellow to busy red."""
+    stops = np.array([(20, 30, 60), (30, 120, 200), (60, 190, 90), (240, 220, 50), (230, 50, 40)], dtype=np.float64)
+    positions = np.linspace(0, 1, len(stops))
+    x = np.linspace(0, 1, count)
+    return np.column_stack([np.interp(x, positions, stops[:, channel]) for channel in range(3)]).astype(np.uint8)
+
+
+def format_rate(bytes_per_second):
+    """Return a byte rate as a short string, e.g. "1.2 MB/s"."""
+    for unit in ("B/s", "KB/s", "MB/s"):
+        if bytes_per_second < 1024:
+            return f"{bytes_per_second:.0f} {unit}" if unit == "B/s" else f"{bytes_per_second:.1f} {unit}"
+        bytes_per_second /= 1024
+    return f"{bytes_per_second:.1f} GB/s"
@@ -0,0 +1,108 @@
+import tkinter as tk
+from tkinter import ttk
+
+import numpy as np
+
+from monitor.process_history import sparkline_points
+from monitor.rates import DEVICE_COLUMNS, device_rows, format_rate, heat_palette
+from monitor.table_sync import TreeviewSync
+
+HEATMAP_SIZE = (480, 256)  # Cores are scaled to fill the height, up to 16 px each
+GRAPH_SIZE = (480, 70)
+GRAPHS = (("Disk", "read", "write"), ("Network", "received", "sent"))
+_PALETTE = np.array(["#%02x%02x%02x" % tuple(rgb) for rgb in heat_palette().tolist()])
+
+
+class RatesPanel(ttk.Frame):
+    """Tk view of a RateHistory: a per-core CPU heatmap, disk and network graphs and a row per device.
+
+    The heatmap has a row per core and a column per sample, newest on the
+    right, from idle blue to busy red, so one pegged core out of 128 stands
+    out where the average would hide it; hovering shows the value. Call
+    ``refresh`` after appending to the history while the panel is shown.
+    """
+
+    def __init__(self, parent, history):
+        super().__init__(parent)
+        self.history = history
+        self._scale = (1, 1)  # Pixels per sample and per core
+        self._small = self._image = None
+
+        self.heat_label = ttk.Label(self, text="Per-core CPU", font=("Arial", 10, "bold"))
+        self.heat_label.pack(anchor=tk.W, padx=5, pady=(5, 0))
+        self.heat_canvas = tk.Canvas(self, width=HEATMAP_SIZE[0], height=HEATMAP_SIZE[1], highlightthickness=0,
+                                     background="#1e1e1e")
+        self.heat_canvas.pack(anchor=tk.W, padx=5)
+        self.heat_canvas.create_image(0, 0, anchor=tk.NW, tags="heat")
+        self.heat_canvas.bind("<Motion>", self.show_cell)
+        self.cell_label = ttk.Label(self, text="")
+        self.cell_label.pack(anchor=tk.W, padx=5)
+
+        self.graph_labels = []
+        self.graph_canvases = []
+        for _ in GRAPHS:
+            label = ttk.Label(self, text="")
+            label.pack(anchor=tk.W, padx=5, pady=(5, 0))
+            canvas = tk.Canvas(self, width=GRAPH_SIZE[0], height=GRAPH_SIZE[1], highlightthickness=0,
+                               background="#1e1e1e")
+            canvas.pack(anchor=tk.W, padx=5)
+            canvas.create_line(0, 0, 0, 0, fill="cyan", tags="in")
+            canvas.create_line(0, 0, 0, 0, fill="orange", tags="out")
+            canvas.create_text(3, 2, anchor=tk.NW, fill="white", font=("Arial", 8), tags="top")
+            self.graph_labels.append(label)
+            self.graph_canvases.append(canvas)
+
+        self.devices = ttk.Treeview(self, columns=DEVICE_COLUMNS, show="headings", height=6)
+        for column in DEVICE_COLUMNS:
+            self.devices.heading(column, text=column)
+            self.devices.column(column, width=100, anchor=tk.E)
+        self.devices.column("Device", width=160, anchor=tk.W)
+        self.devices.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+        self.devices_sync = TreeviewSync(self.devices)
+
+    def refresh(self):
+        history = self.history
+        if not len(history):
+            return
+        self._draw_heatmap(history.core_matrix())
+
+        times, disk, network = history.series()
+        span = max(times[-1] - times[0], 1.0)
+        for (title, inward, outward), label, canvas, rates in zip(GRAPHS, self.graph_labels, self.graph_canvases,
+                                                                  (disk, network)):
+            label.config(text=f"{title}: {format_rate(rates[-1, 0])} {inward}, {format_rate(rates[-1, 1])} {outward}")
+            top = max(float(rates.max()) * 1.1, 1024.0)
+            for tag, values in (("in", rates[:, 0]), ("out", rates[:, 1])):
+                points = sparkline_points(times, values, GRAPH_SIZE[0], GRAPH_SIZE[1], span, top)
+                canvas.coords(tag, *(points if len(points) >= 4 else [0, 0, 0, 0]))
+            canvas.itemconfigure("top", text=format_rate(top))
+
+        self.devices_sync.update([((row[1], row[0]), row, ()) for row in device_rows(history.latest)])
+
+    def _draw_heatmap(self, matrix):
+        cores, count = matrix.shape
+        points = self.history.points
+        scale = (max(1, HEATMAP_SIZE[0] // points), max(1, min(16, HEATMAP_SIZE[1] // max(cores, 1))))
+        if scale != self._scale or self._small is None or self._small.height() != cores:
+            self._scale = scale
+            self.heat_canvas.config(width=points * scale[0], height=cores * scale[1])
+            self.heat_label.config(text=f"Per-core CPU, {cores} cores")
+        # Build the image at one pixel per cell, then scale it up; Tk takes rows of colour names
+        colors = _PALETTE[np.clip(np.rint(matrix), 0, 100).astype(np.intp)]
+        small = tk.PhotoImage(width=points, height=cores)
+        if count:
+            small.put(" ".join("{" + " ".join(row) + "}" for row in colors.tolist()), to=(points - count, 0))
+        self._small = small
+        self._image = small.zoom(*scale)
+        self.heat_canvas.itemconfigure("heat", image=self._image)
+
+    def show_cell(self, event):
+        matrix = self.history.core_matrix()
+        core = event.y // self._scale[1]
+        column = event.x // self._scale[0] - (self.history.points - matrix.shape[1])
+        if 0 <= core < matrix.shape[0] and 0 <= column < matrix.shape[1]:
+            seconds = self.history.series()[0]
+            ago = seconds[-1] - seconds[column]
+            self.cell_label.config(text=f"Core {core}: {matrix[core, column]:.0f}% ({ago:.0f} s ago)")
+        else:
+            self.cell_label.config(text="")
@@ -0,0 +1,5 @@
+from collections import namedtuple
+
+# ppid is 0 when the parent is unknown; read_bytes and write_bytes are cumulative I/O counters, 0 when unreadable
+ProcessRecord = namedtuple("ProcessRecord", ["pid", "create_time", "name", "cpu_percent", "memory_mb", "ppid",
+                                             "read_bytes", "write_bytes"], defaults=(0, 0, 0))
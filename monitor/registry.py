@@ -0,0 +1,69 @@
+import psutil
+
+from monitor.records import ProcessRecord
+
+
+class ProcessRegistry:
+    """Keep primed ``psutil.Process`` objects alive between refreshes.
+
+    ``cpu_percent`` measures against the previous call on the same object, so
+    a fresh ``Process`` always reports 0.0. The registry keeps one object per
+    live process, keyed by (pid, create_time), drops it once the process
+    exits and replaces it when the PID is reused by a new process.
+    """
+
+    def __init__(self):
+        self._processes = {}  # pid -> psutil.Process
+
+    def __len__(self):
+        return len(self._processes)
+
+    def scan(self):
+        """Return a ProcessRecord for every running process."""
+        return self.collect(psutil.pids())
+
+    def collect(self, pids):
+        """Return a ProcessRecord for each of ``pids`` that is still running.
+
+        Only the given PIDs are kept in the registry afterwards.
+        """
+        records = []
+        processes = {}
+        for pid in pids:
+            proc = self._processes.get(pid)
+            if proc is not None and not proc.is_running():
+                proc = None  # The PID now belongs to a different process
+
+            try:
+                if proc is None:
+                    proc = psutil.Process(pid)
+                record = self._read(proc)
+            except (psutil.NoSuchProcess, psutil.ZombieProcess, psutil.AccessDenied):
+                continue
+
+            processes[pid] = proc
+            records.append(record)
+
+        # Processes that exited are simply not carried over
+        self._processes = processes
+        return records
+
+    def _read(self, proc):
+        # Every attribute comes from the same oneshot() pass over /proc or the kernel
+        with proc.oneshot():
+            create_time = proc.create_time()
+            name = proc.name()
+            ppid = proc.ppid()
+            try:
+                cpu_percent = proc.cpu_percent(interval=None)
+                memory_mb = proc.memory_info().rss / (1024 ** 2)
+            except psutil.AccessDenied:
+                cpu_percent = memory_mb = 0.0
+            try:
+                io = proc.io_counters()
+                read_bytes, write_bytes = io.read_bytes, io.write_bytes
+            except (psutil.AccessDenied, AttributeError):
+                # Other users' processes, and platforms without per-process I/O counters (macOS)
+                read_bytes = write_bytes = 0
+
+        return ProcessRecord(proc.pid, create_time, name, cpu_percent, memory_mb, ppid, read_bytes, write_bytes)
@@ -0,0 +1,313 @@
+import socket
+import struct
+import sys
+import time
+
+import numpy as np
+
+from monitor.snapshot_store import NameTable, ProcessSnapshot, row_keys
+
+FRAME_HEADER = struct.Struct("<IB")  # body length, frame type
+MAX_FRAME = 256 * 1024 * 1024  # Longer bodies are corrupt headers, not process tables
+KEYFRAME = 1
+DELTA = 2
+HELLO = 3  # Sent by the agent as soon as a viewer connects
+HELLO_BODY = struct.Struct("<4sHd")  # magic, protocol version, the agent's sampling interval in seconds
+HELLO_PREFIX = struct.Struct("<4sH")  # The part of the hello every version keeps
+PROTOCOL_MAGIC = b"MONP"
+PROTOCOL_VERSION = 3  # Bump whenever the frame or row layout changes (2 added ppid, 3 the I/O rates)
+BODY_HEADER = struct.Struct("<dffIII")  # timestamp, cpu %, memory %, new names, removed rows, upserted rows
+NAME_ENTRY = struct.Struct("<IH")  # name id, encoded length
+ROW_DTYPE = np.dtype([
+    ("key", "<i8"), ("create_time", "<f8"), ("pid", "<i4"), ("name_id", "<i4"), ("cpu", "<f4"), ("memory_mb", "<f4"),
+    ("ppid", "<i4"), ("read_bps", "<f4"), ("write_bps", "<f4"),
+])
+
+def parse_address(address):
+    """Return (socket family, address) for "host:port" or "unix:/path/to/socket"."""
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[5:]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "0.0.0.0", int(port))
+
+
+def format_address(family, address):
+    """Inverse of parse_address."""
+    if family == socket.AF_UNIX:
+        return f"unix:{address}"
+    return f"{address[0]}:{address[1]}"
+
+
+class ProtocolError(ConnectionError):
+    """The peer is not a monitor.agent, or speaks another protocol version."""
+
+
+def _recv_exact(sock, size):
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        count = sock.recv_into(view[received:])
+        if not count:
+            raise ConnectionError("connection closed by peer")
+        received += count
+    return buffer
+
+
+def read_frame(sock):
+    """Read one frame and return (frame type, body)."""
+    length, frame_type = FRAME_HEADER.unpack(_recv_exact(sock, FRAME_HEADER.size))
+    check_length(length)
+    return frame_type, _recv_exact(sock, length)
+
+
+def check_length(length):
+    """Raise ProtocolError for a frame header announcing an impossibly long body."""
+    if length > MAX_FRAME:
+        raise ProtocolError(f"frame of {length} bytes; the stream is corrupt")
+
+
+def hello_frame(interval):
+    """Return the frame an agent greets each viewer with, announcing its protocol version and how often it samples."""
+    body = HELLO_BODY.pack(PROTOCOL_MAGIC, PROTOCOL_VERSION, interval)
+    return FRAME_HEADER.pack(len(body), HELLO) + body
+
+
+def _frame(frame_type, timestamp, cpu_percent, memory_percent, names, removed, upserts):
+    encoded_names = b"".join(NAME_ENTRY.pack(name_id, len(data)) + data for name_id, data in names)
+    body = b"".join((
+        BODY_HEADER.pack(timestamp, cpu_percent, memory_percent, len(names), len(removed), len(upserts)),
+        removed.astype("<i8", copy=False).tobytes(),
+        upserts.tobytes(),
+        encoded_names,
+    ))
+    return FRAME_HEADER.pack(len(body), frame_type) + body
+
+
+class DeltaEncoder:
+    """Turn consecutive snapshots into compact binary frames (agent side).
+
+    A delta frame carries the system readings, the names first seen since
+    the previous frame, the keys of processes that exited and only the rows
+    that are new or whose parent, CPU% (to 0.1) or memory (to 0.01 MB)
+    changed. The comparison is against what was last sent, so small changes
+    never add up to drift. A keyframe carries the full state for new viewers.
+    """
+
+    def __init__(self):
+        self._rows = np.zeros(0, dtype=ROW_DTYPE)  # Last sent state, sorted by key
+        self._names = None
+        self._names_sent = 0
+        self._system = (0.0, 0.0, 0.0)
+
+    def encode(self, snapshot):
+        """Return the delta frame that brings viewers from the previous snapshot to ``snapshot``."""
+        rows = np.empty(len(snapshot), dtype=ROW_DTYPE)
+        rows["key"] = row_keys(snapshot.pid, snapshot.create_time)
+        rows["create_time"] = snapshot.create_time
+        rows["pid"] = snapshot.pid
+        rows["name_id"] = snapshot.name_id
+        rows["cpu"] = snapshot.cpu
+        rows["memory_mb"] = snapshot.memory_mb
+        rows["ppid"] = snapshot.ppid
+        rows["read_bps"] = snapshot.read_bps
+        rows["write_bps"] = snapshot.write_bps
+        rows = rows[np.argsort(rows["key"], kind="stable")]
+
+        previous = self._rows
+        if len(previous):
+            position = np.minimum(np.searchsorted(previous["key"], rows["key"]), len(previous) - 1)
+            matched = previous[position]
+            found = matched["key"] == rows["key"]
+            same = (found
+                    & (matched["name_id"] == rows["name_id"])
+                    & (matched["ppid"] == rows["ppid"])
+                    & (np.rint(matched["cpu"] * 10) == np.rint(rows["cpu"] * 10))
+                    & (np.rint(matched["memory_mb"] * 100) == np.rint(rows["memory_mb"] * 100))
+                    # I/O rates to the nearest KB/s
+                    & (np.rint(matched["read_bps"] / 1024) == np.rint(rows["read_bps"] / 1024))
+                    & (np.rint(matched["write_bps"] / 1024) == np.rint(rows["write_bps"] / 1024)))
+            rows[same] = matched[same]
+            upserts = rows[~same]
+            removed = previous["key"][~np.isin(previous["key"], rows["key"], assume_unique=True)]
+        else:
+            upserts = rows
+            removed = np.zeros(0, dtype=np.int64)
+
+        names = snapshot.names
+        if names is not self._names:
+            self._names, self._names_sent = names, 0
+        new_names = self._name_entries(self._names_sent)
+        self._names_sent = len(names)
+        self._rows = rows
+        self._system = (snapshot.timestamp, snapshot.cpu_percent, snapshot.memory_percent)
+        return _frame(DELTA, *self._system, new_names, removed, upserts)
+
+    def keyframe(self):
+        """Return a frame carrying the full state last encoded."""
+        return _frame(KEYFRAME, *self._system, self._name_entries(0, self._names_sent),
+                      np.zeros(0, dtype=np.int64), self._rows)
+
+    def _name_entries(self, start, end=None):
+        if self._names is None:
+            return []
+        names = self._names.names
+        end = len(self._names) if end is None else end
+        return [(name_id, names[name_id].encode("utf-8")[:0xFFFF]) for name_id in range(start, end)]
+
+
+class DeltaDecoder:
+    """Rebuild snapshots from keyframes and deltas (viewer side).
+
+    The first frame must be a hello of this ``PROTOCOL_VERSION``; anything
+    else raises ProtocolError rather than misreading rows of another layout,
+    as does a truncated or corrupt frame. After a ProtocolError the decoder
+    state is undefined: reconnect and start over with a new decoder.
+    """
+
+    def __init__(self):
+        self.names = NameTable()
+        self._name_map = np.zeros(0, dtype=np.int32)  # agent name id -> local name id
+        self._rows = np.zeros(0, dtype=ROW_DTYPE)
+        self._synced = False
+        self._greeted = False
+        self.interval = 0.0  # The agent's sampling interval, from its hello frame
+
+    def apply(self, frame_type, body):
+        """Apply one frame and return the resulting ProcessSnapshot, or None for a hello or before a keyframe."""
+        try:
+            return self._apply(frame_type, body)
+        except (ValueError, IndexError, struct.error) as e:
+            raise ProtocolError(f"malformed frame: {e}") from e
+
+    def _apply(self, frame_type, body):
+        if frame_type == HELLO:
+            self._hello(body)
+            return None
+        if not self._greeted:
+            raise ProtocolError("the peer did not send a hello frame; it is not a monitor.agent, "
+                                f"or one older than protocol version {PROTOCOL_VERSION}")
+        if frame_type not in (KEYFRAME, DELTA):
+            raise ProtocolError(f"unknown frame type {frame_type}")
+        timestamp, cpu_percent, memory_percent, name_count, removed_count, upsert_count = \
+            BODY_HEADER.unpack_from(body, 0)
+        offset = BODY_HEADER.size
+        removed = np.frombuffer(body, "<i8", removed_count, offset)
+        offset += removed.nbytes
+        upserts = np.frombuffer(body, ROW_DTYPE, upsert_count, offset)
+        offset += upserts.nbytes
+        for _ in range(name_count):
+            name_id, length = NAME_ENTRY.unpack_from(body, offset)
+            offset += NAME_ENTRY.size
+            self._map_name(name_id, bytes(body[offset:offset + length]).decode("utf-8", "replace"))
+            offset += length
+
+        if frame_type == KEYFRAME:
+            self._rows = upserts.copy()
+            self._synced = True
+        elif not self._synced:
+            return None
+        else:
+            self._merge(removed, upserts)
+
+        rows = self._rows
+        return ProcessSnapshot(timestamp, cpu_percent, memory_percent, self.names, rows["pid"].copy(),
+                               rows["create_time"].copy(), self._name_map[rows["name_id"]],
+                               rows["cpu"].copy(), rows["memory_mb"].copy(), rows["ppid"].copy(),
+                               rows["read_bps"].copy(), rows["write_bps"].copy())
+
+    def _hello(self, body):
+        if len(body) < HELLO_PREFIX.size or HELLO_PREFIX.unpack_from(body, 0)[0] != PROTOCOL_MAGIC:
+            raise ProtocolError("the peer is not a monitor.agent")
+        version = HELLO_PREFIX.unpack_from(body, 0)[1]
+        if version != PROTOCOL_VERSION:
+            raise ProtocolError(f"the agent speaks protocol version {version} but this viewer speaks "
+                                f"version {PROTOCOL_VERSION}; run the same monitor version on both ends")
+        _, _, self.interval = HELLO_BODY.unpack_from(body, 0)
+        self._greeted = True
+
+    def _map_name(self, name_id, name):
+        if name_id >= len(self._name_map):
+            grown = np.zeros(max(name_id + 1, 2 * len(self._name_map)), dtype=np.int32)
+            grown[:len(self._name_map)] = self._name_map
+            self._name_map = grown
+        self._name_map[name_id] = self.names.intern(name)
+
+    def _merge(self, removed, upserts):
+        rows = self._rows
+        if len(removed):
+            rows = rows[~np.isin(rows["key"], removed)]
+        if len(upserts):
+            position = np.minimum(np.searchsorted(rows["key"], upserts["key"]), max(len(rows) - 1, 0))
+            found = (rows["key"][position] == upserts["key"]) if len(rows) else np.zeros(len(upserts), dtype=bool)
+            rows[position[found]] = upserts[found]
+            if not found.all():
+                rows = np.concatenate((rows, upserts[~found]))
+                rows = rows[np.argsort(rows["key"], kind="stable")]
+        self._rows = rows
+
+
+class RemoteFeed:
+    """Receive snapshots streamed by an agent; use an instance as a ProcessSampler's ``collect``.
+
+    Each call blocks for the next frame and returns the rebuilt snapshot.
+    The agent's hello frame announces its sampling interval, and reads wait
+    up to ``timeout`` plus two intervals, so a slowly sampling agent is not
+    taken for a dead one. A lost connection is retried every
+    ``retry_delay`` seconds, resynchronising from the agent's keyframe. An
+    agent of another protocol version or a corrupt frame is reported on
+    stderr and kept in ``error``; the call raises ProtocolError (an
+    OSError, so the sampler counts a failed cycle) and the next one
+    reconnects after ``retry_delay``.
+    """
+
+    def __init__(self, address, timeout=5.0, retry_delay=2.0):
+        self.address = address
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.bytes_received = 0
+        self.error = None  # Why the agent was rejected, until a snapshot arrives
+        self._sock = None
+        self._decoder = None
+
+    def __call__(self):
+        if self._sock is None and not self._connect():
+            return None
+        try:
+            frame_type, body = read_frame(self._sock)
+            self.bytes_received += FRAME_HEADER.size + len(body)
+            snapshot = self._decoder.apply(frame_type, body)
+        except ProtocolError as e:
+            self.close()
+            if str(e) != self.error:
+                print(f"Rejected agent {self.address}: {e}", file=sys.stderr)
+            self.error = str(e)
+            time.sleep(self.retry_delay)  # Reconnecting at once would only hit the same agent again
+            raise
+        except OSError:
+            self.close()
+            return None
+        if frame_type == HELLO:
+            self._sock.settimeout(self.timeout + 2 * self._decoder.interval)
+        elif snapshot is not None:
+            self.error = None
+        return snapshot
+
+    def close(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+
+    def _connect(self):
+        family, address = parse_address(self.address)
+        sock = socket.socket(family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(address)
+        except OSError:
+            sock.close()
+            time.sleep(self.retry_delay)
+            return False
+        self._sock = sock
+        self._decoder = DeltaDecoder()
+        return True
@@ -0,0 +1,305 @@
+import fnmatch
+import json
+import os
+import re
+from collections import namedtuple
+
+import numpy as np
+import psutil
+
+from monitor.snapshot_store import row_keys
+
+FIELDS = ("name", "cmdline", "user", "exe")
+ACTIONS = ("notify", "terminate")
+TAG_COLORS = {"unwanted": "red"}  # Row colour of a tag in the process tables
+TAG_COLOR = "dark orange"  # Colour of any other tag
+
+# The rules used without a rules file: highlight a few known-bad names
+DEFAULT_RULES = [
+    {"name": "unwanted", "match": {"name": ["unwanted.exe", "malware.exe", "suspicious.exe"]}, "tag": "unwanted"},
+]
+
+Firing = namedtuple("Firing", ["rule", "action", "pid", "create_time", "name"])
+
+
+def _pattern(text):
+    """Return the regex of a rule pattern: "re:<regex>" matches anywhere, anything else is a whole-value glob."""
+    if text.startswith("re:"):
+        return text[3:]
+    return "^" + fnmatch.translate(text)
+
+
+def _number(rule, spec, key, default=None):
+    """Return a numeric rule setting, rejecting anything else (including true/false) with a ValueError.
+
+    null is only accepted for settings that are off by default (``default`` None).
+    """
+    value = spec.get(key, default)
+    if value is None and default is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError(f"Rule {rule!r}: {key} must be a number of at least 0, not {value!r}")
+    return value
+
+
+def tag_color(tag):
+    """Return the colour process tables show rows tagged ``tag`` in."""
+    return TAG_COLORS.get(tag, TAG_COLOR)
+
+
+def psutil_details(pid):
+    """Return the cmdline, user and exe of a local process, as strings ("" when unreadable)."""
+    details = dict.fromkeys(("cmdline", "user", "exe"), "")
+    try:
+        process = psutil.Process(pid)
+        with process.oneshot():
+            for field, read in (("cmdline", lambda: " ".join(process.cmdline())),
+                                ("user", process.username), ("exe", process.exe)):
+                try:
+                    details[field] = read()
+                except (psutil.AccessDenied, psutil.ZombieProcess, OSError):
+                    pass
+    except psutil.NoSuchProcess:
+        pass
+    return details
+
+
+class Rule:
+    """One parsed rule: field patterns, optional thresholds and what to do on a match.
+
+    A process matches when, for every field the rule names, one of the
+    field's patterns matches. Thresholds (``cpu_above`` %, ``memory_above_mb``)
+    must then hold for ``for_seconds`` before the rule is active. Every value
+    is type-checked here, so a malformed rule fails to load with a
+    ValueError rather than failing later, on every evaluation.
+    """
+
+    def __init__(self, spec):
+        if not isinstance(spec, dict):
+            raise ValueError(f"A rule must be an object, not {spec!r}")
+        unknown = set(spec) - {"name", "match", "cpu_above", "memory_above_mb", "for_seconds", "tag", "action"}
+        if unknown:
+            raise ValueError(f"Unknown rule keys: {', '.join(sorted(unknown))}")
+        self.name = spec.get("name", "rule")
+        if not isinstance(self.name, str):
+            raise ValueError(f"A rule name must be a string, not {self.name!r}")
+        match = spec.get("match", {})
+        if not isinstance(match, dict):
+            raise ValueError(f"Rule {self.name!r}: match must be an object of field patterns, not {match!r}")
+        self.patterns = {}  # field -> compiled alternation of the field's patterns
+        for field, patterns in match.items():
+            if field not in FIELDS:
+                raise ValueError(f"Rule {self.name!r}: unknown field {field!r}, expected one of {', '.join(FIELDS)}")
+            if isinstance(patterns, str):
+                patterns = [patterns]
+            if not isinstance(patterns, list) or not patterns or not all(isinstance(p, str) for p in patterns):
+                raise ValueError(f"Rule {self.name!r}: {field} takes a pattern or a list of patterns, not {patterns!r}")
+            try:
+                self.patterns[field] = re.compile("|".join(f"(?:{_pattern(p)})" for p in patterns), re.IGNORECASE)
+            except re.error as e:
+                raise ValueError(f"Rule {self.name!r}: bad {field} pattern: {e}") from None
+        self.cpu_above = _number(self.name, spec, "cpu_above")
+        self.memory_above_mb = _number(self.name, spec, "memory_above_mb")
+        self.for_seconds = float(_number(self.name, spec, "for_seconds", 0))
+        self.tag = spec.get("tag")
+        if self.tag is not None and not isinstance(self.tag, str):
+            raise ValueError(f"Rule {self.name!r}: tag must be a string, not {self.tag!r}")
+        self.action = spec.get("action")
+        if self.action is not None and self.action not in ACTIONS:
+            raise ValueError(f"Rule {self.name!r}: unknown action {self.action!r}, expected one of {', '.join(ACTIONS)}")
+
+
+class RuleResult:
+    """What the rules found in one snapshot."""
+
+    def __init__(self, count):
+        self._count = count
+        self.tags = {}  # tag -> bool mask over the snapshot rows
+        self.fired = []  # Firings of rules with an action, each once per process and episode
+
+    def tagged(self, tag):
+        """Return the mask of the rows an active rule tagged with ``tag``."""
+        mask = self.tags.get(tag)
+        return mask if mask is not None else np.zeros(self._count, dtype=bool)
+
+    def row_tags(self, i):
+        """Return the tags of row ``i``, for a Treeview item."""
+        return tuple(tag for tag, mask in self.tags.items() if mask[i])
+
+
+class RuleEngine:
+    """Evaluate process rules against every snapshot, doing per-process work only for new processes.
+
+    All patterns of a field are compiled into one regex, used to reject the
+    common case (no rule matches) with a single search. Which rules a
+    process matches is worked out once, when its (pid, create_time) first
+    appears; names are checked once per distinct name, and cmdline, user
+    and exe are only read (through ``details(pid)``) when some rule needs
+    them. Threshold conditions are tracked per rule for the processes that
+    currently meet them, so a cycle costs O(new processes + processes over
+    a threshold) in Python plus a few vectorized passes.
+
+    Rules come from ``rules`` (a list of dicts) or a JSON file at ``path``
+    with a ``"rules"`` list, which ``reload_if_changed`` reloads when the
+    file changes. A file that fails to load keeps the previous rules and
+    sets ``error``.
+    """
+
+    def __init__(self, path=None, rules=None, details=None):
+        self.path = path
+        self.details = details  # pid -> {"cmdline", "user", "exe"}, None where processes cannot be inspected
+        self.error = None
+        self._mtime = None
+        if path is not None:
+            self._mtime = os.stat(path).st_mtime
+            rules = self._read(path)
+        self._set_rules(rules if rules is not None else DEFAULT_RULES)
+
+    @property
+    def tags(self):
+        """Return the tags the current rules can add to rows."""
+        return {rule.tag for rule in self.rules if rule.tag is not None}
+
+    def reload_if_changed(self):
+        """Reload the rules file if it changed; return True if new rules were loaded."""
+        if self.path is None:
+            return False
+        try:
+            mtime = os.stat(self.path).st_mtime
+            if mtime == self._mtime:
+                return False
+            self._mtime = mtime
+            self._set_rules(self._read(self.path))
+        except (OSError, ValueError) as e:
+            self.error = f"{self.path}: {e}"
+            return False
+        self.error = None
+        return True
+
+    def evaluate(self, snapshot):
+        """Return the RuleResult for ``snapshot``."""
+        keys = row_keys(snapshot.pid, snapshot.create_time)
+        matched = self._match(snapshot, keys)
+        result = RuleResult(len(snapshot))
+
+        for r, rule in enumerate(self.rules):
+            condition = matched[:, r]
+            if rule.cpu_above is not None:
+                condition = condition & (snapshot.cpu > rule.cpu_above)
+            if rule.memory_above_mb is not None:
+                condition = condition & (snapshot.memory_mb > rule.memory_above_mb)
+
+            # Only processes meeting the condition are tracked; the rest start over
+            rows = np.flatnonzero(condition)
+            since, fired = self._since[r], self._fired[r]
+            now = snapshot.timestamp
+            self._since[r] = {key: since.get(key, now) for key in keys[rows].tolist()}
+            self._fired[r] = fired & self._since[r].keys()
+            active = np.zeros(len(snapshot), dtype=bool)
+            for i, key in zip(rows.tolist(), keys[rows].tolist()):
+                if now - self._since[r][key] < rule.for_seconds:
+                    continue
+                active[i] = True
+                if rule.action is not None and key not in self._fired[r]:
+                    self._fired[r].add(key)
+                    result.fired.append(Firing(rule.name, rule.action, int(snapshot.pid[i]),
+                                               float(snapshot.create_time[i]), snapshot.name(i)))
+            if rule.tag is not None:
+                result.tags[rule.tag] = result.tagged(rule.tag) | active
+        return result
+
+    def _read(self, path):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+        if not isinstance(config, dict) or not isinstance(config.get("rules"), list):
+            raise ValueError('expected an object with a "rules" list')
+        return config["rules"]
+
+    def _set_rules(self, specs):
+        rules = [Rule(spec) for spec in specs]
+        # One alternation per field, to reject processes no rule could match with one search
+        combined = {}
+        for field in FIELDS:
+            patterns = [rule.patterns[field].pattern for rule in rules if field in rule.patterns]
+            if patterns:
+                try:
+                    combined[field] = re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+                except re.error as e:
+                    raise ValueError(f"bad {field} patterns: {e}") from None
+        # New rules start from scratch: every process is matched again and timers restart
+        self.rules, self._any = rules, combined
+        self._name_hits = {}  # name id -> tuple of booleans, one per rule, for the name patterns alone
+        self._keys = np.zeros(0, dtype=np.int64)  # Processes already matched, sorted, and their rule matches
+        self._matched = np.zeros((0, len(self.rules)), dtype=bool)
+        self._since = [{} for _ in self.rules]  # Per rule: key -> when the condition started to hold
+        self._fired = [set() for _ in self.rules]  # Per rule: keys whose action already fired this episode
+
+    def _match(self, snapshot, keys):
+        """Return the (rows x rules) matrix of pattern matches, matching only processes not seen before."""
+        matched = np.zeros((len(keys), len(self.rules)), dtype=bool)
+        if len(self._keys):
+            position = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+            seen = self._keys[position] == keys
+            matched[seen] = self._matched[position[seen]]
+        else:
+            seen = np.zeros(len(keys), dtype=bool)
+
+        new = np.flatnonzero(~seen)
+        if len(new) and self.rules:
+            matched[new] = [self._match_process(snapshot, i) for i in new.tolist()]
+
+        order = np.argsort(keys)
+        self._keys, self._matched = keys[order], matched[order]
+        return matched
+
+    def _match_process(self, snapshot, i):
+        name_id = int(snapshot.name_id[i])
+        name_hits = self._name_hits.get(name_id)
+        if name_hits is None:
+            name = snapshot.names.names[name_id]
+            if "name" in self._any and self._any["name"].search(name):
+                name_hits = tuple("name" not in rule.patterns or bool(rule.patterns["name"].search(name))
+                                  for rule in self.rules)
+            else:
+                name_hits = tuple("name" not in rule.patterns for rule in self.rules)
+            self._name_hits[name_id] = name_hits
+        if not any(hit and rule.patterns.keys() - {"name"} for hit, rule in zip(name_hits, self.rules)):
+            return name_hits  # No rule left that needs cmdline, user or exe
+
+        details = self.details(int(snapshot.pid[i])) if self.details is not None else None
+        if details is None:
+            # Without cmdline, user and exe, only rules on the name alone can match
+            return tuple(hit and set(rule.patterns) <= {"name"} for hit, rule in zip(name_hits, self.rules))
+        hits = {field: bool(self._any[field].search(details[field])) for field in self._any if field != "name"}
+        return tuple(hit and all(hits[field] and rule.patterns[field].search(details[field])
+                                 for field in rule.patterns if field != "name")
+                     for hit, rule in zip(name_hits, self.rules))
+
+
+def run_actions(fired, notify, can_terminate=True):
+    """Carry out a batch of firings: terminate in one pass, then notify once for the whole batch.
+
+    ``notify(messages)`` receives one line per firing. A terminate checks
+    the create time first, so a reused PID is never killed.
+    """
+    messages = []
+    for firing in fired:
+        if firing.action == "terminate":
+            if not can_terminate:
+                messages.append(f"{firing.rule}: {firing.name} ({firing.pid}) matched, but it is not a local process")
+                continue
+            try:
+                process = psutil.Process(firing.pid)
+                if abs(process.create_time() - firing.create_time) > 1:
+                    continue
+                process.terminate()
+                messages.append(f"{firing.rule}: terminated {firing.name} ({firing.pid})")
+            except psutil.NoSuchProcess:
+                pass
+            except psutil.AccessDenied:
+                messages.append(f"{firing.rule}: not allowed to terminate {firing.name} ({firing.pid})")
+        else:
+            messages.append(f"{firing.rule}: {firing.name} ({firing.pid})")
+    if messages:
+        notify(messages)
+    return messages
@@ -0,0 +1,85 @@
+import queue
+import sys
+import threading
+import time
+
+import psutil
+
+from monitor.collector import Collector
+
+
+class ProcessSampler:
+    """Collect snapshots on a background thread and hand over only the newest one.
+
+    The GUI never blocks on collection: it calls ``poll()`` from its own event
+    loop (``root.after`` or a ``QTimer``) and gets either the latest finished
+    snapshot or ``None``. A snapshot that was not picked up before the next one
+    finished is dropped instead of queued.
+    """
+
+    def __init__(self, interval=5.0, collect=None, backend=None, local=True):
+        self.interval = interval  # Seconds between samples, None to sample only on refresh()
+        self.local = local  # False when snapshots come from another host or a log; PIDs are not ours to act on
+        self._collect = collect or Collector(backend).sample
+        self.busy = False  # A requested or running collection has not finished yet
+        self.last_duration = None  # Seconds the last collection took
+        self.last_blocks = None  # Net memory blocks the last collection left allocated (process-wide)
+        self._queue = queue.Queue(maxsize=1)
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="process-sampler", daemon=True)
+
+    def start(self):
+        """Start sampling and return the sampler."""
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling after the current cycle."""
+        self._stopped.set()
+        self._wakeup.set()
+
+    def refresh(self):
+        """Take the next sample immediately instead of waiting for the interval."""
+        self.busy = True
+        self._wakeup.set()
+
+    def poll(self):
+        """Return the newest finished snapshot, or None if nothing new arrived."""
+        snapshot = None
+        while True:
+            try:
+                snapshot = self._queue.get_nowait()
+            except queue.Empty:
+                return snapshot
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self.busy = True
+            start = time.monotonic()
+            blocks = sys.getallocatedblocks()
+            try:
+                snapshot = self._collect()
+            except (psutil.Error, OSError):
+                snapshot = None  # A failed cycle is simply retried on the next one
+            # Set before publishing, so whoever polls the snapshot sees what it cost
+            self.last_duration = time.monotonic() - start
+            self.last_blocks = sys.getallocatedblocks() - blocks
+            if snapshot is not None:
+                self._publish(snapshot)
+            self.busy = False
+
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def _publish(self, snapshot):
+        while True:
+            try:
+                self._queue.put_nowait(snapshot)
+                return
+            except queue.Full:
+                # Drop the stale snapshot the GUI has not consumed yet
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    pass
@@ -0,0 +1,161 @@
+import math
+import time
+
+RECHECK = 0.5  # Seconds between checks of a job that is due but whose condition is false
+SMOOTHING = 0.3  # Weight of the newest cycle cost in the running average
+
+
+class Job:
+    """One periodic or one-shot job owned by a RefreshScheduler."""
+
+    def __init__(self, name, callback, interval, when=None, budget=None, cost=None, max_stretch=6.0, repeat=True):
+        self.name = name
+        self.callback = callback
+        self.base_interval = interval
+        self.interval = interval  # Current interval, stretched while cycles run over budget
+        self.when = when
+        self.budget = budget if budget is not None else interval * 0.25
+        self.cost = cost
+        self.max_stretch = max_stretch
+        self.repeat = repeat
+        self.due = 0.0
+        self.waiting = False  # Due, but held back by ``when``
+        self.average_cost = None
+
+    def record_cost(self, seconds):
+        """Fold one cycle's cost into the average and stretch or restore the interval."""
+        if self.average_cost is None:
+            self.average_cost = seconds
+        else:
+            self.average_cost += SMOOTHING * (seconds - self.average_cost)
+        if not self.budget:
+            return
+        stretch = min(max(1.0, self.average_cost / self.budget), self.max_stretch)
+        self.interval = self.base_interval * stretch
+
+
+class RefreshScheduler:
+    """Run every periodic job of an app from a single timer on the GUI's event loop.
+
+    Jobs run on the GUI thread in due order. A job whose ``when`` condition is
+    false (its tab is hidden, the sampler is still busy) or any job while
+    ``active`` is false (the window is minimized) is skipped and rechecked
+    until it can run, instead of piling up calls. Each cycle's cost, the
+    callback's own duration or whatever ``cost()`` reports (e.g. the
+    sampler's collection time), is averaged; when the average exceeds the
+    job's budget the interval is stretched so the job keeps roughly to its
+    budget share, up to ``max_stretch`` times the configured interval.
+
+    ``call_later(milliseconds, callback)`` arms the timer, e.g. ``root.after``
+    or ``QTimer.singleShot``; ``cancel(handle)`` is optional, as wakes that
+    were superseded are ignored.
+    """
+
+    def __init__(self, call_later, cancel=None, active=None, clock=time.monotonic):
+        self._call_later = call_later
+        self._cancel = cancel
+        self._active = active
+        self._clock = clock
+        self._jobs = {}
+        self._generation = 0
+        self._handle = None
+        self._wake_at = None
+        self._running = False
+
+    def __contains__(self, name):
+        return name in self._jobs
+
+    def every(self, name, interval, callback, when=None, budget=None, cost=None, max_stretch=6.0, first=None):
+        """Run ``callback`` every ``interval`` seconds, first after ``first`` seconds (default: one interval)."""
+        job = Job(name, callback, interval, when, budget, cost, max_stretch)
+        job.due = self._clock() + (interval if first is None else first)
+        self._jobs[name] = job
+        self._arm()
+        return job
+
+    def once(self, name, delay, callback):
+        """Run ``callback`` once after ``delay`` seconds, replacing a pending job of the same name."""
+        job = Job(name, callback, delay, repeat=False)
+        job.due = self._clock() + delay
+        self._jobs[name] = job
+        self._arm()
+        return job
+
+    def cancel(self, name):
+        self._jobs.pop(name, None)
+
+    def run_soon(self, name):
+        """Make a job due now, e.g. after a manual refresh."""
+        job = self._jobs.get(name)
+        if job is not None:
+            job.due = self._clock()
+            self._arm()
+
+    def wake(self, event=None):
+        """Recheck waiting jobs now; bind it to tab changes and window map events."""
+        self._arm(force=True)
+
+    def next_run(self, name):
+        """Seconds until the job runs, or None while it waits for its condition."""
+        job = self._jobs.get(name)
+        if job is None or job.waiting:
+            return None
+        return max(0.0, job.due - self._clock())
+
+    def interval(self, name):
+        """The job's current, possibly stretched, interval in seconds."""
+        return self._jobs[name].interval
+
+    def _runnable(self, job):
+        if self._active is not None and not self._active():
+            return False
+        return job.when is None or job.when()
+
+    def _tick(self, generation):
+        if generation != self._generation:
+            return  # Superseded by a later wake
+        self._handle = self._wake_at = None
+        self._running = True
+        try:
+            for job in sorted(self._jobs.values(), key=lambda job: job.due):
+                if job.due > self._clock() or self._jobs.get(job.name) is not job:
+                    continue
+                if not self._runnable(job):
+                    job.waiting = True
+                    continue
+                job.waiting = False
+                self._run(job)
+        finally:
+            self._running = False
+            self._arm()
+
+    def _run(self, job):
+        if not job.repeat:
+            del self._jobs[job.name]
+        start = self._clock()
+        try:
+            job.callback()
+        finally:
+            end = self._clock()
+            cost = job.cost() if job.cost is not None else end - start
+            if cost is not None:
+                job.record_cost(cost)
+            job.due = end + job.interval
+
+    def _arm(self, force=False):
+        if self._running or not self._jobs:
+            return
+        now = self._clock()
+        wake_at = min(now + RECHECK if job.waiting else job.due for job in self._jobs.values())
+        if force:
+            wake_at = now
+        if self._wake_at is not None and self._wake_at <= wake_at:
+            return  # The pending wake comes first anyway
+
+        if self._handle is not None and self._cancel is not None:
+            self._cancel(self._handle)
+        self._generation += 1
+        generation = self._generation
+        delay = max(0, math.ceil((wake_at - now) * 1000))
+        self._wake_at = wake_at
+        self._handle = self._call_later(delay, lambda: self._tick(generation))
@@ -0,0 +1,127 @@
+from collections import defaultdict
+
+import numpy as np
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class ProcessSearchIndex:
+    """In-memory name/PID index over the processes of the latest snapshot.
+
+    Distinct live names are indexed by trigram, so a search touches only the
+    names sharing the query's trigrams rather than every process. PIDs are
+    indexed by trigram the same way. Queries shorter than a trigram scan the
+    live names and PID strings instead, so every query is a substring match
+    and "12" finds PID 3125 just as "125" does. The index is
+    updated incrementally: ``update`` only indexes processes that started and
+    unindexes those that exited since the previous snapshot. ``rows`` brings
+    the index up to date itself, and only for a non-empty query, so views
+    that show every process or only the top few skip indexing altogether.
+    """
+
+    def __init__(self):
+        self._live = {}  # (pid, create_time) -> name id
+        self._name_counts = defaultdict(int)  # name id -> live processes with that name
+        self._lowered = {}  # name id -> lowercase name, for live names only
+        self._name_trigrams = defaultdict(set)  # trigram -> name ids
+        self._pid_trigrams = defaultdict(set)  # trigram -> pids
+        self._pid_strings = defaultdict(int)  # PID string -> live processes with that PID, for short queries
+        self._snapshot = None  # The snapshot last indexed
+
+    def __len__(self):
+        return len(self._live)
+
+    def update(self, snapshot):
+        """Bring the index in line with ``snapshot``."""
+        self._snapshot = snapshot
+        current = dict(zip(zip(snapshot.pid.tolist(), snapshot.create_time.tolist()), snapshot.name_id.tolist()))
+        live = self._live
+        for key in [key for key in live if key not in current]:
+            self._remove(key, live.pop(key))
+        for key, name_id in current.items():
+            old_name_id = live.get(key)
+            if old_name_id == name_id:
+                continue
+            if old_name_id is not None:
+                self._remove(key, old_name_id)  # The process exec()ed into a new name
+            live[key] = name_id
+            self._add(key, name_id, snapshot.names)
+
+    def query(self, text):
+        """Return (name ids, pids) matching ``text`` as a name substring or a PID."""
+        text = text.strip().lower()
+        if not text:
+            return None, None
+
+        if len(text) < 3:
+            name_ids = [name_id for name_id, name in self._lowered.items() if text in name]
+        else:
+            name_ids = [name_id for name_id in self._candidates(self._name_trigrams, text)
+                        if text in self._lowered[name_id]]
+
+        pids = []
+        if text.isdigit():
+            if len(text) < 3:
+                pids = [int(pid) for pid in self._pid_strings if text in pid]
+            else:
+                pids = [pid for pid in self._candidates(self._pid_trigrams, text) if text in str(pid)]
+
+        return np.array(name_ids, dtype=np.int32), np.array(pids, dtype=np.int32)
+
+    def rows(self, snapshot, text):
+        """Return the indices of the ``snapshot`` rows matching ``text``, indexing ``snapshot`` if needed."""
+        if not text.strip():
+            return np.arange(len(snapshot))
+        if snapshot is not self._snapshot:
+            self.update(snapshot)
+
+        name_ids, pids = self.query(text)
+
+        mask = snapshot.rows_with_names(name_ids)
+        if len(pids):
+            mask |= np.isin(snapshot.pid, pids)
+        return np.flatnonzero(mask)
+
+    @staticmethod
+    def _candidates(index, text):
+        sets = [index.get(trigram, ()) for trigram in _trigrams(text)]
+        sets.sort(key=len)
+        return set(sets[0]).intersection(*sets[1:])
+
+    def _add(self, key, name_id, names):
+        self._name_counts[name_id] += 1
+        if self._name_counts[name_id] == 1:
+            lowered = self._lowered[name_id] = names.lowered(name_id)
+            for trigram in _trigrams(lowered):
+                self._name_trigrams[trigram].add(name_id)
+
+        pid = key[0]
+        pid_string = str(pid)
+        self._pid_strings[pid_string] += 1
+        for trigram in _trigrams(pid_string):
+            self._pid_trigrams[trigram].add(pid)
+
+    def _remove(self, key, name_id):
+        self._name_counts[name_id] -= 1
+        if not self._name_counts[name_id]:
+            del self._name_counts[name_id]
+            for trigram in _trigrams(self._lowered.pop(name_id)):
+                self._discard(self._name_trigrams, trigram, name_id)
+
+        pid = key[0]
+        pid_string = str(pid)
+        self._pid_strings[pid_string] -= 1
+        if not self._pid_strings[pid_string]:
+            del self._pid_strings[pid_string]
+        for trigram in _trigrams(pid_string):
+            self._discard(self._pid_trigrams, trigram, pid)
+
+    @staticmethod
+    def _discard(index, trigram, value):
+        values = index.get(trigram)
+        if values is not None:
+            values.discard(value)
+            if not values:
+                del index[trigram]
@@ -0,0 +1,227 @@
+import numpy as np
+
+from monitor.rates import format_rate
+from monitor.records import ProcessRecord
+
+SORT_COLUMNS = ("pid", "name", "cpu_percent", "memory_mb", "read_bps", "write_bps")
+TOP_K = 50  # Rows kept by the top-K views
+# Process list modes: every process, or only the TOP_K largest by a column ("io_bps" is read + write)
+VIEW_MODES = {"All processes": None, f"Top {TOP_K} by CPU": "cpu_percent", f"Top {TOP_K} by memory": "memory_mb",
+              f"Top {TOP_K} by I/O": "io_bps"}
+
+_LOW_BITS = 32
+_LOW_MASK = (1 << _LOW_BITS) - 1
+
+# Rows are keyed by pid and create_time (in 1/100 s) packed into one int64
+_KEY_TIME_BITS = 40
+_KEY_TIME_MASK = (1 << _KEY_TIME_BITS) - 1
+
+
+def _ordered_bits(values):
+    """Map a float32 or int32 column to uint64 values below 2**32 that sort in the same order."""
+    if values.dtype.kind == "f":
+        bits = (values.astype(np.float32) + np.float32(0)).view(np.uint32).astype(np.uint64)  # + 0 turns -0.0 into 0.0
+        # As integers negative floats sort backwards: flip them all, and set the sign bit of the rest
+        return np.where(bits >> 31 == 1, bits ^ _LOW_MASK, bits | (1 << 31))
+    return (values.astype(np.int64) + (1 << 31)).astype(np.uint64) & _LOW_MASK
+
+
+def row_keys(pid, create_time):
+    """Return the packed int64 row keys for pid and create_time columns."""
+    times = np.rint(np.asarray(create_time, dtype=np.float64) * 100).astype(np.int64) & _KEY_TIME_MASK
+    return (np.asarray(pid, dtype=np.int64) << _KEY_TIME_BITS) | times
+
+
+class NameTable:
+    """Intern process names so each snapshot row stores a small integer instead of a string.
+
+    The table is shared by consecutive snapshots and only ever grows, so ids
+    stay valid while the GUI thread reads it and the sampler appends to it.
+    There must be a single writer: ``intern`` appends to ``names`` and then
+    to ``_lowered`` without a lock, so readers size their work by
+    ``_lowered``, whose ids are complete in both lists.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self.names = []
+        self._lowered = []
+        self._ranks = np.zeros(0, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.names)
+
+    def intern(self, name):
+        """Return the id of ``name``, adding it if it is new."""
+        name_id = self._ids.get(name)
+        if name_id is None:
+            name_id = self._ids[name] = len(self.names)
+            self.names.append(name)
+            self._lowered.append(name.lower())
+        return name_id
+
+    def lowered(self, name_id):
+        """Return the lowercase form of a name id."""
+        return self._lowered[name_id]
+
+    def ids_where(self, predicate):
+        """Return the ids of the names whose lowercase form satisfies ``predicate``."""
+        lowered = self._lowered[:len(self.names)]
+        return np.array([i for i, name in enumerate(lowered) if predicate(name)], dtype=np.int32)
+
+    def ranks(self):
+        """Return, per name id, its position in case-insensitive alphabetical order."""
+        count = len(self._lowered)  # A name being interned may already be in names but not yet here
+        if len(self._ranks) != count:
+            order = sorted(range(count), key=self._lowered.__getitem__)
+            ranks = np.empty(count, dtype=np.int32)
+            ranks[order] = np.arange(count, dtype=np.int32)
+            self._ranks = ranks
+        return self._ranks
+
+
+class ProcessSnapshot:
+    """A columnar snapshot of running processes plus the system-wide readings.
+
+    Numbers live in typed NumPy columns (pid, create_time, cpu_percent,
+    memory_mb, ppid, and read_bps/write_bps, the disk I/O in bytes per
+    second) and names as ids into a shared NameTable. Filtering, sorting
+    and top-K selection work on those columns and return row indices;
+    strings are only built by ``format_row`` for the rows actually shown.
+    """
+
+    def __init__(self, timestamp, cpu_percent, memory_percent, names, pid, create_time, name_id, cpu, memory_mb,
+                 ppid=None, read_bps=None, write_bps=None):
+        self.timestamp = timestamp
+        self.cpu_percent = cpu_percent
+        self.memory_percent = memory_percent
+        self.names = names
+        self.pid = pid
+        self.create_time = create_time
+        self.name_id = name_id
+        self.cpu = cpu
+        self.memory_mb = memory_mb
+        # Sources without parent information (e.g. the log) leave every process a root
+        self.ppid = ppid if ppid is not None else np.zeros(len(pid), dtype=np.int32)
+        # Likewise for I/O rates: sources without them (the log, synthetic snapshots) report none
+        self.read_bps = read_bps if read_bps is not None else np.zeros(len(pid), dtype=np.float32)
+        self.write_bps = write_bps if write_bps is not None else np.zeros(len(pid), dtype=np.float32)
+
+    @classmethod
+    def from_records(cls, records, names, timestamp=0.0, cpu_percent=0.0, memory_percent=0.0):
+        """Build a snapshot from ProcessRecord tuples, interning names into ``names``."""
+        count = len(records)
+        pid = np.empty(count, dtype=np.int32)
+        create_time = np.empty(count, dtype=np.float64)
+        name_id = np.empty(count, dtype=np.int32)
+        cpu = np.empty(count, dtype=np.float32)
+        memory_mb = np.empty(count, dtype=np.float32)
+        ppid = np.empty(count, dtype=np.int32)
+        intern = names.intern
+        for i, record in enumerate(records):
+            pid[i] = record.pid
+            create_time[i] = record.create_time
+            name_id[i] = intern(record.name)
+            cpu[i] = record.cpu_percent
+            memory_mb[i] = record.memory_mb
+            ppid[i] = record.ppid
+        return cls(timestamp, cpu_percent, memory_percent, names, pid, create_time, name_id, cpu, memory_mb, ppid)
+
+    def __len__(self):
+        return len(self.pid)
+
+    @property
+    def nbytes(self):
+        """Memory held by the columns of this snapshot."""
+        return (self.pid.nbytes + self.create_time.nbytes + self.name_id.nbytes + self.cpu.nbytes
+                + self.memory_mb.nbytes + self.ppid.nbytes + self.read_bps.nbytes + self.write_bps.nbytes)
+
+    def key(self, i):
+        """Return the (pid, create_time) key of row ``i``."""
+        return (int(self.pid[i]), float(self.create_time[i]))
+
+    def name(self, i):
+        """Return the process name of row ``i``."""
+        return self.names.names[self.name_id[i]]
+
+    def record(self, i):
+        """Return row ``i`` as a ProcessRecord."""
+        return ProcessRecord(int(self.pid[i]), float(self.create_time[i]), self.name(i),
+                             float(self.cpu[i]), float(self.memory_mb[i]), int(self.ppid[i]))
+
+    def format_row(self, i):
+        """Return the display strings (PID, Name, CPU%, Memory MB, Read/s, Write/s) for row ``i``."""
+        return (str(self.pid[i]), self.name(i), f"{self.cpu[i]:.1f}", f"{self.memory_mb[i]:.2f}",
+                format_rate(self.read_bps[i]), format_rate(self.write_bps[i]))
+
+    def format_cell(self, i, column):
+        """Return one of the ``format_row`` strings of row ``i``, by column number."""
+        if column == 0:
+            return str(self.pid[i])
+        if column == 1:
+            return self.name(i)
+        if column == 2:
+            return f"{self.cpu[i]:.1f}"
+        if column == 3:
+            return f"{self.memory_mb[i]:.2f}"
+        return format_rate(self.read_bps[i] if column == 4 else self.write_bps[i])
+
+    def take(self, indices):
+        """Return a snapshot of only the rows at ``indices``, sharing the name table."""
+        return ProcessSnapshot(self.timestamp, self.cpu_percent, self.memory_percent, self.names, self.pid[indices],
+                               self.create_time[indices], self.name_id[indices], self.cpu[indices],
+                               self.memory_mb[indices], self.ppid[indices], self.read_bps[indices],
+                               self.write_bps[indices])
+
+    def column(self, name):
+        """Return the typed sort values for a column in SORT_COLUMNS or VIEW_MODES."""
+        if name == "name":
+            return self.names.ranks()[self.name_id]
+        if name == "cpu_percent":
+            return self.cpu
+        if name == "io_bps":
+            return self.read_bps + self.write_bps
+        return getattr(self, name)
+
+    def rows_with_names(self, name_ids):
+        """Return a boolean mask of the rows whose name id is in ``name_ids``."""
+        return np.isin(self.name_id, name_ids)
+
+    def match(self, query):
+        """Return the indices of rows whose name or PID contains ``query`` (case-insensitive)."""
+        query = query.strip().lower()
+        if not query:
+            return np.arange(len(self))
+
+        mask = self.rows_with_names(self.names.ids_where(lambda name: query in name))
+        if query.isdigit():
+            mask |= np.char.find(self.pid.astype(str), query) >= 0
+        return np.flatnonzero(mask)
+
+    def sort_keys(self, column, descending=False, indices=None):
+        """Return one uint64 per row (default: all rows) that orders rows by ``column``, ties by PID.
+
+        The column's value goes in the high 32 bits and the PID in the low
+        ones, so one integer sort replaces a two-key lexsort.
+        """
+        if indices is None:
+            indices = np.arange(len(self))
+        bits = _ordered_bits(self.column(column)[indices])
+        if descending:
+            bits = _LOW_MASK - bits
+        return (bits << _LOW_BITS) | self.pid[indices].astype(np.uint64)
+
+    def order(self, column, descending=False, indices=None):
+        """Return ``indices`` (default: all rows) sorted by ``column``, ties broken by PID."""
+        if indices is None:
+            indices = np.arange(len(self))
+        return indices[np.argsort(self.sort_keys(column, descending, indices))]
+
+    def top_k(self, column, k, indices=None):
+        """Return the indices of the ``k`` largest rows by ``column``, largest first."""
+        if indices is None:
+            indices = np.arange(len(self))
+        if k < len(indices):
+            values = self.column(column)[indices]
+            indices = indices[np.argpartition(-values.astype(np.float64), k - 1)[:k]]
+        return self.order(column, descending=True, indices=indices)
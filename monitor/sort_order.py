@@ -0,0 +1,36 @@
+# Columns whose first click shows the largest first
+DESCENDING_FIRST = ("cpu_percent", "memory_mb", "read_bps", "write_bps")
+
+
+class SortOrder:
+    """The sort column and direction of a process list, kept across refreshes.
+
+    Sorting goes through ``ProcessSnapshot.order`` on the typed columns, so
+    values are never parsed back out of display strings, and ties are
+    broken by PID so the order is stable between refreshes. The table sync
+    then only moves the rows whose position changed.
+    """
+
+    def __init__(self, column=None, descending=False):
+        self.column = column  # A SORT_COLUMNS name, or None for the snapshot order
+        self.descending = descending
+
+    def toggle(self, column):
+        """Sort by ``column``, or flip the direction if it is already the sort column."""
+        if column == self.column:
+            self.descending = not self.descending
+        else:
+            self.column = column
+            self.descending = column in DESCENDING_FIRST
+
+    def arrow(self, column):
+        """Return the heading suffix for ``column``: an arrow on the sort column, else nothing."""
+        if column != self.column:
+            return ""
+        return " ▼" if self.descending else " ▲"
+
+    def apply(self, snapshot, indices):
+        """Return ``indices`` in the current order."""
+        if self.column is None:
+            return indices
+        return snapshot.order(self.column, self.descending, indices)
@@ -0,0 +1,55 @@
+import argparse
+import sys
+import time
+
+from monitor.collector import BACKENDS
+from monitor.remote import RemoteFeed
+from monitor.rules import RuleEngine, psutil_details
+from monitor.sampler import ProcessSampler
+from monitor.tslog import LogPlayback, LogReader
+
+
+def parse_source_args(description, argv=None, rules=False):
+    """Parse the command line options every app shares for choosing where snapshots come from.
+
+    With ``rules``, for the apps that highlight processes, ``--rules FILE`` is accepted too.
+    """
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--backend", choices=BACKENDS, help="process collection backend (default: psutil)")
+    parser.add_argument("--connect", metavar="ADDRESS",
+                        help="watch a remote monitor.agent at host:port or unix:/path instead of this machine")
+    parser.add_argument("--attach-log", metavar="DIR",
+                        help="show snapshots from a monitor.daemon log instead of collecting locally")
+    parser.add_argument("--replay", type=float, metavar="SECONDS",
+                        help="with --attach-log, replay the log starting this many seconds ago")
+    parser.add_argument("--replay-speed", type=float, default=1.0,
+                        help="replay speed relative to real time (default: 1)")
+    if rules:
+        parser.add_argument("--rules", metavar="FILE",
+                            help="JSON process rules, reloaded when the file changes (default: built-in names)")
+    # Unknown options are left for the GUI toolkit (e.g. Qt's -style)
+    args, _ = parser.parse_known_args(argv)
+    return args
+
+
+def create_sampler(args, interval):
+    """Return (sampler, LogPlayback or None) for parsed source options.
+
+    ``interval`` is the app's own sampling interval when collecting locally.
+    """
+    if args.connect:
+        # Frames arrive at the agent's pace; each collect call waits for the next one
+        return ProcessSampler(0, collect=RemoteFeed(args.connect), local=False), None
+    if args.attach_log:
+        start = time.time() - args.replay if args.replay else None
+        playback = LogPlayback(LogReader(args.attach_log), start, args.replay_speed)
+        return ProcessSampler(1.0, collect=playback, local=False), playback
+    return ProcessSampler(interval, backend=args.backend), None
+
+
+def create_rules(args, sampler):
+    """Return the RuleEngine for parsed options; cmdline, user and exe rules only match local processes."""
+    try:
+        return RuleEngine(args.rules, details=psutil_details if sampler.local else None)
+    except (OSError, ValueError) as e:
+        sys.exit(f"Cannot load rules from {args.rules}: {e}")
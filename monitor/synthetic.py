@@ -0,0 +1,85 @@
+import numpy as np
+
+from monitor.records import ProcessRecord
+from monitor.snapshot_store import NameTable, ProcessSnapshot
+
+_NAME_STEMS = ("bash", "python3", "gcc", "cc1plus", "ld", "make", "ninja", "java", "node", "sshd",
+               "systemd", "postgres", "nginx", "chrome", "rustc", "clang", "go", "dockerd", "containerd-shim", "kworker")
+
+
+class SyntheticProvider:
+    """Deterministic fake process table with churn, standing in for psutil.
+
+    Processes form a tree under PID 1, which never exits. Every ``step``
+    replaces a ``churn`` fraction of the other processes with new children
+    of surviving ones (orphans are adopted by PID 1) and changes the CPU%,
+    memory and disk I/O of a ``busy`` fraction, driven by a seeded generator so runs
+    are repeatable. It can be used wherever a collection backend is
+    expected (``scan()`` returns ProcessRecords) or produce snapshots
+    directly with ``sample()``.
+    """
+
+    def __init__(self, count=1000, churn=0.01, busy=0.1, seed=0, names=None):
+        self.count = count
+        self.churn = churn
+        self.busy = busy
+        self.names = names or NameTable()
+        self.timestamp = 1_700_000_000.0
+        self._rng = np.random.default_rng(seed)
+        self._name_pool = np.array([self.names.intern(f"{stem}-{i}") for stem in _NAME_STEMS for i in range(10)],
+                                   dtype=np.int32)
+
+        self.pid = np.arange(1, count + 1, dtype=np.int32)
+        self._next_pid = count + 1
+        # Older processes have lower PIDs, and each one's parent is an older process
+        self.create_time = self.timestamp - np.sort(self._rng.uniform(0, 86400, count))[::-1]
+        self.ppid = np.concatenate(([0], self._rng.integers(1, self.pid[1:]))).astype(np.int32)
+        self.name_id = self._rng.choice(self._name_pool, count)
+        self.cpu = self._rng.gamma(0.5, 4.0, count).astype(np.float32)
+        self.memory_mb = self._rng.lognormal(3.0, 1.5, count).astype(np.float32)
+        # Cumulative I/O counters, and the rates of the last step
+        self.read_bytes = np.zeros(count)
+        self.write_bytes = np.zeros(count)
+        self.read_bps = np.zeros(count, dtype=np.float32)
+        self.write_bps = np.zeros(count, dtype=np.float32)
+
+    def step(self, seconds=1.0):
+        """Advance the fake clock, churning and updating processes."""
+        rng = self._rng
+        self.timestamp += seconds
+
+        replaced = 1 + rng.choice(self.count - 1, int((self.count - 1) * self.churn), replace=False)
+        self.ppid[np.isin(self.ppid, self.pid[replaced])] = 1
+        survivors = np.delete(self.pid, replaced)
+        self.ppid[replaced] = rng.choice(survivors, len(replaced))
+        self.pid[replaced] = np.arange(self._next_pid, self._next_pid + len(replaced), dtype=np.int32)
+        self._next_pid += len(replaced)
+        self.create_time[replaced] = self.timestamp
+        self.name_id[replaced] = rng.choice(self._name_pool, len(replaced))
+        self.read_bytes[replaced] = self.write_bytes[replaced] = 0
+
+        changed = rng.choice(self.count, int(self.count * self.busy), replace=False)
+        self.cpu[changed] = rng.gamma(0.5, 4.0, len(changed))
+        self.memory_mb[changed] *= rng.uniform(0.95, 1.05, len(changed)).astype(np.float32)
+        self.read_bps[:] = self.write_bps[:] = 0
+        self.read_bps[changed] = rng.exponential(64 * 1024, len(changed))
+        self.write_bps[changed] = rng.exponential(32 * 1024, len(changed))
+        self.read_bytes += self.read_bps * seconds
+        self.write_bytes += self.write_bps * seconds
+
+    def sample(self):
+        """Step and return a ProcessSnapshot of the fake table."""
+        self.step()
+        cpu_percent = float(min(self.cpu.sum() / 8, 100.0))
+        return ProcessSnapshot(self.timestamp, cpu_percent, 42.0, self.names, self.pid.copy(),
+                               self.create_time.copy(), self.name_id.copy(), self.cpu.copy(), self.memory_mb.copy(),
+                               self.ppid.copy(), self.read_bps.copy(), self.write_bps.copy())
+
+    def scan(self):
+        """Step and return the fake table as ProcessRecords, like a collection backend."""
+        self.step()
+        names = self.names.names
+        return [ProcessRecord(pid, create_time, names[name_id], cpu, memory_mb, ppid, read_bytes, write_bytes)
+                for pid, create_time, name_id, cpu, memory_mb, ppid, read_bytes, write_bytes in zip(
+                    self.pid.tolist(), self.create_time.tolist(), self.name_id.tolist(), self.cpu.tolist(),
+                    self.memory_mb.tolist(), self.ppid.tolist(), self.read_bytes.tolist(), self.write_bytes.tolist())]
@@ -0,0 +1,231 @@
+from bisect import bisect_left
+
+
+def row_key(proc):
+    """Return the key identifying a process across snapshots, even after PID reuse."""
+    return (proc.pid, proc.create_time)
+
+
+def row_iid(key):
+    """Return the Treeview item id used for a row key."""
+    return f"{key[0]}:{key[1]}"
+
+
+def iid_key(iid):
+    """Return the row key of an item id made by ``row_iid``, or None for other items.
+
+    Process tree items (``tree_iid``) hold packed ``row_keys`` instead; resolve
+    those through the tree's ``row`` and the snapshot's ``key``.
+    """
+    try:
+        pid, create_time = iid.strip("()").replace(", ", ":").split(":")
+        return (int(pid), float(create_time))
+    except ValueError:
+        return None
+
+
+def _stable_positions(positions):
+    """Return the indexes of a longest increasing run of positions (rows that need not move)."""
+    tails = []
+    tail_indexes = []
+    previous = [-1] * len(positions)
+    for i, position in enumerate(positions):
+        j = bisect_left(tails, position)
+        if j:
+            previous[i] = tail_indexes[j - 1]
+        if j == len(tails):
+            tails.append(position)
+            tail_indexes.append(i)
+        else:
+            tails[j] = position
+            tail_indexes[j] = i
+
+    stable = set()
+    i = tail_indexes[-1] if tail_indexes else -1
+    while i >= 0:
+        stable.add(i)
+        i = previous[i]
+    return stable
+
+
+class TreeviewSync:
+    """Keep a flat ttk.Treeview in step with keyed rows.
+
+    Rows are ``(key, values, tags)`` tuples in display order. Each update only
+    deletes rows that went away, inserts new ones, rewrites rows whose values
+    changed and moves the few rows that changed place, so the selection and the
+    scroll position survive a refresh.
+    """
+
+    def __init__(self, tree):
+        self.tree = tree
+        self._rows = {}  # iid -> (values, tags)
+
+    def clear(self):
+        """Remove every row."""
+        self.tree.delete(*self._rows)
+        self._rows = {}
+
+    def update(self, rows):
+        """Apply the differences between the displayed rows and ``rows``."""
+        tree = self.tree
+        new_rows = {}
+        order = []
+        for key, values, tags in rows:
+            iid = row_iid(key)
+            new_rows[iid] = (tuple(values), tuple(tags))
+            order.append(iid)
+
+        top_iid = self._top_iid()
+
+        removed = [iid for iid in self._rows if iid not in new_rows]
+        if removed:
+            tree.delete(*removed)
+
+        for iid in order:
+            row = new_rows[iid]
+            old_row = self._rows.get(iid)
+            if old_row is None:
+                tree.insert("", "end", iid=iid, values=row[0], tags=row[1])
+            elif old_row != row:
+                tree.item(iid, values=row[0], tags=row[1])
+
+        self._rows = new_rows
+        self._reorder(order)
+        self._restore_top(top_iid)
+
+    def _reorder(self, order):
+        current = self.tree.get_children()
+        if tuple(order) == current:
+            return
+
+        index_of = {iid: i for i, iid in enumerate(current)}
+        stable = _stable_positions([index_of[iid] for iid in order])
+        for i, iid in enumerate(order):
+            if i in stable:
+                continue
+            # Place the row right after its predecessor, which is already in place
+            position = self.tree.index(order[i - 1]) + 1 if i else 0
+            self.tree.move(iid, "", position)
+
+    def _top_iid(self):
+        children = self.tree.get_children()
+        if not children:
+            return None
+        first = int(self.tree.yview()[0] * len(children) + 0.5)
+        return children[min(first, len(children) - 1)]
+
+    def _restore_top(self, top_iid):
+        if top_iid is None or top_iid not in self._rows:
+            return
+        count = len(self._rows)
+        self.tree.yview_moveto(self.tree.index(top_iid) / count)
+
+
+
+def tree_iid(key):
+    """Return the Treeview item id of a ProcessTree node."""
+    return str(key)
+
+
+class ProcessTreeSync:
+    """Show a ProcessTree in a ttk.Treeview, inserting children only when a node is opened.
+
+    A node that has children but was never opened gets one placeholder child
+    so the Treeview draws an expander. ``update`` applies only what the
+    tree's last update changed to the items that exist, so a refresh costs
+    about the number of visible changes, not the number of processes.
+    ``format_item(key)`` returns the ``(text, values, tags)`` of a node.
+    """
+
+    def __init__(self, tree, format_item):
+        self.tree = tree
+        self.format_item = format_item
+        self.process_tree = None
+        self._generation = None  # ProcessTree.generation last shown
+        self._shown = set()  # Keys with an item
+        self._loaded = set()  # Keys whose children have been inserted
+
+    def clear(self):
+        """Remove every item."""
+        self.tree.delete(*self.tree.get_children())
+        self.process_tree = None
+        self._generation = None
+        self._shown = set()
+        self._loaded = set()
+
+    def update(self, process_tree):
+        """Show ``process_tree`` after its latest update."""
+        if self.process_tree is process_tree and self._generation == process_tree.generation:
+            return
+        if self.process_tree is not process_tree or self._generation != process_tree.generation - 1:
+            # A different tree, or updates were missed: start over
+            self.clear()
+            self.process_tree = process_tree
+            self._generation = process_tree.generation
+            for key in sorted(process_tree.roots()):
+                self._insert("", key)
+            return
+        self._generation = process_tree.generation
+
+        # Move reparented items out before their old parent's item is deleted along with its children
+        for key in process_tree.moved | process_tree.added:
+            parent = process_tree.parent(key)
+            container = self._container(parent)
+            if container is None:
+                if key in self._shown:
+                    self._delete(key)
+                if parent in self._shown:
+                    self._add_placeholder(parent)
+            elif key in self._shown:
+                self.tree.move(tree_iid(key), container, "end")
+            else:
+                self._insert(container, key)
+        for key in process_tree.removed & self._shown:
+            if key in self._shown:  # Not already gone with a removed ancestor
+                self._delete(key)
+
+        for key in process_tree.changed & self._shown:
+            text, values, tags = self.format_item(key)
+            self.tree.item(tree_iid(key), text=text, values=values, tags=tags)
+
+    def open(self, key):
+        """Insert the children of ``key``; bind it to ``<<TreeviewOpen>>``."""
+        if key in self._loaded or key not in self._shown:
+            return
+        placeholder = tree_iid(key) + ":more"
+        if self.tree.exists(placeholder):
+            self.tree.delete(placeholder)
+        self._loaded.add(key)
+        for child in sorted(self.process_tree.children(key)):
+            self._insert(tree_iid(key), child)
+
+    def _container(self, parent):
+        """Return the item to insert a child of ``parent`` under, or None while it is not loaded."""
+        if parent is None:
+            return ""
+        return tree_iid(parent) if parent in self._loaded else None
+
+    def _insert(self, container, key):
+        text, values, tags = self.format_item(key)
+        self.tree.insert(container, "end", iid=tree_iid(key), text=text, values=values, tags=tags)
+        self._shown.add(key)
+        if self.process_tree.has_children(key):
+            self._add_placeholder(key)
+
+    def _add_placeholder(self, key):
+        placeholder = tree_iid(key) + ":more"
+        if key not in self._loaded and not self.tree.exists(placeholder):
+            self.tree.insert(tree_iid(key), "end", iid=placeholder, text="...")
+
+    def _delete(self, key):
+        # Deleting an item deletes its descendants, so forget those too
+        iid = tree_iid(key)
+        pending = [iid]
+        while pending:
+            item = pending.pop()
+            pending.extend(self.tree.get_children(item))
+            if not item.endswith(":more"):
+                self._shown.discard(int(item))
+                self._loaded.discard(int(item))
+        self.tree.delete(iid)
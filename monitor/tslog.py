@@ -0,0 +1,367 @@
+import mmap
+import os
+import struct
+import time
+import zlib
+from bisect import bisect_left, bisect_right
+
+import numpy as np
+
+from monitor.snapshot_store import NameTable, ProcessSnapshot
+
+SEGMENT_MAGIC = b"MONTSLG1"
+SEGMENT_HEADER = struct.Struct("<8sII")  # magic, segment number, reserved
+# payload size, payload crc32, timestamp, cpu %, memory %, process count, padding
+FRAME_HEADER = struct.Struct("<IIdffI4x")
+NAME_LENGTH = struct.Struct("<H")
+ROW_SIZE = 8 + 4 + 4 + 4 + 4  # create_time, pid, name_id, cpu, memory_mb
+
+DEFAULT_SEGMENT_SIZE = 64 * 1024 * 1024
+NAMES_FILE = "names.bin"
+
+
+def _segment_path(directory, number):
+    return os.path.join(directory, f"segment-{number:08d}.tsl")
+
+
+def _segment_numbers(directory):
+    numbers = []
+    for entry in os.listdir(directory):
+        if entry.startswith("segment-") and entry.endswith(".tsl"):
+            numbers.append(int(entry[8:-4]))
+    return sorted(numbers)
+
+
+def _read_names(path):
+    """Return the names stored in a names file and the length of its valid part."""
+    names = []
+    if not os.path.exists(path):
+        return names, 0
+    with open(path, "rb") as f:
+        data = f.read()
+
+    offset = 0
+    while offset + NAME_LENGTH.size <= len(data):
+        (length,) = NAME_LENGTH.unpack_from(data, offset)
+        end = offset + NAME_LENGTH.size + length
+        if end > len(data):
+            break  # Torn write at the tail
+        names.append(data[offset + NAME_LENGTH.size:end].decode("utf-8", "replace"))
+        offset = end
+    return names, offset
+
+
+def _scan_frames(buffer, start):
+    """Yield (offset, header fields) for each valid frame, stopping at the first invalid one."""
+    offset = start
+    size = len(buffer)
+    while offset + FRAME_HEADER.size <= size:
+        header = FRAME_HEADER.unpack_from(buffer, offset)
+        payload_size, crc = header[0], header[1]
+        payload_start = offset + FRAME_HEADER.size
+        # The writer zeroes the next slot, and every frame has a timestamp; an empty snapshot (no rows, and
+        # crc32(b"") == 0) is a frame like any other
+        if header[2] == 0.0 or payload_start + payload_size > size:
+            return
+        if payload_size != header[5] * ROW_SIZE:
+            return
+        if zlib.crc32(buffer[payload_start:payload_start + payload_size]) != crc:
+            return
+        yield offset, header
+        offset = payload_start + payload_size
+
+
+class LogWriter:
+    """Append snapshots to an on-disk, memory-mapped time-series log.
+
+    The log is a directory of fixed-size segment files plus ``names.bin``,
+    the append-only table of process names that frames refer to by id. Each
+    frame is a header (timestamp, system CPU % and memory %, row count,
+    payload CRC) followed by the process columns, so readers can map them
+    without parsing. A frame's header is written after its payload, and
+    readers stop at the first frame whose CRC does not match, so a crash
+    mid-write loses at most that frame. New segments are fully initialised
+    under a temporary name before being renamed into place.
+    """
+
+    def __init__(self, directory, segment_size=DEFAULT_SEGMENT_SIZE, max_segments=None):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        os.makedirs(directory, exist_ok=True)
+
+        # Names already in the log keep their ids across daemon restarts
+        names_path = os.path.join(directory, NAMES_FILE)
+        names, valid_length = _read_names(names_path)
+        self._names_file = open(names_path, "ab")
+        self._names_file.truncate(valid_length)
+        self._log_ids = {name: i for i, name in enumerate(names)}
+        self._id_map = np.zeros(0, dtype=np.int32)  # snapshot name id -> log name id
+        self._id_map_source = None
+
+        numbers = _segment_numbers(directory)
+        self._number = numbers[-1] if numbers else 0
+        self._file = None
+        self._map = None
+        if numbers:
+            self._open_segment(self._number)
+        else:
+            self._create_segment(self._number)
+
+    def append(self, snapshot):
+        """Write one snapshot as a frame."""
+        name_ids = self._translate_names(snapshot)
+        count = len(snapshot)
+        payload_size = count * ROW_SIZE
+        frame_size = FRAME_HEADER.size + payload_size
+        if frame_size + FRAME_HEADER.size > self.segment_size - SEGMENT_HEADER.size:
+            raise ValueError(f"A frame of {count} processes does not fit in a {self.segment_size} byte segment")
+        if self._offset + frame_size + FRAME_HEADER.size > len(self._map):
+            self._rotate()
+
+        payload = b"".join((
+            snapshot.create_time.astype(np.float64, copy=False).tobytes(),
+            snapshot.pid.astype(np.int32, copy=False).tobytes(),
+            name_ids.tobytes(),
+            snapshot.cpu.astype(np.float32, copy=False).tobytes(),
+            snapshot.memory_mb.astype(np.float32, copy=False).tobytes(),
+        ))
+        offset = self._offset
+        end = offset + frame_size
+        self._map[offset + FRAME_HEADER.size:end] = payload
+        # Mark the next slot empty before publishing this frame
+        self._map[end:end + FRAME_HEADER.size] = bytes(FRAME_HEADER.size)
+        FRAME_HEADER.pack_into(self._map, offset, payload_size, zlib.crc32(payload), snapshot.timestamp,
+                               snapshot.cpu_percent, snapshot.memory_percent, count)
+        self._offset = end
+
+    def flush(self):
+        """Force written frames and names to disk."""
+        self._names_file.flush()
+        os.fsync(self._names_file.fileno())
+        self._map.flush()
+
+    def close(self):
+        """Flush and close the log."""
+        self.flush()
+        self._map.close()
+        self._file.close()
+        self._names_file.close()
+
+    def _translate_names(self, snapshot):
+        names = snapshot.names
+        if self._id_map_source is not names:
+            self._id_map_source = names
+            self._id_map = np.zeros(0, dtype=np.int32)
+
+        if len(self._id_map) < len(names):
+            new_ids = []
+            for name in names.names[len(self._id_map):len(names)]:
+                log_id = self._log_ids.get(name)
+                if log_id is None:
+                    log_id = self._log_ids[name] = len(self._log_ids)
+                    encoded = name.encode("utf-8")[:0xFFFF]
+                    self._names_file.write(NAME_LENGTH.pack(len(encoded)) + encoded)
+                new_ids.append(log_id)
+            self._id_map = np.concatenate((self._id_map, np.array(new_ids, dtype=np.int32)))
+            # Names must be on disk before any frame that refers to them
+            self._names_file.flush()
+        return self._id_map[snapshot.name_id]
+
+    def _create_segment(self, number):
+        path = _segment_path(self.directory, number)
+        temporary = path + ".tmp"
+        with open(temporary, "wb") as f:
+            f.write(SEGMENT_HEADER.pack(SEGMENT_MAGIC, number, 0))
+            f.truncate(self.segment_size)  # Sparse: unused space takes no disk
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+        self._open_segment(number)
+
+    def _open_segment(self, number):
+        self._number = number
+        self._file = open(_segment_path(self.directory, number), "r+b")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        # Resume after the last intact frame
+        self._offset = SEGMENT_HEADER.size
+        for offset, header in _scan_frames(self._map, SEGMENT_HEADER.size):
+            self._offset = offset + FRAME_HEADER.size + header[0]
+
+    def _rotate(self):
+        self._map.flush()
+        self._map.close()
+        self._file.close()
+        self._create_segment(self._number + 1)
+
+        if self.max_segments:
+            for number in _segment_numbers(self.directory)[:-self.max_segments]:
+                os.remove(_segment_path(self.directory, number))
+
+
+class LogFrame:
+    """One frame of the log; its columns are read-only views into the mapped segment."""
+
+    def __init__(self, buffer, offset, header):
+        payload_size, _, self.timestamp, self.cpu_percent, self.memory_percent, count = header
+        start = offset + FRAME_HEADER.size
+        self.create_time = np.frombuffer(buffer, np.float64, count, start)
+        start += 8 * count
+        self.pid = np.frombuffer(buffer, np.int32, count, start)
+        start += 4 * count
+        self.name_id = np.frombuffer(buffer, np.int32, count, start)
+        start += 4 * count
+        self.cpu = np.frombuffer(buffer, np.float32, count, start)
+        start += 4 * count
+        self.memory_mb = np.frombuffer(buffer, np.float32, count, start)
+
+
+class _Segment:
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.offsets = []
+        self.headers = []
+        self.times = []
+        self.end = SEGMENT_HEADER.size
+
+    def scan(self):
+        for offset, header in _scan_frames(self.map, self.end):
+            self.offsets.append(offset)
+            self.headers.append(header)
+            self.times.append(header[2])
+            self.end = offset + FRAME_HEADER.size + header[0]
+
+    def close(self):
+        try:
+            self.map.close()
+        except BufferError:
+            pass  # Frames still reference the mapping; it is released with them
+        self.file.close()
+
+
+class LogReader:
+    """Read a time-series log written by LogWriter, including one still being written.
+
+    Segments are memory-mapped and indexed by frame timestamp; loading a
+    time range returns frames whose columns point straight into the mapped
+    files. Call ``refresh()`` to pick up frames appended since.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.names = NameTable()
+        self._names_offset = 0
+        self._segments = {}  # number -> _Segment
+        self.refresh()
+
+    def refresh(self):
+        """Index segments, frames and names written since the last refresh."""
+        names, _ = _read_names(os.path.join(self.directory, NAMES_FILE))
+        for name in names[len(self.names):]:
+            self.names.intern(name)
+
+        numbers = _segment_numbers(self.directory)
+        for number in list(self._segments):
+            if number not in numbers:
+                self._segments.pop(number).close()  # Removed by retention
+        for number in numbers:
+            segment = self._segments.get(number)
+            if segment is None:
+                segment = self._segments[number] = _Segment(_segment_path(self.directory, number))
+            if number >= numbers[-1] - 1 or not segment.offsets:
+                segment.scan()
+
+    def close(self):
+        for segment in self._segments.values():
+            segment.close()
+        self._segments.clear()
+
+    def time_range(self):
+        """Return (first, last) frame timestamps, or None for an empty log."""
+        times = [t for number in sorted(self._segments) for t in self._segments[number].times[:1]]
+        last = self.latest()
+        if not times or last is None:
+            return None
+        return times[0], last.timestamp
+
+    def latest(self):
+        """Return the newest frame, or None for an empty log."""
+        for number in sorted(self._segments, reverse=True):
+            segment = self._segments[number]
+            if segment.offsets:
+                return LogFrame(segment.map, segment.offsets[-1], segment.headers[-1])
+        return None
+
+    def frames(self, start=None, end=None):
+        """Yield the frames stamped between ``start`` and ``end`` (inclusive), oldest first."""
+        for number in sorted(self._segments):
+            segment = self._segments[number]
+            first = 0 if start is None else bisect_left(segment.times, start)
+            last = len(segment.times) if end is None else bisect_right(segment.times, end)
+            for i in range(first, last):
+                yield LogFrame(segment.map, segment.offsets[i], segment.headers[i])
+
+    def system_series(self, start=None, end=None):
+        """Return (times, CPU %, memory %) arrays for a time range, read from frame headers only."""
+        rows = []
+        for number in sorted(self._segments):
+            segment = self._segments[number]
+            first = 0 if start is None else bisect_left(segment.times, start)
+            last = len(segment.times) if end is None else bisect_right(segment.times, end)
+            rows.extend(header[2:5] for header in segment.headers[first:last])
+        data = np.array(rows, dtype=np.float64).reshape(-1, 3)
+        return data[:, 0], data[:, 1], data[:, 2]
+
+    def snapshot(self, frame):
+        """Return a ProcessSnapshot whose columns share memory with ``frame``."""
+        return ProcessSnapshot(frame.timestamp, frame.cpu_percent, frame.memory_percent, self.names,
+                               frame.pid, frame.create_time, frame.name_id, frame.cpu, frame.memory_mb)
+
+
+class LogPlayback:
+    """Feed snapshots from a log to a ProcessSampler, live or as a replay.
+
+    Without ``start`` it returns each new frame the writer appends (attach
+    mode). With ``start`` it replays from that timestamp, ``speed`` times
+    faster than real time. Use an instance as the sampler's ``collect``, and
+    its ``system_series`` and ``now`` to fill and scroll the graphs, so a
+    replay's history ends where its frames begin and its graphs follow the
+    replayed time rather than the wall clock.
+    """
+
+    def __init__(self, reader, start=None, speed=1.0):
+        self.reader = reader
+        self.start = start
+        self.speed = speed
+        self._wall_start = time.time()
+        self._last_timestamp = None
+
+    def __call__(self):
+        self.reader.refresh()
+        if self.start is None:
+            frame = self.reader.latest()
+        else:
+            position = self.start + (time.time() - self._wall_start) * self.speed
+            frame = None
+            for frame in self.reader.frames(self._last_timestamp, position):
+                pass
+
+        if frame is None or frame.timestamp == self._last_timestamp:
+            return None
+        self._last_timestamp = frame.timestamp
+        return self.reader.snapshot(frame)
+
+    def now(self):
+        """Return the time being shown: the wall clock, or the replay position."""
+        if self.start is None:
+            return time.time()
+        return self.start + (time.time() - self._wall_start) * self.speed
+
+    def system_series(self, start=None):
+        """Return (times, CPU %, memory %) of the logged samples from ``start`` up to the first frame played."""
+        if self.start is None:
+            return self.reader.system_series(start)
+        # The replay starts with the last frame at or before its start, so stop just short of that one
+        times, cpu, memory = self.reader.system_series(start, self.start)
+        return times[:-1], cpu[:-1], memory[:-1]
@@ -2,14 +2,43 @@ import psutil
 import tkinter as tk
 from tkinter import ttk, messagebox
 
+from monitor.collector import SystemMetrics
+from monitor.diagnostics import Diagnostics
+from monitor.diagnostics_panel import DiagnosticsPanel
+from monitor.history_panel import ProcessHistoryPanel
+from monitor.process_history import ProcessHistory
+from monitor.rates import RateHistory, SystemRates
+from monitor.rates_panel import RatesPanel
+from monitor.rules import RuleEngine, run_actions, tag_color
+from monitor.sampler import ProcessSampler
+from monitor.scheduler import RefreshScheduler
+from monitor.search_index import ProcessSearchIndex
+from monitor.snapshot_store import TOP_K, VIEW_MODES
+from monitor.sort_order import SortOrder
+from monitor.sources import create_rules, create_sampler, parse_source_args
+from monitor.table_sync import TreeviewSync, iid_key
+
+SORT_BY_HEADING = {"PID": "pid", "Name": "name", "CPU%": "cpu_percent", "Memory (MB)": "memory_mb",
+                   "Read/s": "read_bps", "Write/s": "write_bps"}
+
 class TaskManagerApp:
-    def __init__(self, root):
+    def __init__(self, root, sampler=None, rules=None):
         self.root = root
         self.root.title("Task Manager")
         self.root.geometry("800x600")
 
-        # List of unwanted/suspicious processes
-        self.unwanted_processes = ["unwanted.exe", "malware.exe", "suspicious.exe"]
+        # Rules tag unwanted/suspicious processes, matching each new process once
+        self.rules = rules or RuleEngine()
+        self.rule_result = None
+
+        # Click a heading to sort by it, again to reverse; the order survives refreshes
+        self.sort_order = SortOrder()
+
+        # What the monitor itself costs, shown in the Diagnostics tab
+        self.diagnostics = Diagnostics()
+
+        # Recent CPU and memory of each process, drawn in a side panel for the selected one
+        self.process_history = ProcessHistory()
 
         # Create notebook (tabs)
         self.notebook = ttk.Notebook(root)
@@ -25,9 +54,43 @@ class TaskManagerApp:
         self.notebook.add(self.processes_tab, text="Processes")
         self.setup_processes()
 
-        # Start updating system metrics and process list
-        self.update_data()
-        self.refresh_processes()
+        # Tab 3: Diagnostics
+        self.diagnostics_tab = DiagnosticsPanel(self.notebook, self.diagnostics)
+        self.notebook.add(self.diagnostics_tab, text="Diagnostics")
+
+        # Collect processes on a background thread, refreshing every 5 seconds
+        self.snapshot = None
+        self.system_metrics = SystemMetrics()
+        self.search_index = ProcessSearchIndex()
+        self.sampler = (sampler or ProcessSampler(interval=None)).start()
+
+        # Tab 4: per-core CPU, disk and network rates; only for this machine, as no source carries them
+        self.rates_tab = None
+        if self.sampler.local:
+            self.system_rates = SystemRates()
+            self.rate_history = RateHistory()
+            self.rates_tab = RatesPanel(self.notebook, self.rate_history)
+            self.notebook.insert(self.diagnostics_tab, self.rates_tab, text="Cores & I/O")
+
+        # One scheduler runs every periodic job; jobs for a hidden tab or a minimized window wait
+        self.scheduler = RefreshScheduler(self.root.after, self.root.after_cancel, active=self.window_visible)
+        if self.sampler.local:
+            # Otherwise the labels show the remote host's or the log's readings, as each snapshot arrives
+            self.scheduler.every("metrics", 2, self.update_data,
+                                 when=lambda: self.tab_visible(self.system_metrics_tab), first=0)
+        if self.sampler.interval is None:
+            self.scheduler.every("processes", 5, self.sampler.refresh,
+                                 when=lambda: self.tab_visible(self.processes_tab) and not self.sampler.busy,
+                                 cost=lambda: self.sampler.last_duration)
+        self.scheduler.every("poll", 0.1, self.poll_sampler, first=0)
+        self.scheduler.every("rules", 2, self.reload_rules)
+        if self.rates_tab is not None:
+            self.scheduler.every("rates", 1, self.update_rates, first=0)
+        self.scheduler.every("diagnostics", 1, self.diagnostics_tab.refresh,
+                             when=lambda: self.tab_visible(self.diagnostics_tab), first=0)
+        self.diagnostics.watch_loop(self.root.after)
+        self.notebook.bind("<<NotebookTabChanged>>", self.scheduler.wake)
+        self.root.bind("<Map>", self.scheduler.wake)
 
     def setup_system_metrics(self):
         """Set up the system metrics tab."""
@@ -52,66 +115,162 @@ class TaskManagerApp:
         ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT, padx=5)
         self.search_entry = ttk.Entry(search_frame)
         self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
-        self.search_entry.bind("<KeyRelease>", lambda event: self.refresh_processes())  # Dynamic search
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)  # Dynamic search
+
+        # Every process, or only the top few by CPU or memory
+        self.view_mode = tk.StringVar(value=next(iter(VIEW_MODES)))
+        view_box = ttk.Combobox(search_frame, textvariable=self.view_mode, values=list(VIEW_MODES),
+                                state="readonly", width=18)
+        view_box.pack(side=tk.LEFT, padx=5)
+        view_box.bind("<<ComboboxSelected>>", lambda event: self.refresh_processes())
+
+        # History of the selected process, beside the list
+        self.history_panel = ProcessHistoryPanel(frame, self.process_history)
+        self.history_panel.pack(side=tk.RIGHT, fill=tk.Y)
 
         # Treeview for process display
-        columns = ("PID", "Name", "CPU%", "Memory (MB)")
+        columns = ("PID", "Name", "CPU%", "Memory (MB)", "Read/s", "Write/s")
         self.tree = ttk.Treeview(frame, columns=columns, show="headings")
         for col in columns:
-            self.tree.heading(col, text=col)
+            self.tree.heading(col, text=col, command=lambda c=col: self.sort_by(c))
         self.tree.column("PID", width=80)
         self.tree.column("Name", width=200)
         self.tree.column("CPU%", width=100)
         self.tree.column("Memory (MB)", width=150)
+        self.tree.column("Read/s", width=90)
+        self.tree.column("Write/s", width=90)
         self.tree.pack(fill=tk.BOTH, expand=True)
+        self.tree_sync = TreeviewSync(self.tree)
+        self.tree.bind("<<TreeviewSelect>>", self.show_history)
 
-        # Configure tags for unwanted processes
-        self.tree.tag_configure("unwanted", foreground="red")
+        # Rows tagged by a rule are coloured: "unwanted" in red, other tags in orange
+        self.style_rule_tags()
 
         # Buttons for actions
         button_frame = ttk.Frame(frame)
         button_frame.pack(fill=tk.X, pady=10)
 
-        ttk.Button(button_frame, text="Refresh", command=self.refresh_processes).pack(side=tk.LEFT, padx=10)
+        ttk.Button(button_frame, text="Refresh", command=self.sampler_refresh).pack(side=tk.LEFT, padx=10)
         ttk.Button(button_frame, text="Terminate", command=self.terminate_process).pack(side=tk.LEFT, padx=10)
 
+        # Latest rule notifications and rules file errors
+        self.rules_label = ttk.Label(button_frame, text="")
+        self.rules_label.pack(side=tk.LEFT, padx=10)
+
     def update_data(self):
         """Update CPU and memory usage in real-time without UI freezing."""
-        cpu_usage = psutil.cpu_percent(interval=None)
-        memory = psutil.virtual_memory().percent
+        self.show_usage(*self.system_metrics.read())
 
+    def show_usage(self, cpu_usage, memory):
+        """Update the CPU and memory labels."""
         self.cpu_label.config(text=f"CPU Usage: {cpu_usage:.1f}%")
         self.memory_label.config(text=f"Memory Usage: {memory:.1f}%")
 
-        # Schedule next update
-        self.root.after(2000, self.update_data)
+    def update_rates(self):
+        """Sample the per-core, disk and network rates, and redraw them if their tab is shown."""
+        with self.diagnostics.stage("rates"):
+            self.rate_history.append(self.system_rates.sample())
+        if self.tab_visible(self.rates_tab):
+            with self.diagnostics.stage("rates render"):
+                self.rates_tab.refresh()
+
+    def window_visible(self):
+        return self.root.state() not in ("iconic", "withdrawn")
+
+    def tab_visible(self, tab):
+        return self.notebook.select() == str(tab)
+
+    def sampler_refresh(self):
+        """Ask the background sampler for a fresh snapshot right away."""
+        if "processes" in self.scheduler:
+            self.scheduler.run_soon("processes")  # Also restarts the interval
+        else:
+            self.sampler.refresh()
+
+    def poll_sampler(self):
+        """Pick up the newest snapshot from the sampler without blocking the UI."""
+        snapshot = self.sampler.poll()
+        if snapshot is not None:
+            if self.sampler.local:
+                self.diagnostics.record("collect", self.sampler.last_duration, self.sampler.last_blocks)
+            else:
+                self.show_usage(snapshot.cpu_percent, snapshot.memory_percent)
+            self.snapshot = snapshot
+            with self.diagnostics.stage("history update"):
+                self.process_history.update(snapshot)
+            self.history_panel.refresh()
+            self.apply_rules()
+            self.refresh_processes()
+
+    def apply_rules(self):
+        """Evaluate the rules on the current snapshot and carry out what fired, in one batch."""
+        with self.diagnostics.stage("rules"):
+            self.rule_result = self.rules.evaluate(self.snapshot)
+        run_actions(self.rule_result.fired, self.show_rule_messages, can_terminate=self.sampler.local)
+
+    def show_rule_messages(self, messages):
+        """Show the newest rule notification, with how many more came in the same batch."""
+        more = f" (+{len(messages) - 1} more)" if len(messages) > 1 else ""
+        self.rules_label.config(text=messages[-1] + more)
+
+    def reload_rules(self):
+        """Pick up changes to the rules file; a broken file keeps the previous rules."""
+        if self.rules.reload_if_changed():
+            self.rules_label.config(text="Rules reloaded")
+            self.style_rule_tags()
+            if self.snapshot is not None:
+                self.apply_rules()
+                self.refresh_processes()
+        elif self.rules.error:
+            self.rules_label.config(text=f"Rules not reloaded: {self.rules.error}")
+
+    def style_rule_tags(self):
+        """Give every tag the rules can add a colour in the process list."""
+        for tag in self.rules.tags:
+            self.tree.tag_configure(tag, foreground=tag_color(tag))
+
+    def schedule_search(self, event=None):
+        """Debounce keystrokes: search once typing pauses for 150 ms."""
+        self.scheduler.once("search", 0.15, self.refresh_processes)
 
     def refresh_processes(self):
-        """Refresh process list, applying search filter."""
+        """Refresh process list from the last snapshot, applying search filter."""
         search_query = self.search_entry.get().lower().strip()
-        
-        for row in self.tree.get_children():
-            self.tree.delete(row)
 
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_info']):
-            try:
-                pid = str(proc.info['pid'])
-                name = proc.info['name']
-                cpu_percent = proc.cpu_percent(interval=None)
-                memory_mb = proc.info['memory_info'].rss / (1024 ** 2)
+        if self.snapshot is None:
+            return
 
-                # Apply search filter (matches name or PID)
-                if search_query and search_query not in name.lower() and search_query not in pid:
-                    continue
+        snapshot = self.snapshot
+        rule_result = self.rule_result
+        # Apply search filter (matches name or PID), keep the top rows in top-K mode; only those are formatted
+        with self.diagnostics.stage("filter"):
+            indices = self.search_index.rows(snapshot, search_query)
+            top_column = VIEW_MODES[self.view_mode.get()]
+            if top_column is not None:
+                indices = snapshot.top_k(top_column, TOP_K, indices)
+        with self.diagnostics.stage("sort"):
+            indices = self.sort_order.apply(snapshot, indices)
 
-                tag = "unwanted" if name.lower() in [p.lower() for p in self.unwanted_processes] else ""
+        # Only changed rows are touched, so the selection and scroll position survive
+        with self.diagnostics.stage("table"):
+            rows = []
+            for i in indices:
+                rows.append((snapshot.key(i), snapshot.format_row(i), rule_result.row_tags(i)))
+            self.tree_sync.update(rows)
 
-                self.tree.insert("", tk.END, values=(pid, name, f"{cpu_percent:.1f}", f"{memory_mb:.2f}"), tags=(tag,))
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
+    def show_history(self, event=None):
+        """Show the history of the selected process in the side panel."""
+        selected = self.tree.selection()
+        key = iid_key(selected[0]) if selected else None
+        if key is not None:
+            self.history_panel.show(key, self.tree.item(selected[0], "values")[1])
 
-        # Auto-refresh every 5 seconds
-        self.root.after(5000, self.refresh_processes)
+    def sort_by(self, heading):
+        """Sort by a column heading, or reverse the order if it is already the sort column."""
+        self.sort_order.toggle(SORT_BY_HEADING[heading])
+        for other, column in SORT_BY_HEADING.items():
+            self.tree.heading(other, text=other + self.sort_order.arrow(column))
+        self.refresh_processes()
 
     def terminate_process(self):
         """Terminate selected process."""
@@ -120,11 +279,18 @@ class TaskManagerApp:
             messagebox.showwarning("No Selection", "Please select a process to terminate.")
             return
 
-        pid = int(self.tree.item(selected_item, "values")[0])
+        if not self.sampler.local:
+            messagebox.showwarning("Remote Processes", "Processes can only be terminated on the machine being monitored.")
+            return
+
+        pid, create_time = iid_key(selected_item[0])
         try:
-            psutil.Process(pid).terminate()
+            process = psutil.Process(pid)
+            if abs(process.create_time() - create_time) > 1:
+                raise psutil.NoSuchProcess(pid)  # The PID was reused since the list was refreshed
+            process.terminate()
             messagebox.showinfo("Success", f"Process {pid} terminated successfully.")
-            self.refresh_processes()
+            self.sampler_refresh()
         except psutil.NoSuchProcess:
             messagebox.showerror("Error", "The process no longer exists.")
         except psutil.AccessDenied:
@@ -132,6 +298,8 @@ class TaskManagerApp:
 
 # Run the application
 if __name__ == "__main__":
+    args = parse_source_args("Task Manager", rules=True)
     root = tk.Tk()
-    app = TaskManagerApp(root)
+    sampler, _ = create_sampler(args, interval=None)
+    app = TaskManagerApp(root, sampler, create_rules(args, sampler))
     root.mainloop()
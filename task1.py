@@ -1,26 +1,94 @@
+import time
 import psutil
 import tkinter as tk
 from tkinter import ttk, messagebox
 import customtkinter as ctk
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+from monitor.anomaly import AlertLog, ProcessAnomalies, SystemAnomalies, format_alert
+from monitor.blit import BlitRenderer
+from monitor.collector import SystemMetrics
+from monitor.diagnostics import Diagnostics
+from monitor.diagnostics_panel import DiagnosticsPanel
+from monitor.history import SPANS, MetricHistory
+from monitor.history_panel import ProcessHistoryPanel
+from monitor.process_history import ProcessHistory
+from monitor.rates import RateHistory, SystemRates, format_rate
+from monitor.rates_panel import RatesPanel
+from monitor.sampler import ProcessSampler
+from monitor.scheduler import RefreshScheduler
+from monitor.search_index import ProcessSearchIndex
+from monitor.sort_order import SortOrder
+from monitor.sources import create_sampler, parse_source_args
+from monitor.table_sync import TreeviewSync, iid_key
+
+SORT_BY_HEADING = {"PID": "pid", "Name": "name", "CPU %": "cpu_percent", "Memory %": "memory_mb",
+                   "Read/s": "read_bps", "Write/s": "write_bps"}
+ALERT_COLUMNS = ("Time", "Source", "Series", "Kind", "Value", "Baseline")
 
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("blue")
 
 class TaskManagerApp:
-    def __init__(self, root):
+    def __init__(self, root, sampler=None, log=None):
         self.root = root
         self.root.title("🖥️ Task Manager")
         self.root.geometry("1000x750")
         
         self.notebook = ttk.Notebook(root)
         self.notebook.pack(fill='both', expand=True)
+
+        # Processes are collected off the Tk thread, every few seconds and after a terminate
+        self.snapshot = None
+        self.search_index = ProcessSearchIndex()
+        self.sort_order = SortOrder()  # Set by clicking a heading, kept across refreshes
+        self.total_memory = psutil.virtual_memory().total
+        self.system_metrics = SystemMetrics()
+        self.sampler = (sampler or ProcessSampler(interval=None)).start()
+        # With a log attached or an agent connected the graphs follow its samples instead of this machine
+        self.log = log
+        self.clock = log.now if log is not None else time.time  # A replay's graphs follow the replayed time
+        # Streaming detectors flag spikes and sustained rises; alerts are listed and marked on the graphs
+        self.system_anomalies = SystemAnomalies()
+        self.process_anomalies = ProcessAnomalies()
+        self.alert_log = AlertLog()
+        self.diagnostics = Diagnostics()  # What the monitor itself costs
+        self.process_history = ProcessHistory()  # Recent CPU and memory per process, for the side panel
+        self.cpu_history = MetricHistory()
+        self.mem_history = MetricHistory()
+        if self.log is not None:
+            self.load_history(self.log)
+
+        # The window comes up with labels only; matplotlib and the process table are loaded when first shown
+        self.graphs_loaded = False
+        self.graphs_pending = False
+        self.processes_loaded = False
         
         self.create_system_monitor_tab()
         self.create_processes_tab()
+        self.create_alerts_tab()
+        self.create_rates_tab()
+        self.diagnostics_tab = DiagnosticsPanel(self.notebook, self.diagnostics)
+        self.notebook.add(self.diagnostics_tab, text='🩺 Diagnostics')
         self.create_theme_toggle_button()
 
+        # One scheduler runs every periodic job; history keeps sampling while the graphs are hidden
+        self.scheduler = RefreshScheduler(self.root.after, self.root.after_cancel)
+        if self.sampler.local:
+            self.scheduler.every("sample", 1, self.sample_system, first=0)
+        self.scheduler.every("graphs", 1, self.update_system_monitor, when=self.graphs_visible, first=0)
+        if self.sampler.interval is None:
+            # The per-process detectors need a steady stream of snapshots, not only the visible tab
+            self.scheduler.every("processes", 5, self.sampler.refresh, when=lambda: not self.sampler.busy,
+                                 cost=lambda: self.sampler.last_duration)
+        self.scheduler.every("poll", 0.1, self.poll_sampler, first=0)
+        if self.rates_tab is not None:
+            self.scheduler.every("rates", 1, self.update_rates, first=0)
+        self.scheduler.every("diagnostics", 1, self.diagnostics_tab.refresh,
+                             when=lambda: self.notebook.select() == str(self.diagnostics_tab), first=0)
+        self.diagnostics.watch_loop(self.root.after)
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
+        self.root.bind("<Map>", self.scheduler.wake)
+
     def create_theme_toggle_button(self):
         self.theme_button = ctk.CTkButton(self.root, text="🌗 Toggle Theme", command=self.toggle_theme)
         self.theme_button.pack(pady=10)
@@ -29,6 +97,8 @@ class TaskManagerApp:
         current_theme = ctk.get_appearance_mode()
         new_theme = "Light" if current_theme == "Dark" else "Dark"
         ctk.set_appearance_mode(new_theme)
+        if self.graphs_loaded:
+            self.renderer.invalidate()
 
         # Update treeview colors for light/dark theme
         style = ttk.Style()
@@ -48,7 +118,19 @@ class TaskManagerApp:
         self.mem_usage_label = ctk.CTkLabel(self.system_monitor_tab, text="Memory Usage: 0%", font=("Arial", 14))
         self.mem_usage_label.pack(pady=5)
 
-        self.fig, (self.cpu_ax, self.mem_ax) = plt.subplots(1, 2, figsize=(10, 5), facecolor='#2e2e2e')
+        # History span shown by the graphs
+        self.history_span = tk.StringVar(value="1 min")
+        self.span_menu = ctk.CTkOptionMenu(self.system_monitor_tab, values=list(SPANS), variable=self.history_span,
+                                           command=self.on_span_changed)
+        self.span_menu.pack(pady=5)
+
+    def load_graphs(self):
+        # Imported on first use: matplotlib is the slowest part of startup. A bare Figure skips pyplot's machinery
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+        self.fig = Figure(figsize=(10, 5), facecolor='#2e2e2e')
+        self.cpu_ax, self.mem_ax = self.fig.subplots(1, 2)
 
         # Configure CPU Graph
         self.cpu_ax.set_facecolor('#1e1e1e')
@@ -58,7 +140,7 @@ class TaskManagerApp:
         self.cpu_ax.tick_params(colors='white')
         self.cpu_ax.set_title('CPU Usage (%)', color='white')
         self.cpu_line, = self.cpu_ax.plot([], [], 'lime', linewidth=2)
-        self.cpu_data = []
+        self.cpu_marks, = self.cpu_ax.plot([], [], 'o', color='red', markersize=6)
 
         # Configure Memory Graph
         self.mem_ax.set_facecolor('#1e1e1e')
@@ -68,89 +150,249 @@ class TaskManagerApp:
         self.mem_ax.tick_params(colors='white')
         self.mem_ax.set_title('Memory Usage (%)', color='white')
         self.mem_line, = self.mem_ax.plot([], [], 'cyan', linewidth=2)
-        self.mem_data = []
-        self.time_data = []
+        self.mem_marks, = self.mem_ax.plot([], [], 'o', color='red', markersize=6)
 
         self.canvas = FigureCanvasTkAgg(self.fig, master=self.system_monitor_tab)
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
-        self.update_system_monitor()
+        # Axes, grids and ticks are drawn once and cached; each update only redraws the lines and markers
+        self.set_graph_limits()
+        self.renderer = BlitRenderer(self.canvas, (self.cpu_line, self.mem_line, self.cpu_marks, self.mem_marks))
+        self.render_label = ctk.CTkLabel(self.system_monitor_tab, text="Render: 0.0 ms", font=("Arial", 10))
+        self.render_label.pack()
+        self.graphs_loaded = True
 
     def create_processes_tab(self):
+        # An empty tab; its widgets are built by load_processes the first time it is selected
         self.processes_tab = ctk.CTkFrame(self.notebook)
         self.notebook.add(self.processes_tab, text='⚙️ Processes')
 
+    def load_processes(self):
         self.search_label = ctk.CTkLabel(self.processes_tab, text="Search:")
         self.search_label.pack(side=tk.TOP, anchor='nw', padx=5, pady=5)
         
         self.search_var = tk.StringVar()
         self.search_entry = ctk.CTkEntry(self.processes_tab, textvariable=self.search_var, placeholder_text="🔍 Search Process")
         self.search_entry.pack(side=tk.TOP, fill=tk.X, padx=5, pady=5)
-        self.search_entry.bind('<KeyRelease>', self.update_processes)
+        self.search_entry.bind('<KeyRelease>', self.schedule_search)
+
+        # History of the selected process, beside the table
+        self.history_panel = ProcessHistoryPanel(self.processes_tab, self.process_history)
+        self.history_panel.pack(side=tk.RIGHT, fill=tk.Y)
 
         # Process Table
-        self.tree = ttk.Treeview(self.processes_tab, columns=("PID", "Name", "CPU %", "Memory %"), show='headings', height=20)
-        self.tree.heading("PID", text="PID")
-        self.tree.heading("Name", text="Name")
-        self.tree.heading("CPU %", text="CPU %")
-        self.tree.heading("Memory %", text="Memory %")
+        self.tree = ttk.Treeview(self.processes_tab, columns=tuple(SORT_BY_HEADING), show='headings', height=20)
+        for heading in SORT_BY_HEADING:
+            self.tree.heading(heading, text=heading, command=lambda h=heading: self.sort_by(h))
         self.tree.pack(fill=tk.BOTH, expand=True)
+        self.tree_sync = TreeviewSync(self.tree)
+        self.tree.bind("<<TreeviewSelect>>", self.show_history)
 
         self.terminate_button = ctk.CTkButton(self.processes_tab, text="🛑 Terminate Process", command=self.terminate_process)
         self.terminate_button.pack(pady=5)
+        self.processes_loaded = True
 
-        self.update_processes()
+    def on_tab_changed(self, event=None):
+        if not self.processes_loaded and self.notebook.select() == str(self.processes_tab):
+            with self.diagnostics.stage("load processes"):
+                self.load_processes()
+            self.update_processes()
+        self.scheduler.wake()
+
+    def create_alerts_tab(self):
+        self.alerts_tab = ctk.CTkFrame(self.notebook)
+        self.notebook.add(self.alerts_tab, text='🚨 Alerts')
+
+        # Newest first; the list keeps as many alerts as the alert log
+        self.alerts_tree = ttk.Treeview(self.alerts_tab, columns=ALERT_COLUMNS, show='headings', height=20)
+        for heading in ALERT_COLUMNS:
+            self.alerts_tree.heading(heading, text=heading)
+        self.alerts_tree.column("Source", width=250)
+        self.alerts_tree.pack(fill=tk.BOTH, expand=True)
+
+        self.clear_alerts_button = ctk.CTkButton(self.alerts_tab, text="🧹 Clear Alerts", command=self.clear_alerts)
+        self.clear_alerts_button.pack(pady=5)
+
+    def create_rates_tab(self):
+        # Per-core CPU, disk and network rates; only for this machine, as neither the log nor an agent carries them
+        self.rates_tab = None
+        if self.sampler.local:
+            self.system_rates = SystemRates()
+            self.rate_history = RateHistory()
+            self.rates_tab = RatesPanel(self.notebook, self.rate_history)
+            self.notebook.add(self.rates_tab, text='🔥 Cores & I/O')
+
+    def update_rates(self):
+        with self.diagnostics.stage("rates"):
+            self.rate_history.append(self.system_rates.sample())
+        if self.notebook.select() == str(self.rates_tab):
+            with self.diagnostics.stage("rates render"):
+                self.rates_tab.refresh()
+
+    def record_anomalies(self, anomalies):
+        if not anomalies:
+            return
+        self.alert_log.extend(anomalies)
+        for anomaly in anomalies:
+            self.alerts_tree.insert("", 0, values=format_alert(anomaly))
+        excess = self.alerts_tree.get_children()[self.alert_log.alerts.maxlen:]
+        if excess:
+            self.alerts_tree.delete(*excess)
+
+    def clear_alerts(self):
+        self.alert_log.clear()
+        self.alerts_tree.delete(*self.alerts_tree.get_children())
+
+    def poll_sampler(self):
+        snapshot = self.sampler.poll()
+        if snapshot is not None:
+            if self.sampler.local:
+                self.diagnostics.record("collect", self.sampler.last_duration, self.sampler.last_blocks)
+            self.snapshot = snapshot
+            with self.diagnostics.stage("index update"):
+                self.search_index.update(snapshot)
+            with self.diagnostics.stage("history update"):
+                self.process_history.update(snapshot)
+            if self.processes_loaded:
+                self.history_panel.refresh()
+            self.update_processes()
+            if not self.sampler.local:
+                self.cpu_history.append(snapshot.cpu_percent, snapshot.timestamp)
+                self.mem_history.append(snapshot.memory_percent, snapshot.timestamp)
+                self.record_anomalies(self.system_anomalies.update(snapshot.cpu_percent, snapshot.memory_percent,
+                                                                   snapshot.timestamp))
+            with self.diagnostics.stage("anomalies"):
+                anomalies = self.process_anomalies.update(snapshot)
+            self.record_anomalies(anomalies)
+
+    def load_history(self, log):
+        # Prefill the graphs with the last day of logged system samples
+        times, cpu, memory = log.system_series(log.now() - SPANS["1 day"])
+        for timestamp, cpu_usage, mem_usage in zip(times.tolist(), cpu.tolist(), memory.tolist()):
+            self.cpu_history.append(cpu_usage, timestamp)
+            self.mem_history.append(mem_usage, timestamp)
+
+    def schedule_search(self, event=None):
+        # Debounce keystrokes so fast typing runs one search
+        self.scheduler.once("search", 0.15, self.update_processes)
+
+    def graphs_visible(self):
+        # Not viewable until the window is mapped, so the first run comes after the window is up
+        return (self.root.state() not in ("iconic", "withdrawn") and self.root.winfo_viewable()
+                and self.notebook.select() == str(self.system_monitor_tab))
+
+    def schedule_graphs(self):
+        # "after idle, then after 0": the labels' pending redraws run first, so the first frame is not held up
+        if not self.graphs_pending:
+            self.graphs_pending = True
+            self.root.after_idle(self.root.after, 0, self.show_graphs)
+
+    def show_graphs(self):
+        with self.diagnostics.stage("load graphs"):
+            self.load_graphs()
+        self.update_system_monitor()
+
+    def set_graph_limits(self):
+        span = SPANS[self.history_span.get()]
+        self.cpu_ax.set_xlim(-span, 0)
+        self.cpu_ax.set_ylim(0, 100)
+
+        self.mem_ax.set_xlim(-span, 0)
+        self.mem_ax.set_ylim(0, 100)
+
+    def on_span_changed(self, value):
+        if not self.graphs_loaded:
+            return  # The graphs start out with the selected span
+        # New limits change the ticks, so the cached background has to be redrawn
+        self.set_graph_limits()
+        self.renderer.invalidate()
+        self.renderer.render()
+
+    def sample_system(self):
+        cpu_usage, mem_usage = self.system_metrics.read()
+        now = time.time()
+        self.cpu_history.append(cpu_usage, now)
+        self.mem_history.append(mem_usage, now)
+        self.record_anomalies(self.system_anomalies.update(cpu_usage, mem_usage, now))
 
     def update_system_monitor(self):
-        cpu_usage = psutil.cpu_percent()
-        mem_usage = psutil.virtual_memory().percent
+        now = self.clock()
+        cpu_usage = self.cpu_history.latest() or 0.0
+        mem_usage = self.mem_history.latest() or 0.0
 
         self.cpu_usage_label.configure(text=f"CPU Usage: {cpu_usage}%")
         self.mem_usage_label.configure(text=f"Memory Usage: {mem_usage}%")
+        if not self.graphs_loaded:
+            self.schedule_graphs()
+            return
 
-        self.cpu_data.append(cpu_usage)
-        self.mem_data.append(mem_usage)
-        self.time_data.append(len(self.time_data))
+        # Pick the history tier that fits the plot's pixel width; x is seconds before now
+        span = SPANS[self.history_span.get()]
+        width = int(self.cpu_ax.get_window_extent().width)
+        cpu_times, _, cpu_avg, _ = self.cpu_history.series(span, width, now)
+        mem_times, _, mem_avg, _ = self.mem_history.series(span, width, now)
+        self.cpu_line.set_data(cpu_times - now, cpu_avg)
+        self.mem_line.set_data(mem_times - now, mem_avg)
+        for marks, series in ((self.cpu_marks, "CPU"), (self.mem_marks, "Memory")):
+            times, values = self.alert_log.markers(series, now - span)
+            marks.set_data(times - now, values)
 
-        if len(self.cpu_data) > 50:
-            self.cpu_data.pop(0)
-            self.mem_data.pop(0)
-            self.time_data.pop(0)
+        if self.renderer.render():
+            self.diagnostics.record("render", self.renderer.frame_times[-1])
+            self.render_label.configure(text=f"Render: {self.renderer.last_frame_ms():.1f} ms")
 
-        self.cpu_line.set_data(self.time_data, self.cpu_data)
-        self.mem_line.set_data(self.time_data, self.mem_data)
+    def update_processes(self, event=None):
+        if self.snapshot is None or not self.processes_loaded:
+            return
 
-        self.cpu_ax.set_xlim(max(0, len(self.time_data) - 50), len(self.time_data))
-        self.cpu_ax.set_ylim(0, 10)
+        snapshot = self.snapshot
+        with self.diagnostics.stage("filter"):
+            matches = self.search_index.rows(snapshot, self.search_var.get())
+        with self.diagnostics.stage("sort"):
+            matches = self.sort_order.apply(snapshot, matches)
 
-        self.mem_ax.set_xlim(max(0, len(self.time_data) - 50), len(self.time_data))
-        self.mem_ax.set_ylim(0, 100)
+        with self.diagnostics.stage("table"):
+            memory_percent = snapshot.memory_mb * (1024 ** 2 * 100 / self.total_memory)
+            rows = []
+            for i in matches:
+                rows.append((snapshot.key(i), (int(snapshot.pid[i]), snapshot.name(i), f"{snapshot.cpu[i]:.1f}", f"{memory_percent[i]:.2f}",
+                                               format_rate(snapshot.read_bps[i]), format_rate(snapshot.write_bps[i])), ()))
+            self.tree_sync.update(rows)
 
-        self.canvas.draw()
-        self.root.after(1000, self.update_system_monitor)
+    def show_history(self, event=None):
+        selected = self.tree.selection()
+        key = iid_key(selected[0]) if selected else None
+        if key is not None:
+            self.history_panel.show(key, self.tree.item(selected[0], "values")[1])
 
-    def update_processes(self, event=None):
-        query = self.search_var.get().lower()
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-        
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent']):
-            if query in proc.info['name'].lower():
-                self.tree.insert("", tk.END, values=(proc.info['pid'], proc.info['name'], proc.info['cpu_percent'], proc.info['memory_percent']))
+    def sort_by(self, heading):
+        # A second click on the same heading reverses the order
+        self.sort_order.toggle(SORT_BY_HEADING[heading])
+        for other, column in SORT_BY_HEADING.items():
+            self.tree.heading(other, text=other + self.sort_order.arrow(column))
+        self.update_processes()
 
     def terminate_process(self):
+        if not self.sampler.local:
+            messagebox.showwarning("Remote Processes", "Processes can only be terminated on the machine being monitored.")
+            return
+
         selected_item = self.tree.selection()
         if selected_item:
-            pid = self.tree.item(selected_item)['values'][0]
+            pid, create_time = iid_key(selected_item[0])
             try:
                 proc = psutil.Process(pid)
+                if abs(proc.create_time() - create_time) > 1:
+                    raise psutil.NoSuchProcess(pid)  # The PID was reused since the list was refreshed
                 proc.terminate()
                 messagebox.showinfo("Success", f"Process {pid} terminated successfully!")
-                self.update_processes()
+                self.sampler.refresh()
             except Exception as e:
                 messagebox.showerror("Error", str(e))
 
 if __name__ == "__main__":
+    args = parse_source_args("Task Manager")
     root = ctk.CTk()
-    app = TaskManagerApp(root)
+    sampler, log = create_sampler(args, interval=None)
+    app = TaskManagerApp(root, sampler, log)
     root.mainloop()
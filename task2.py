@@ -1,14 +1,66 @@
+import math
 import sys
+import time
 import psutil
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
-    QTableWidget, QTableWidgetItem, QTabWidget, QLineEdit, QPushButton
+    QTableView, QHeaderView, QTabWidget, QLineEdit, QPushButton, QComboBox, QTableWidget, QTableWidgetItem,
+    QCheckBox, QTreeWidget, QTreeWidgetItem, QMessageBox
 )
-from PyQt5.QtCore import QTimer
-import pyqtgraph as pg
+from PyQt5.QtCore import QEvent, QPointF, Qt, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor, QPainter, QPen, QPolygonF
+
+from monitor.anomaly import AlertLog, ProcessAnomalies, SystemAnomalies, format_alert
+from monitor.cgroups import CgroupTree
+from monitor.diagnostics import STAGE_COLUMNS, Diagnostics
+from monitor.history import SPANS, MetricHistory
+from monitor.process_history import METRICS, ProcessHistory, sparkline_points
+from monitor.process_model import ProcessProxyModel, ProcessTableModel
+from monitor.rates import DEVICE_COLUMNS, RateHistory, SystemRates, device_rows, format_rate, heat_palette
+from monitor.sampler import ProcessSampler
+from monitor.scheduler import RefreshScheduler
+from monitor.search_index import ProcessSearchIndex
+from monitor.snapshot_store import SORT_COLUMNS, TOP_K, VIEW_MODES
+from monitor.sources import create_sampler, parse_source_args
+
+ALERT_COLUMNS = ("Time", "Source", "Series", "Kind", "Value", "Baseline")
+GROUP_HEADERS = ("Cgroup / Name", "PID", "CPU (%)", "Memory (MB)", "Read/s", "Write/s")
+PROFILE_SECONDS = 10
+SPARK_SIZE = (180, 32)
+DETAIL_SIZE = (180, 120)
+
+class Sparkline(QWidget):
+    """A line over the recent history of one metric, with an optional caption."""
+
+    clicked = pyqtSignal()
+
+    def __init__(self, size, color):
+        super().__init__()
+        self.setFixedSize(*size)
+        self.pen = QPen(QColor(color), 2)
+        self.points = []
+        self.caption = ""
+
+    def set_points(self, points, caption=""):
+        self.points = points
+        self.caption = caption
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), QColor("#1e1e1e"))
+        if len(self.points) >= 4:
+            painter.setPen(self.pen)
+            painter.drawPolyline(QPolygonF([QPointF(x, y) for x, y in zip(self.points[::2], self.points[1::2])]))
+        if self.caption:
+            painter.setPen(Qt.white)
+            painter.drawText(3, 12, self.caption)
+
+    def mousePressEvent(self, event):
+        self.clicked.emit()
 
 class SystemMonitor(QWidget):
-    def __init__(self):
+    def __init__(self, sampler=None, log=None):
         super().__init__()
 
         self.setWindowTitle("System Monitor")
@@ -16,37 +68,88 @@ class SystemMonitor(QWidget):
 
         layout = QVBoxLayout()
 
+        # Streaming detectors flag spikes and sustained rises; alerts are listed and marked on the graphs
+        self.system_anomalies = SystemAnomalies()
+        self.process_anomalies = ProcessAnomalies()
+        self.alert_log = AlertLog()
+        self.diagnostics = Diagnostics()  # What the monitor itself costs
+        self.cpu_history = MetricHistory()
+        self.mem_history = MetricHistory()
+        self.clock = log.now if log is not None else time.time  # A replay's graphs follow the replayed time
+        self.search_index = ProcessSearchIndex()
+        self.process_history = ProcessHistory()  # Recent CPU and memory per process, for the side panel
+        self.history_key = None  # (pid, create_time) of the process shown in the side panel
+        self.history_detail = 0  # Index into METRICS of the detail graph
+        self.snapshot = None
+        self.table_stale = False  # A snapshot arrived while the process tab was hidden or not built yet
+        # Processes grouped by cgroup, only kept up to date while the Cgroups box is checked
+        self.cgroup_tree = None
+        self.group_items = {}  # CgroupTree key -> item shown for it
+        self.group_loaded = set()  # Groups whose processes have been added, on first expanding them
+        self.group_generation = None  # CgroupTree.generation last shown
+        self.refresh_interval = 5
+
+        # The window comes up with cheap widgets only; pyqtgraph and the process table are loaded when first shown
+        self.graphs_loaded = False
+        self.processes_loaded = False
+        self.rates_loaded = False
+        self.first_frame_shown = False
+
         self.tabs = QTabWidget()
         self.cpu_mem_tab = QWidget()
         self.process_tab = QWidget()
+        self.alerts_tab = QWidget()
+        self.diagnostics_tab = QWidget()
 
         self.tabs.addTab(self.cpu_mem_tab, "📊 CPU & Memory")
         self.tabs.addTab(self.process_tab, "🖥 Running Processes")
+        self.tabs.addTab(self.alerts_tab, "🚨 Alerts")
+        self.tabs.addTab(self.diagnostics_tab, "🩺 Diagnostics")
 
         self.init_cpu_mem_tab()
-        self.init_process_tab()
+        self.init_alerts_tab()
+        self.init_diagnostics_tab()
 
         layout.addWidget(self.tabs)
         self.setLayout(layout)
 
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_stats)
-        self.timer.start(5000)  # Refresh every 5 seconds
+        # Collect on a background thread every 5 seconds; the poll job only picks up finished snapshots
+        self.sampler = (sampler or ProcessSampler(interval=None)).start()
+        if log is not None:
+            self.load_history(log)
+
+        # Per-core CPU, disk and network rates; only for this machine, as neither the log nor an agent carries them
+        self.rates_tab = None
+        if self.sampler.local:
+            self.system_rates = SystemRates()
+            self.rate_history = RateHistory()
+            self.rates_tab = QWidget()
+            self.tabs.insertTab(self.tabs.indexOf(self.diagnostics_tab), self.rates_tab, "🔥 Cores & I/O")
+
+        # One scheduler runs every periodic job; nothing runs while the window is minimized
+        self.scheduler = RefreshScheduler(QTimer.singleShot, active=lambda: self.isVisible() and not self.isMinimized())
+        if self.sampler.interval is None:
+            self.scheduler.every("processes", self.refresh_interval, self.sampler.refresh,
+                                 when=lambda: not self.sampler.busy, cost=lambda: self.sampler.last_duration)
+        self.scheduler.every("poll", 0.1, self.update_stats, first=0)
+        self.scheduler.every("countdown", 1, self.update_timer, first=0)
+        if self.rates_tab is not None:
+            self.scheduler.every("rates", 1, self.update_rates, first=0)
+        self.scheduler.every("diagnostics", 1, self.update_diagnostics,
+                             when=lambda: self.tabs.currentWidget() is self.diagnostics_tab, first=0)
+        self.diagnostics.watch_loop(QTimer.singleShot)
+        self.tabs.currentChanged.connect(self.scheduler.wake)
+        self.tabs.currentChanged.connect(self.update_table)
+        self.tabs.currentChanged.connect(self.update_graphs)
 
     def init_cpu_mem_tab(self):
+        # Labels only; the graphs are added by load_graphs
         layout = QVBoxLayout()
 
-        self.cpu_graph = pg.PlotWidget()
-        self.cpu_graph.setTitle("🔵 CPU Usage (%)", color='w', size='12pt')
-        self.cpu_graph.setYRange(0, 100)
-        self.cpu_graph.showGrid(x=True, y=True, alpha=0.3)
-        self.cpu_curve = self.cpu_graph.plot(pen=pg.mkPen(color="cyan", width=2))
-
-        self.mem_graph = pg.PlotWidget()
-        self.mem_graph.setTitle("🟢 Memory Usage (%)", color='w', size='12pt')
-        self.mem_graph.setYRange(0, 100)
-        self.mem_graph.showGrid(x=True, y=True, alpha=0.3)
-        self.mem_curve = self.mem_graph.plot(pen=pg.mkPen(color="magenta", width=2))
+        self.span_box = QComboBox()
+        self.span_box.addItems(list(SPANS))
+        self.span_box.currentTextChanged.connect(self.update_graphs)
+        layout.addWidget(self.span_box)
 
         self.cpu_label = QLabel("CPU: 0%")
         self.cpu_label.setStyleSheet("font-size: 14px; color: red; font-weight: bold;")
@@ -54,15 +157,33 @@ class SystemMonitor(QWidget):
         self.mem_label = QLabel("Memory: 0%")
         self.mem_label.setStyleSheet("font-size: 14px; color: red; font-weight: bold;")
 
-        layout.addWidget(self.cpu_graph)
         layout.addWidget(self.cpu_label)
-        layout.addWidget(self.mem_graph)
         layout.addWidget(self.mem_label)
 
         self.cpu_mem_tab.setLayout(layout)
 
-        self.cpu_data = []
-        self.mem_data = []
+    def load_graphs(self):
+        import pyqtgraph as pg  # Imported on first use, it is the slowest part of startup
+
+        self.cpu_graph = pg.PlotWidget()
+        self.cpu_graph.setTitle("🔵 CPU Usage (%)", color='w', size='12pt')
+        self.cpu_graph.setYRange(0, 100)
+        self.cpu_graph.showGrid(x=True, y=True, alpha=0.3)
+        self.cpu_curve = self.cpu_graph.plot(pen=pg.mkPen(color="cyan", width=2))
+        self.cpu_marks = self.cpu_graph.plot(pen=None, symbol='o', symbolSize=8, symbolBrush='r')
+
+        self.mem_graph = pg.PlotWidget()
+        self.mem_graph.setTitle("🟢 Memory Usage (%)", color='w', size='12pt')
+        self.mem_graph.setYRange(0, 100)
+        self.mem_graph.showGrid(x=True, y=True, alpha=0.3)
+        self.mem_curve = self.mem_graph.plot(pen=pg.mkPen(color="magenta", width=2))
+        self.mem_marks = self.mem_graph.plot(pen=None, symbol='o', symbolSize=8, symbolBrush='r')
+
+        # Each graph goes above its label
+        layout = self.cpu_mem_tab.layout()
+        layout.insertWidget(layout.indexOf(self.cpu_label), self.cpu_graph)
+        layout.insertWidget(layout.indexOf(self.mem_label), self.mem_graph)
+        self.graphs_loaded = True
 
     def init_process_tab(self):
         layout = QVBoxLayout()
@@ -70,85 +191,528 @@ class SystemMonitor(QWidget):
         search_layout = QHBoxLayout()
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("🔍 Search process...")
-        self.search_input.textChanged.connect(self.search_process)
+        # Search once typing pauses instead of on every keystroke
+        self.search_input.textChanged.connect(lambda: self.scheduler.once("search", 0.15, self.search_process))
         self.terminate_button = QPushButton("❌ Terminate")
         self.terminate_button.clicked.connect(self.terminate_process)
+        self.terminate_button.setEnabled(self.sampler.local)
+        # Every process, or only the top few by CPU or memory
+        self.view_box = QComboBox()
+        self.view_box.addItems(list(VIEW_MODES))
+        self.view_box.currentTextChanged.connect(self.change_view)
+        # Containers and slices with their totals; expanding one lists its processes
+        self.group_box = QCheckBox("Cgroups")
+        self.group_box.setEnabled(self.sampler.local)
+        self.group_box.toggled.connect(self.toggle_groups)
         search_layout.addWidget(self.search_input)
+        search_layout.addWidget(self.group_box)
+        search_layout.addWidget(self.view_box)
         search_layout.addWidget(self.terminate_button)
 
-        self.process_table = QTableWidget()
-        self.process_table.setColumnCount(4)
-        self.process_table.setHorizontalHeaderLabels(["PID", "Name", "CPU (%)", "Memory (MB)"])
-        self.process_table.setSelectionBehavior(self.process_table.SelectRows)  
+        # The model formats cells on demand and the proxy filters and sorts, so only rows on screen are built
+        self.process_model = ProcessTableModel(self)
+        self.process_proxy = ProcessProxyModel(self.search_index, self, self.diagnostics)
+        self.process_proxy.setSourceModel(self.process_model)
+        self.process_table = QTableView()
+        self.process_table.setModel(self.process_proxy)
+        self.process_table.setSelectionBehavior(QTableView.SelectRows)
+        self.process_table.setSortingEnabled(True)
+        self.process_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)  # No per-row height bookkeeping
+        self.process_table.verticalHeader().setDefaultSectionSize(22)
+        self.process_table.verticalHeader().hide()
 
         self.countdown_label = QLabel("🔄 Refreshing in: 5s")
         self.countdown_label.setStyleSheet("font-size: 14px; color: red; font-weight: bold;")
 
+        self.process_table.selectionModel().selectionChanged.connect(self.show_history)
+
+        self.group_tree = QTreeWidget()
+        self.group_tree.setHeaderLabels(GROUP_HEADERS)
+        self.group_tree.setUniformRowHeights(True)
+        self.group_tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.group_tree.itemExpanded.connect(self.expand_group)
+        self.group_tree.itemSelectionChanged.connect(self.show_history)
+        self.group_tree.hide()
+
         layout.addLayout(search_layout)
         layout.addWidget(self.countdown_label)
-        layout.addWidget(self.process_table)
+        table_layout = QHBoxLayout()
+        table_layout.addWidget(self.process_table, 1)
+        table_layout.addWidget(self.group_tree, 1)
+        table_layout.addLayout(self.init_history_panel())
+        layout.addLayout(table_layout)
 
         self.process_tab.setLayout(layout)
+        self.processes_loaded = True
+        self.update_timer()
+
+    def init_history_panel(self):
+        # History of the selected process: a sparkline per metric, click one to see it in the detail graph
+        layout = QVBoxLayout()
+        self.history_title = QLabel("Select a process")
+        self.history_title.setStyleSheet("font-weight: bold;")
+        layout.addWidget(self.history_title)
+        self.history_labels = []
+        self.sparklines = []
+        for index, (label, _, _) in enumerate(METRICS):
+            value_label = QLabel(label)
+            sparkline = Sparkline(SPARK_SIZE, "lime")
+            sparkline.clicked.connect(lambda index=index: self.set_history_detail(index))
+            layout.addWidget(value_label)
+            layout.addWidget(sparkline)
+            self.history_labels.append(value_label)
+            self.sparklines.append(sparkline)
+        self.history_detail_label = QLabel("")
+        self.detail_graph = Sparkline(DETAIL_SIZE, "cyan")
+        layout.addWidget(self.history_detail_label)
+        layout.addWidget(self.detail_graph)
+        layout.addStretch(1)
+        return layout
+
+    def show_history(self):
+        selected = self.selected_process()
+        if selected is not None:
+            self.history_key, name = selected
+            self.history_title.setText(f"{name} ({self.history_key[0]})")
+            self.refresh_history()
+
+    def selected_process(self):
+        """Return the (pid, create_time) key and name of the selected process, in the table or the cgroup view."""
+        if self.cgroup_tree is not None:
+            items = self.group_tree.selectedItems()
+            key = items[0].data(0, Qt.UserRole) if items else None
+            if key is None or self.cgroup_tree.is_group(key):
+                return None
+            i = self.cgroup_tree.row(key)
+            return self.cgroup_tree.snapshot.key(i), self.cgroup_tree.snapshot.name(i)
+        selected = self.process_table.selectionModel().selectedRows()
+        if not selected:
+            return None
+        row = selected[0].row()
+        return self.process_proxy.key_at(row), self.process_proxy.index(row, 1).data()
+
+    def set_history_detail(self, index):
+        self.history_detail = index
+        self.refresh_history()
+
+    def refresh_history(self):
+        if self.history_key is None or not self.processes_loaded:
+            return
+        series = self.process_history.series(*self.history_key)
+        if series is None:
+            for (label, _, _), value_label, sparkline in zip(METRICS, self.history_labels, self.sparklines):
+                value_label.setText(f"{label}: no history (budget full or exited)")
+                sparkline.set_points([])
+            self.history_detail_label.setText("")
+            self.detail_graph.set_points([])
+            return
+
+        # Every graph spans the same window, so a young process's line starts partway and an exited one's stops short
+        times = series[0]
+        start, end = self.process_history.window()
+        span = max(end - start, 1.0)
+        graphs = [(sparkline, SPARK_SIZE, index) for sparkline, (_, _, index) in zip(self.sparklines, METRICS)]
+        label, unit, index = METRICS[self.history_detail]
+        graphs.append((self.detail_graph, DETAIL_SIZE, index))
+        for graph, size, index in graphs:
+            values = series[index]
+            top = max(float(values.max()) * 1.1, 1.0) if len(values) else 1.0  # Headroom above the largest value
+            caption = f"{top:.1f}{unit}" if graph is self.detail_graph else ""
+            graph.set_points(sparkline_points(times, values, size[0], size[1], span, top, end), caption)
+        for (name, unit_text, index), value_label in zip(METRICS, self.history_labels):
+            values = series[index]
+            value_label.setText(f"{name}: {values[-1]:.1f}{unit_text}   (max {values.max():.1f}{unit_text})"
+                                if len(values) else f"{name}: exited")
+        self.history_detail_label.setText(f"{label}, last {span / 60:.0f} min" if span >= 60
+                                          else f"{label}, last {span:.0f} s")
+
+    def init_alerts_tab(self):
+        layout = QVBoxLayout()
+
+        # Newest first; the table keeps as many alerts as the alert log
+        self.alerts_table = QTableWidget(0, len(ALERT_COLUMNS))
+        self.alerts_table.setHorizontalHeaderLabels(ALERT_COLUMNS)
+        self.alerts_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.alerts_table.setSelectionBehavior(QTableView.SelectRows)
+        self.alerts_table.verticalHeader().hide()
+        self.alerts_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        clear_button = QPushButton("🧹 Clear Alerts")
+        clear_button.clicked.connect(self.clear_alerts)
+
+        layout.addWidget(self.alerts_table)
+        layout.addWidget(clear_button)
+        self.alerts_tab.setLayout(layout)
+
+    def clear_alerts(self):
+        self.alert_log.clear()
+        self.alerts_table.setRowCount(0)
+
+    def record_anomalies(self, anomalies):
+        if not anomalies:
+            return
+        self.alert_log.extend(anomalies)
+        for anomaly in anomalies:
+            self.alerts_table.insertRow(0)
+            for column, text in enumerate(format_alert(anomaly)):
+                self.alerts_table.setItem(0, column, QTableWidgetItem(text))
+        self.alerts_table.setRowCount(min(self.alerts_table.rowCount(), self.alert_log.alerts.maxlen))
+
+    def load_rates(self):
+        import pyqtgraph as pg
+
+        layout = QVBoxLayout()
+        # One row per core, one column per sample, newest on the right, from idle blue to busy red
+        self.heatmap_graph = pg.PlotWidget()
+        self.heatmap_graph.setTitle("🔥 Per-core CPU (%)", color='w', size='12pt')
+        self.heatmap_graph.setLabel('bottom', "seconds")
+        self.heatmap_graph.setLabel('left', "core")
+        self.heatmap_graph.invertY(True)
+        self.heatmap = pg.ImageItem(axisOrder='row-major')
+        self.heatmap.setLookupTable(heat_palette())
+        self.heatmap_graph.addItem(self.heatmap)
+        layout.addWidget(self.heatmap_graph, 3)
+
+        self.rate_curves = []
+        for title in ("💽 Disk: read, write", "🌐 Network: received, sent"):
+            graph = pg.PlotWidget()
+            graph.setTitle(title, color='w', size='10pt')
+            graph.showGrid(x=True, y=True, alpha=0.3)
+            graph.setLabel('left', units="B/s")  # Scaled to kB/s, MB/s... as the rates grow
+            self.rate_curves.append((graph.plot(pen=pg.mkPen(color="cyan", width=2)),
+                                     graph.plot(pen=pg.mkPen(color="orange", width=2))))
+            layout.addWidget(graph, 1)
+        self.rates_label = QLabel("")
+        layout.addWidget(self.rates_label)
+
+        self.devices_table = QTableWidget(0, len(DEVICE_COLUMNS))
+        self.devices_table.setHorizontalHeaderLabels(DEVICE_COLUMNS)
+        self.devices_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.devices_table.verticalHeader().hide()
+        self.devices_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.devices_table, 1)
+        self.rates_tab.setLayout(layout)
+        self.rates_loaded = True
+
+    def update_rates(self):
+        with self.diagnostics.stage("rates"):
+            self.rate_history.append(self.system_rates.sample())
+        if self.tabs.currentWidget() is not self.rates_tab:
+            return
+        if not self.rates_loaded:
+            with self.diagnostics.stage("load rates"):
+                self.load_rates()
+        with self.diagnostics.stage("rates render"):
+            history = self.rate_history
+            times, disk, network = history.series()
+            ago = times - times[-1]
+            matrix = history.core_matrix()
+            self.heatmap.setImage(matrix, levels=(0, 100), autoLevels=False)
+            self.heatmap.setRect(ago[0], 0, max(-ago[0], 1.0), matrix.shape[0])
+            for (inward, outward), rates in zip(self.rate_curves, (disk, network)):
+                inward.setData(ago, rates[:, 0])
+                outward.setData(ago, rates[:, 1])
+            self.rates_label.setText(f"Disk: {format_rate(disk[-1, 0])} read, {format_rate(disk[-1, 1])} written   "
+                                     f"Network: {format_rate(network[-1, 0])} received, "
+                                     f"{format_rate(network[-1, 1])} sent")
+
+            rows = device_rows(history.latest)
+            self.devices_table.setRowCount(len(rows))
+            for row, values in enumerate(rows):
+                for column, value in enumerate(values):
+                    item = self.devices_table.item(row, column)
+                    if item is None:
+                        self.devices_table.setItem(row, column, QTableWidgetItem(value))
+                    elif item.text() != value:
+                        item.setText(value)
+
+    def init_diagnostics_tab(self):
+        layout = QVBoxLayout()
 
-        self.refresh_time = 5
-        self.timer_countdown = QTimer()
-        self.timer_countdown.timeout.connect(self.update_timer)
-        self.timer_countdown.start(1000)
+        self.usage_label = QLabel("")
+        self.stages_table = QTableWidget(0, len(STAGE_COLUMNS))
+        self.stages_table.setHorizontalHeaderLabels(STAGE_COLUMNS)
+        self.stages_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.stages_table.verticalHeader().hide()
+        self.stages_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+
+        button_layout = QHBoxLayout()
+        export_button = QPushButton("💾 Export")
+        export_button.clicked.connect(self.export_diagnostics)
+        self.profile_button = QPushButton(f"⏱ Profile {PROFILE_SECONDS} s")
+        self.profile_button.clicked.connect(self.start_profile)
+        self.diagnostics_status = QLabel("")
+        button_layout.addWidget(export_button)
+        button_layout.addWidget(self.profile_button)
+        button_layout.addWidget(self.diagnostics_status, 1)
+
+        layout.addWidget(self.usage_label)
+        layout.addWidget(self.stages_table)
+        layout.addLayout(button_layout)
+        self.diagnostics_tab.setLayout(layout)
+
+    def update_diagnostics(self):
+        self.usage_label.setText(self.diagnostics.summary())
+        rows = self.diagnostics.stage_rows()
+        self.stages_table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                item = self.stages_table.item(row, column)
+                if item is None:
+                    self.stages_table.setItem(row, column, QTableWidgetItem(str(value)))
+                elif item.text() != str(value):
+                    item.setText(str(value))
+
+    def export_diagnostics(self):
+        try:
+            self.diagnostics_status.setText(f"Wrote {self.diagnostics.export()}")
+        except OSError as e:
+            self.diagnostics_status.setText(f"Export failed: {e}")
+
+    def start_profile(self):
+        # Profile the GUI thread for a few seconds, then dump the stats
+        self.diagnostics.start_profile()
+        self.profile_button.setEnabled(False)
+        self.diagnostics_status.setText("Profiling...")
+        QTimer.singleShot(PROFILE_SECONDS * 1000, self.finish_profile)
+
+    def finish_profile(self):
+        self.profile_button.setEnabled(True)
+        try:
+            self.diagnostics_status.setText(f"Wrote {self.diagnostics.stop_profile()}")
+        except OSError as e:
+            self.diagnostics_status.setText(f"Profile failed: {e}")
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self.first_frame_shown:
+            # Load the graphs right after the first frame is on screen, not before it
+            self.first_frame_shown = True
+            self.scheduler.once("load graphs", 0, self.update_graphs)
+
+    def showEvent(self, event):
+        self.scheduler.wake()
+        super().showEvent(event)
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.WindowStateChange:
+            self.scheduler.wake()  # Catch up as soon as the window is restored
+        super().changeEvent(event)
 
     def update_timer(self):
-        self.refresh_time -= 1
-        if self.refresh_time < 0:
-            self.refresh_time = 5
-        self.countdown_label.setText(f"🔄 Refreshing in: {self.refresh_time}s")
+        # Show when the scheduler will really refresh next, stretched interval included
+        if not self.processes_loaded:
+            return
+        if self.sampler.interval is not None:
+            self.countdown_label.setText("🔄 Live")
+            return
+        remaining = self.scheduler.next_run("processes")
+        if self.sampler.busy or remaining is None:
+            self.countdown_label.setText("🔄 Refreshing...")
+            return
+        text = f"🔄 Refreshing in: {math.ceil(remaining)}s"
+        interval = self.scheduler.interval("processes")
+        if interval > self.refresh_interval:
+            text += f" (slowed to every {interval:.0f}s)"
+        self.countdown_label.setText(text)
 
     def update_stats(self):
-        cpu_usage = psutil.cpu_percent()
-        mem_usage = psutil.virtual_memory().percent
+        snapshot = self.sampler.poll()
+        if snapshot is None:
+            return
+        if self.sampler.local:
+            self.diagnostics.record("collect", self.sampler.last_duration, self.sampler.last_blocks)
+
+        cpu_usage = snapshot.cpu_percent
+        mem_usage = snapshot.memory_percent
 
         self.cpu_label.setText(f"CPU: {cpu_usage}%")
         self.mem_label.setText(f"Memory: {mem_usage}%")
 
-        if len(self.cpu_data) > 50:
-            self.cpu_data.pop(0)
-            self.mem_data.pop(0)
-
-        self.cpu_data.append(cpu_usage)
-        self.mem_data.append(mem_usage)
-
-        self.cpu_curve.setData(self.cpu_data)
-        self.mem_curve.setData(self.mem_data)
-
-        self.process_table.setRowCount(0)
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_info']):
-            row = self.process_table.rowCount()
-            self.process_table.insertRow(row)
-            self.process_table.setItem(row, 0, QTableWidgetItem(str(proc.info['pid'])))
-            self.process_table.setItem(row, 1, QTableWidgetItem(proc.info['name']))
-            self.process_table.setItem(row, 2, QTableWidgetItem(str(proc.info['cpu_percent'])))
-            mem_mb = round(proc.info['memory_info'].rss / (1024 * 1024), 2)
-            self.process_table.setItem(row, 3, QTableWidgetItem(str(mem_mb)))
-
-        self.refresh_time = 5  
+        self.cpu_history.append(cpu_usage, snapshot.timestamp)
+        self.mem_history.append(mem_usage, snapshot.timestamp)
+        self.record_anomalies(self.system_anomalies.update(cpu_usage, mem_usage, snapshot.timestamp))
+        with self.diagnostics.stage("anomalies"):
+            anomalies = self.process_anomalies.update(snapshot)
+        self.record_anomalies(anomalies)
+        with self.diagnostics.stage("history update"):
+            self.process_history.update(snapshot)
+        if self.cgroup_tree is not None:
+            with self.diagnostics.stage("cgroup update"):
+                self.cgroup_tree.update(snapshot)
+        self.refresh_history()
+        self.update_graphs()
+
+        self.snapshot = snapshot
+        self.table_stale = True
+        self.update_table()
+
+    def update_table(self, index=None):
+        # The table is only rebuilt while it is shown; switching to its tab catches up
+        if self.tabs.currentWidget() is not self.process_tab:
+            return
+        if not self.processes_loaded:
+            self.init_process_tab()
+        if not self.table_stale:
+            return
+        if self.cgroup_tree is not None:
+            with self.diagnostics.stage("cgroup table"):
+                self.show_groups()
+            self.table_stale = False
+            return
+        snapshot = self.snapshot
+        top_column = VIEW_MODES[self.view_box.currentText()]
+        if top_column is not None:
+            # The model only ever holds the top rows among the matches, so its updates cost O(TOP_K)
+            indices = self.search_index.rows(snapshot, self.search_input.text())
+            snapshot = snapshot.take(snapshot.top_k(top_column, TOP_K, indices))
+        with self.diagnostics.stage("table"):
+            self.process_model.update(snapshot)  # The proxy's filter and sort passes are timed on their own
+        self.table_stale = False
+
+    def change_view(self):
+        top_column = VIEW_MODES[self.view_box.currentText()]
+        if top_column is None:
+            self.process_proxy.filter_text = self.search_input.text()
+        else:
+            self.process_proxy.filter_text = ""  # Matches are picked before the top rows are
+            if top_column in SORT_COLUMNS:  # Top by I/O (read + write) keeps the current sort
+                self.process_table.sortByColumn(SORT_COLUMNS.index(top_column), Qt.DescendingOrder)
+        self.table_stale = self.snapshot is not None
+        self.update_table()
+
+    def toggle_groups(self, checked):
+        # Built once from the current snapshot, then updated from the differences
+        self.cgroup_tree = CgroupTree() if checked else None
+        if checked and self.snapshot is not None:
+            self.cgroup_tree.update(self.snapshot)
+        self.group_tree.clear()
+        self.group_items, self.group_loaded, self.group_generation = {}, set(), None
+        self.group_tree.setVisible(checked)
+        self.process_table.setVisible(not checked)
+        # Searching and the top-K views apply to the flat list only
+        self.search_input.setEnabled(not checked)
+        self.view_box.setEnabled(not checked)
+        self.table_stale = self.snapshot is not None
+        self.update_table()
+
+    def show_groups(self):
+        """Show the cgroup tree, applying only what its last update changed to the items that exist."""
+        tree = self.cgroup_tree
+        if self.group_generation != tree.generation - 1:
+            # First time, or updates were missed while the tab was hidden: start over
+            self.group_tree.clear()
+            self.group_items, self.group_loaded = {}, set()
+            for key in sorted(tree.roots(), key=tree.path):
+                self.group_tree.addTopLevelItem(self.new_group_item(key))
+        else:
+            for key in tree.removed:
+                item = self.group_items.pop(key, None)
+                if item is None:
+                    continue
+                self.group_loaded.discard(key)
+                if item.parent() is not None:
+                    item.parent().removeChild(item)
+                else:
+                    self.group_tree.takeTopLevelItem(self.group_tree.indexOfTopLevelItem(item))
+            for key in tree.added:
+                if tree.is_group(key):
+                    self.group_tree.addTopLevelItem(self.new_group_item(key))
+                elif tree.parent(key) in self.group_loaded:
+                    self.group_items[tree.parent(key)].addChild(self.new_group_item(key))
+            for key in tree.changed:
+                item = self.group_items.get(key)
+                if item is not None:
+                    for column, text in enumerate(self.group_texts(key)):
+                        item.setText(column, text)
+        self.group_generation = tree.generation
+
+    def new_group_item(self, key):
+        item = QTreeWidgetItem(list(self.group_texts(key)))
+        item.setData(0, Qt.UserRole, key)
+        if self.cgroup_tree.is_group(key):
+            item.setChildIndicatorPolicy(QTreeWidgetItem.ShowIndicator)  # Its processes are added when expanded
+        self.group_items[key] = item
+        return item
+
+    def group_texts(self, key):
+        tree = self.cgroup_tree
+        if tree.is_group(key):
+            cpu, memory, count = tree.totals(key)
+            return tree.path(key), f"{count} processes", f"{cpu:.1f}", f"{memory:.2f}", "", ""
+        pid, name, cpu, memory, read, write = tree.snapshot.format_row(tree.row(key))
+        return name, pid, cpu, memory, read, write
+
+    def expand_group(self, item):
+        key = item.data(0, Qt.UserRole)
+        if self.cgroup_tree.is_group(key) and key not in self.group_loaded:
+            self.group_loaded.add(key)
+            item.addChildren([self.new_group_item(child) for child in sorted(self.cgroup_tree.children(key))])
+
+    def load_history(self, log):
+        # Prefill the graphs with the last day of logged system samples
+        times, cpu, memory = log.system_series(log.now() - SPANS["1 day"])
+        for timestamp, cpu_usage, mem_usage in zip(times.tolist(), cpu.tolist(), memory.tolist()):
+            self.cpu_history.append(cpu_usage, timestamp)
+            self.mem_history.append(mem_usage, timestamp)
+
+    def update_graphs(self):
+        # Like the table, the graphs are only drawn while shown
+        if self.tabs.currentWidget() is not self.cpu_mem_tab:
+            return
+        if not self.graphs_loaded:
+            if not self.first_frame_shown:
+                return  # paintEvent loads them once the window is up
+            with self.diagnostics.stage("load graphs"):
+                self.load_graphs()
+        with self.diagnostics.stage("render"):
+            self.draw_graphs()
+
+    def draw_graphs(self):
+        # Draw the history tier matching the plot width; x is seconds before now
+        now = self.clock()
+        span = SPANS[self.span_box.currentText()]
+        for graph, curve, marks, history, series in (
+                (self.cpu_graph, self.cpu_curve, self.cpu_marks, self.cpu_history, "CPU"),
+                (self.mem_graph, self.mem_curve, self.mem_marks, self.mem_history, "Memory")):
+            times, _, average, _ = history.series(span, graph.width(), now)
+            curve.setData(times - now, average)
+            times, values = self.alert_log.markers(series, now - span)
+            marks.setData(times - now, values)
+            graph.setXRange(-span, 0)
 
     def search_process(self):
-        query = self.search_input.text().lower()
-        for row in range(self.process_table.rowCount()):
-            process_name = self.process_table.item(row, 1).text().lower()
-            self.process_table.setRowHidden(row, query not in process_name)
+        if VIEW_MODES[self.view_box.currentText()] is None:
+            self.process_proxy.set_filter(self.search_input.text())
+        else:
+            self.table_stale = self.snapshot is not None
+            self.update_table()
 
     def terminate_process(self):
-        selected = self.process_table.selectedItems()
-        if selected:
-            pid = int(self.process_table.item(selected[0].row(), 0).text())
-            try:
-                p = psutil.Process(pid)
-                p.terminate()
-                self.update_stats()  
-            except psutil.NoSuchProcess:
-                pass
+        if not self.sampler.local:
+            return  # PIDs from a remote host or a log do not belong to this machine
+
+        selected = self.selected_process()
+        if selected is None:
+            return  # Nothing or a cgroup is selected
+        (pid, create_time), name = selected
+        try:
+            p = psutil.Process(pid)
+            if abs(p.create_time() - create_time) > 1:
+                return  # The PID was reused since the table was refreshed; the process shown is gone
+            p.terminate()
+            if "processes" in self.scheduler:
+                self.scheduler.run_soon("processes")
+            else:
+                self.sampler.refresh()
+        except psutil.NoSuchProcess:
+            pass
+        except psutil.AccessDenied:
+            QMessageBox.warning(self, "Access Denied", f"You do not have permission to terminate {name} ({pid}).")
 
 if __name__ == "__main__":
+    args = parse_source_args("System Monitor")
     app = QApplication(sys.argv)
-    window = SystemMonitor()
+    sampler, log = create_sampler(args, interval=None)
+    window = SystemMonitor(sampler, log)
     window.show()
     sys.exit(app.exec_())
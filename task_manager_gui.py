@@ -1,19 +1,51 @@
+import math
 import psutil
 import tkinter as tk
 from tkinter import ttk, messagebox
 
+from monitor.cgroups import CgroupTree
+from monitor.collector import SystemMetrics
+from monitor.diagnostics import Diagnostics
+from monitor.diagnostics_panel import DiagnosticsPanel
+from monitor.history_panel import ProcessHistoryPanel
+from monitor.process_history import ProcessHistory
+from monitor.rates import RateHistory, SystemRates
+from monitor.rates_panel import RatesPanel
+from monitor.process_tree import ProcessTree
+from monitor.rules import RuleEngine, run_actions, tag_color
+from monitor.sampler import ProcessSampler
+from monitor.scheduler import RefreshScheduler
+from monitor.search_index import ProcessSearchIndex
+from monitor.snapshot_store import TOP_K, VIEW_MODES
+from monitor.sort_order import SortOrder
+from monitor.sources import create_rules, create_sampler, parse_source_args
+from monitor.table_sync import ProcessTreeSync, TreeviewSync, iid_key
+
+FLAT_COLUMNS = ("PID", "Name", "CPU%", "Memory (MB)", "Read/s", "Write/s")
+# The name is the tree column
+TREE_COLUMNS = ("PID", "CPU%", "Memory (MB)", "Read/s", "Write/s", "Tree CPU%", "Tree Memory (MB)")
+GROUP_COLUMNS = TREE_COLUMNS[:5]  # A cgroup's PID cell holds its number of processes
+SORT_BY_HEADING = {"PID": "pid", "Name": "name", "CPU%": "cpu_percent", "Memory (MB)": "memory_mb",
+                   "Read/s": "read_bps", "Write/s": "write_bps"}
+
 class TaskManagerApp:
-    def __init__(self, root):
+    def __init__(self, root, sampler=None, rules=None):
         self.root = root
         self.root.title("Task Manager")
         self.root.geometry("800x600")
 
-        # List of unwanted/suspicious process names
-        self.unwanted_processes = ["unwanted.exe", "malware.exe", "suspicious.exe"]
+        # Rules for unwanted/suspicious processes, loaded from --rules and reloaded when it changes
+        self.rules = rules or RuleEngine()
+        self.rule_result = None
 
         # Timer settings
         self.refresh_interval = 10  # Default refresh interval in seconds
-        self.timer_countdown = self.refresh_interval
+
+        # Processes are collected on a background thread whenever a refresh is requested
+        self.sampler = (sampler or ProcessSampler(interval=None)).start()
+        self.system_metrics = SystemMetrics()
+        self.diagnostics = Diagnostics()  # What the monitor itself costs, shown in the Diagnostics tab
+        self.process_history = ProcessHistory()  # Recent CPU and memory per process, for the side panel
 
         # Create a notebook for tabs
         self.notebook = ttk.Notebook(root)
@@ -22,7 +54,7 @@ class TaskManagerApp:
         # Timer Bar
         self.timer_frame = ttk.Frame(self.root)
         self.timer_frame.pack(side=tk.TOP, fill=tk.X)
-        self.timer_label = ttk.Label(self.timer_frame, text=f"Refresh in: {self.timer_countdown}s", font=("Arial", 10))
+        self.timer_label = ttk.Label(self.timer_frame, text=f"Refresh in: {self.refresh_interval}s", font=("Arial", 10))
         self.timer_label.pack(side=tk.RIGHT, padx=10, pady=5)
 
         # Tab 1: System Metrics
@@ -33,17 +65,43 @@ class TaskManagerApp:
         # Tab 2: Processes
         self.processes_tab = ttk.Frame(self.notebook)
         self.notebook.add(self.processes_tab, text="Processes")
-        self.processes_loaded = False  # Flag to track if processes are loaded
         self.setup_processes()
 
-        # Bind the tab change event
-        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
-
-        # Start the timer
-        self.start_timer()
-
-        # Update data every 2 seconds
-        self.update_data()
+        # Tab 3: per-core CPU, disk and network rates; only for this machine, as no source carries them
+        self.rates_tab = None
+        if self.sampler.local:
+            self.system_rates = SystemRates()
+            self.rate_history = RateHistory()
+            self.rates_tab = RatesPanel(self.notebook, self.rate_history)
+            self.notebook.add(self.rates_tab, text="Cores & I/O")
+
+        # Tab 4: Diagnostics
+        self.diagnostics_tab = DiagnosticsPanel(self.notebook, self.diagnostics)
+        self.notebook.add(self.diagnostics_tab, text="Diagnostics")
+
+        # One scheduler runs every periodic job; jobs for a hidden tab or a minimized window wait
+        self.scheduler = RefreshScheduler(self.root.after, self.root.after_cancel, active=self.window_visible)
+        if self.sampler.local:
+            # Otherwise the labels show the remote host's or the log's readings, as each snapshot arrives
+            self.scheduler.every("metrics", 2, self.update_data,
+                                 when=lambda: self.tab_visible(self.system_metrics_tab), first=0)
+        if self.sampler.interval is None:
+            # Stretch the refresh interval when collection takes more than a quarter of it
+            self.scheduler.every("processes", self.refresh_interval, self.refresh_processes,
+                                 when=lambda: self.tab_visible(self.processes_tab) and not self.sampler.busy,
+                                 cost=lambda: self.sampler.last_duration)
+        self.scheduler.every("poll", 0.1, self.poll_sampler, first=0)
+        self.scheduler.every("countdown", 1, self.update_countdown, first=0)
+        self.scheduler.every("rules", 2, self.reload_rules)
+        if self.rates_tab is not None:
+            self.scheduler.every("rates", 1, self.update_rates, first=0)
+        self.scheduler.every("diagnostics", 1, self.diagnostics_tab.refresh,
+                             when=lambda: self.tab_visible(self.diagnostics_tab), first=0)
+        self.diagnostics.watch_loop(self.root.after)
+
+        # Run waiting jobs as soon as their tab is shown or the window is restored
+        self.notebook.bind("<<NotebookTabChanged>>", self.scheduler.wake)
+        self.root.bind("<Map>", self.scheduler.wake)
 
     def setup_system_metrics(self):
         """Set up the system metrics tab."""
@@ -68,107 +126,314 @@ class TaskManagerApp:
         ttk.Label(search_frame, text="Search:").pack(side=tk.LEFT, padx=5)
         self.search_entry = ttk.Entry(search_frame)
         self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
-        self.search_entry.bind("<KeyRelease>", self.filter_processes)  # Bind search input to filtering
+        self.search_entry.bind("<KeyRelease>", self.schedule_filter)  # Bind search input to filtering
+
+        # Tree mode shows processes under their parents, with the totals of each subtree
+        self.tree_mode = tk.BooleanVar(value=False)
+        ttk.Checkbutton(search_frame, text="Tree", variable=self.tree_mode,
+                        command=self.toggle_tree_mode).pack(side=tk.LEFT, padx=5)
+
+        # Cgroup mode lists containers and slices with their totals, and their processes under them
+        self.group_mode = tk.BooleanVar(value=False)
+        ttk.Checkbutton(search_frame, text="Cgroups", variable=self.group_mode, command=self.toggle_group_mode,
+                        state=tk.NORMAL if self.sampler.local else tk.DISABLED).pack(side=tk.LEFT, padx=5)
+
+        # On hosts with tens of thousands of processes, only the top few are worth listing
+        self.view_mode = tk.StringVar(value=next(iter(VIEW_MODES)))
+        self.view_box = ttk.Combobox(search_frame, textvariable=self.view_mode, values=list(VIEW_MODES),
+                                     state="readonly", width=18)
+        self.view_box.pack(side=tk.LEFT, padx=5)
+        self.view_box.bind("<<ComboboxSelected>>", self.filter_processes)
+
+        # History of the selected process, beside the list
+        self.history_panel = ProcessHistoryPanel(frame, self.process_history)
+        self.history_panel.pack(side=tk.RIGHT, fill=tk.Y)
 
         # Treeview for displaying processes
-        columns = ("PID", "Name", "CPU%", "Memory (MB)")
-        self.tree = ttk.Treeview(frame, columns=columns, show="headings")
+        columns = FLAT_COLUMNS + TREE_COLUMNS[5:]
+        self.tree = ttk.Treeview(frame, columns=columns, show="headings", displaycolumns=FLAT_COLUMNS)
         for col in columns:
             self.tree.heading(col, text=col, command=lambda c=col: self.sort_treeview(c))
+        self.tree.heading("#0", text="Name")
+        self.tree.column("#0", width=250)
         self.tree.column("PID", width=100)
         self.tree.column("Name", width=200)
         self.tree.column("CPU%", width=100)
         self.tree.column("Memory (MB)", width=150)
+        self.tree.column("Read/s", width=90)
+        self.tree.column("Write/s", width=90)
+        self.tree.column("Tree CPU%", width=100)
+        self.tree.column("Tree Memory (MB)", width=150)
         self.tree.pack(fill=tk.BOTH, expand=True)
+        self.tree_sync = TreeviewSync(self.tree)
+        self.process_tree_sync = ProcessTreeSync(self.tree, self.format_tree_item)
+        self.tree.bind("<<TreeviewOpen>>", self.on_tree_open)  # Children are inserted when a node is opened
+        self.tree.bind("<<TreeviewSelect>>", self.show_history)
 
-        # Configure tags for highlighting
-        self.tree.tag_configure("unwanted", foreground="red")
+        # Rows tagged by a rule are coloured: "unwanted" in red, other tags in orange
+        self.style_rule_tags()
 
         # Buttons for actions
         button_frame = ttk.Frame(frame)
         button_frame.pack(fill=tk.X, pady=10)
 
-        refresh_button = ttk.Button(button_frame, text="Refresh", command=self.refresh_processes)
+        refresh_button = ttk.Button(button_frame, text="Refresh", command=self.refresh_now)
         refresh_button.pack(side=tk.LEFT, padx=10)
 
         terminate_button = ttk.Button(button_frame, text="Terminate", command=self.terminate_process)
         terminate_button.pack(side=tk.LEFT, padx=10)
 
-        # Store all processes for filtering
-        self.all_processes = []
+        # Latest rule notifications and rules file errors
+        self.rules_label = ttk.Label(button_frame, text="")
+        self.rules_label.pack(side=tk.LEFT, padx=10)
+
+        # Last collected snapshot, kept as typed columns for filtering and sorting
+        self.snapshot = None
+        self.search_index = ProcessSearchIndex()
+        self.sort_order = SortOrder()  # Kept across refreshes until another heading is clicked
+        self.process_tree = None  # A ProcessTree or CgroupTree, only kept up to date while tree or cgroup mode is on
 
     def update_data(self):
         """Update system metrics and process data."""
-        # Update CPU and Memory labels
-        cpu_usage = psutil.cpu_percent(interval=0.1)
-        memory = psutil.virtual_memory()
+        self.show_usage(*self.system_metrics.read())
+
+    def show_usage(self, cpu_usage, memory):
+        """Update the CPU and memory labels."""
         self.cpu_label.config(text=f"CPU Usage: {cpu_usage:.1f}%")
-        self.memory_label.config(text=f"Memory Usage: {memory.percent:.1f}%")
-
-        # Schedule the next update
-        self.root.after(2000, self.update_data)
-
-    def start_timer(self):
-        """Start the countdown timer."""
-        self.timer_countdown -= 1
-        self.timer_label.config(text=f"Refresh in: {self.timer_countdown}s")
-        if self.timer_countdown <= 0:
-            self.timer_countdown = self.refresh_interval  # Reset the timer
-            self.refresh_processes()  # Refresh the process list
-        self.root.after(1000, self.start_timer)  # Update every second
-
-    def on_tab_changed(self, event):
-        """Handle tab change events."""
-        current_tab = self.notebook.index(self.notebook.select())
-        if current_tab == 1 and not self.processes_loaded:  # Processes tab is index 1
-            self.refresh_processes()
-            self.processes_loaded = True  # Mark processes as loaded
+        self.memory_label.config(text=f"Memory Usage: {memory:.1f}%")
+
+    def update_countdown(self):
+        """Show when the process list will really refresh next."""
+        remaining = self.scheduler.next_run("processes")
+        if self.sampler.interval is not None:
+            text = "Live"  # Snapshots arrive at the remote agent's or the log's pace
+        elif self.sampler.busy:
+            text = "Refreshing..."
+        elif remaining is None:
+            text = "Refresh paused"
+        else:
+            text = f"Refresh in: {math.ceil(remaining)}s"
+            interval = self.scheduler.interval("processes")
+            if interval > self.refresh_interval:
+                text += f" (slowed to every {interval:.0f}s)"
+        self.timer_label.config(text=text)
+
+    def update_rates(self):
+        """Sample the per-core, disk and network rates, and redraw them if their tab is shown."""
+        with self.diagnostics.stage("rates"):
+            self.rate_history.append(self.system_rates.sample())
+        if self.tab_visible(self.rates_tab):
+            with self.diagnostics.stage("rates render"):
+                self.rates_tab.refresh()
+
+    def window_visible(self):
+        return self.root.state() not in ("iconic", "withdrawn")
+
+    def tab_visible(self, tab):
+        return self.notebook.select() == str(tab)
 
     def refresh_processes(self):
-        """Refresh the list of processes."""
-        self.all_processes.clear()
-        for row in self.tree.get_children():
-            self.tree.delete(row)
-
-        for proc in psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_info']):
-            try:
-                pid = proc.info['pid']
-                name = proc.info['name']
-                cpu_percent = proc.info['cpu_percent']
-                memory_mb = proc.info['memory_info'].rss / (1024 ** 2)
-
-                # Determine if the process is unwanted
-                tag = "unwanted" if name.lower() in [p.lower() for p in self.unwanted_processes] else ""
-
-                # Store process details
-                process_data = (pid, name, f"{cpu_percent:.1f}", f"{memory_mb:.2f}", tag)
-                self.all_processes.append(process_data)
-
-                # Insert the process into the treeview
-                self.tree.insert("", tk.END, values=process_data[:4], tags=(tag,))
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                continue
+        """Request a fresh process snapshot from the background sampler."""
+        self.sampler.refresh()
+
+    def refresh_now(self):
+        """Refresh right away and restart the countdown."""
+        if "processes" in self.scheduler:
+            self.scheduler.run_soon("processes")
+        else:
+            self.refresh_processes()
+
+    def poll_sampler(self):
+        """Apply the newest finished snapshot, if any, without blocking the UI."""
+        snapshot = self.sampler.poll()
+        if snapshot is not None:
+            if self.sampler.local:
+                self.diagnostics.record("collect", self.sampler.last_duration, self.sampler.last_blocks)
+            else:
+                self.show_usage(snapshot.cpu_percent, snapshot.memory_percent)
+            self.apply_snapshot(snapshot)
+
+    def apply_snapshot(self, snapshot):
+        """Replace the process list with a collected snapshot."""
+        self.snapshot = snapshot
+        if self.process_tree is not None:
+            with self.diagnostics.stage("cgroup update" if self.group_mode.get() else "tree update"):
+                self.process_tree.update(snapshot)
+        with self.diagnostics.stage("history update"):
+            self.process_history.update(snapshot)
+        self.history_panel.refresh()
+
+        # Tag the processes the rules match (new processes only are matched) and run fired actions
+        self.apply_rules()
 
         # Apply current search filter
         self.filter_processes()
 
+    def apply_rules(self):
+        """Evaluate the rules on the current snapshot and carry out what fired, in one batch."""
+        with self.diagnostics.stage("rules"):
+            self.rule_result = self.rules.evaluate(self.snapshot)
+        run_actions(self.rule_result.fired, self.show_rule_messages, can_terminate=self.sampler.local)
+
+    def show_rule_messages(self, messages):
+        """Show the newest rule notification, with how many more came in the same batch."""
+        more = f" (+{len(messages) - 1} more)" if len(messages) > 1 else ""
+        self.rules_label.config(text=messages[-1] + more)
+
+    def reload_rules(self):
+        """Pick up changes to the rules file; a broken file keeps the previous rules."""
+        if self.rules.reload_if_changed():
+            self.rules_label.config(text="Rules reloaded")
+            self.style_rule_tags()
+            if self.snapshot is not None:
+                self.apply_rules()
+                self.filter_processes()
+        elif self.rules.error:
+            self.rules_label.config(text=f"Rules not reloaded: {self.rules.error}")
+
+    def style_rule_tags(self):
+        """Give every tag the rules can add a colour in the process list."""
+        for tag in self.rules.tags:
+            self.tree.tag_configure(tag, foreground=tag_color(tag))
+
+    def schedule_filter(self, event=None):
+        """Filter once typing pauses, instead of on every keystroke."""
+        self.scheduler.once("filter", 0.15, self.filter_processes)
+
     def filter_processes(self, event=None):
         """Filter processes based on the search bar input."""
+        if self.snapshot is None:
+            return
+
         search_query = self.search_entry.get().strip().lower()
-        for row in self.tree.get_children():
-            self.tree.delete(row)
+        if self.process_tree is not None:
+            if not search_query:
+                self.show_tree()
+            else:
+                # A search shows every matching process as a flat list, in snapshot order like the tree
+                with self.diagnostics.stage("filter"):
+                    indices = self.search_index.rows(self.snapshot, search_query)
+                self.show_rows(indices)
+            return
 
-        for process in self.all_processes:
-            pid, name, cpu, memory, tag = process
-            if search_query in str(pid).lower() or search_query in name.lower():
-                self.tree.insert("", tk.END, values=(pid, name, cpu, memory), tags=(tag,))
+        with self.diagnostics.stage("filter"):
+            indices = self.search_index.rows(self.snapshot, search_query)
+            top_column = VIEW_MODES[self.view_mode.get()]
+            if top_column is not None:
+                # Partial selection: only the TOP_K rows, largest first, are ever formatted or shown
+                indices = self.snapshot.top_k(top_column, TOP_K, indices)
+        with self.diagnostics.stage("sort"):
+            indices = self.sort_order.apply(self.snapshot, indices)
+        self.show_rows(indices)
+
+    def show_rows(self, indices):
+        """Display the given snapshot rows, formatting only those rows."""
+        if self.process_tree_sync.process_tree is not None:
+            self.process_tree_sync.clear()
+            self.tree.configure(show="headings", displaycolumns=FLAT_COLUMNS)
+        snapshot = self.snapshot
+        with self.diagnostics.stage("table"):
+            rows = []
+            for i in indices:
+                rows.append((snapshot.key(i), snapshot.format_row(i), self.rule_result.row_tags(i)))
+
+            # Apply only inserts, deletes and changed rows so the selection and scroll position survive
+            self.tree_sync.update(rows)
+
+    def show_tree(self):
+        """Display the process tree, updating only the items that exist and changed."""
+        if self.process_tree_sync.process_tree is not self.process_tree:
+            self.tree_sync.clear()
+            grouped = self.group_mode.get()
+            self.tree.configure(show="tree headings", displaycolumns=GROUP_COLUMNS if grouped else TREE_COLUMNS)
+            self.tree.heading("#0", text="Cgroup / Name" if grouped else "Name")
+        with self.diagnostics.stage("tree table"):
+            self.process_tree_sync.update(self.process_tree)
+
+    def show_history(self, event=None):
+        """Show the history of the selected process in the side panel."""
+        selected = self.selected_process()
+        if selected is not None:
+            self.history_panel.show(*selected)
+
+    def selected_process(self):
+        """Return the (pid, create_time) key and name of the selected process, in the list or a tree.
+
+        None when nothing, a cgroup or the placeholder of an unopened node is selected.
+        """
+        selected = self.tree.selection()
+        if not selected:
+            return None
+        iid = selected[0]
+        process_tree = self.process_tree_sync.process_tree
+        if process_tree is None:
+            key = iid_key(iid)
+            return (key, self.tree.item(iid, "values")[1]) if key is not None else None
+        # Tree items are keyed by packed row keys; placeholders end in ":more"
+        if not iid.lstrip("-").isdigit():
+            return None
+        key = int(iid)
+        if isinstance(process_tree, CgroupTree) and process_tree.is_group(key):
+            return None
+        i = process_tree.row(key)
+        return process_tree.snapshot.key(i), process_tree.snapshot.name(i)
+
+    def format_tree_item(self, key):
+        """Return the text, values and tags of a process tree or cgroup node."""
+        if isinstance(self.process_tree, CgroupTree):
+            if self.process_tree.is_group(key):
+                cpu, memory, count = self.process_tree.totals(key)
+                values = (f"{count} processes", "", f"{cpu:.1f}", f"{memory:.2f}", "", "", "", "")
+                return self.process_tree.path(key), values, ()
+            i = self.process_tree.row(key)
+            pid, name, cpu, memory, read, write = self.process_tree.snapshot.format_row(i)
+            return name, (pid, name, cpu, memory, read, write, "", ""), self.rule_result.row_tags(i)
+
+        i = self.process_tree.row(key)
+        pid, name, cpu, memory, read, write = self.process_tree.snapshot.format_row(i)
+        total_cpu, total_memory = self.process_tree.totals(key)
+        values = (pid, name, cpu, memory, read, write, f"{total_cpu:.1f}", f"{total_memory:.2f}")
+        return name, values, self.rule_result.row_tags(i)
+
+    def toggle_tree_mode(self):
+        """Switch between the flat list and the process tree."""
+        self.group_mode.set(False)
+        self.set_grouping(ProcessTree if self.tree_mode.get() else None)
+
+    def toggle_group_mode(self):
+        """Switch between the flat list and the processes grouped by cgroup."""
+        self.tree_mode.set(False)
+        self.set_grouping(CgroupTree if self.group_mode.get() else None)
+
+    def set_grouping(self, tree_class):
+        # Built once from the current snapshot, then updated from the differences
+        self.process_tree = tree_class() if tree_class is not None else None
+        if self.process_tree is not None and self.snapshot is not None:
+            self.process_tree.update(self.snapshot)
+        # The top-N views and sorting only apply to the flat list; the tree keeps its own order
+        self.view_box.configure(state="readonly" if self.process_tree is None else "disabled")
+        self.show_sort_arrows()
+        self.filter_processes()
+
+    def on_tree_open(self, event=None):
+        """Insert the children of the node being opened."""
+        iid = self.tree.focus()
+        if self.process_tree_sync.process_tree is not None and iid.lstrip("-").isdigit():  # Cgroup keys are negative
+            self.process_tree_sync.open(int(iid))
 
     def sort_treeview(self, column):
-        """Sort the treeview by the selected column."""
-        data = [(self.tree.set(child, column), child) for child in self.tree.get_children()]
-        data.sort(key=lambda x: float(x[0]) if column in ("CPU%", "Memory (MB)") else x[0])
-        for index, (_, child) in enumerate(data):
-            self.tree.move(child, "", index)
+        """Sort by the clicked column, or reverse the order on a second click; later refreshes keep it."""
+        if column not in SORT_BY_HEADING or self.process_tree is not None:
+            return
+        self.sort_order.toggle(SORT_BY_HEADING[column])
+        self.show_sort_arrows()
+        self.filter_processes()
+
+    def show_sort_arrows(self):
+        """Mark the sort column's heading, unless a tree, which is not sorted, is shown."""
+        for heading, sort_column in SORT_BY_HEADING.items():
+            arrow = self.sort_order.arrow(sort_column) if self.process_tree is None else ""
+            self.tree.heading(heading, text=heading + arrow)
 
     def terminate_process(self):
         """Terminate the selected process."""
@@ -177,12 +442,27 @@ class TaskManagerApp:
             messagebox.showwarning("No Selection", "Please select a process to terminate.")
             return
 
-        pid = int(self.tree.item(selected_item, "values")[0])
+        if not self.sampler.local:
+            messagebox.showwarning("Remote Processes", "Processes can only be terminated on the machine being monitored.")
+            return
+
+        iid = selected_item[0]
+        process_tree = self.process_tree_sync.process_tree
+        if isinstance(process_tree, CgroupTree) and iid.lstrip("-").isdigit() and process_tree.is_group(int(iid)):
+            messagebox.showwarning("Cgroup Selected", "Cgroups cannot be terminated; select one of its processes.")
+            return
+
+        selected = self.selected_process()
+        if selected is None:
+            return  # The placeholder of an unopened tree node
+        (pid, create_time), _ = selected
         try:
             process = psutil.Process(pid)
+            if abs(process.create_time() - create_time) > 1:
+                raise psutil.NoSuchProcess(pid)  # The PID was reused since the list was refreshed
             process.terminate()
             messagebox.showinfo("Success", f"Process {pid} terminated successfully.")
-            self.refresh_processes()
+            self.refresh_now()
         except psutil.NoSuchProcess:
             messagebox.showerror("Error", "The process no longer exists.")
         except psutil.AccessDenied:
@@ -190,6 +470,8 @@ class TaskManagerApp:
 
 # Run the application
 if __name__ == "__main__":
+    args = parse_source_args("Task Manager", rules=True)
     root = tk.Tk()
-    app = TaskManagerApp(root)
+    sampler, _ = create_sampler(args, interval=None)
+    app = TaskManagerApp(root, sampler, create_rules(args, sampler))
     root.mainloop()
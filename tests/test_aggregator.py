@@ -0,0 +1,87 @@
+import asyncio
+import time
+
+from monitor.aggregator import Aggregator, spawn_simulated_hosts, start_simulated_hosts
+from monitor.remote import BODY_HEADER, DELTA, FRAME_HEADER, DeltaEncoder, hello_frame
+from monitor.synthetic import SyntheticProvider
+
+
+async def _serve(frames):
+    """Start a fake agent that sends ``frames`` to each viewer and then falls silent."""
+    async def on_connect(reader, writer):
+        writer.write(frames)
+        await reader.read()
+        writer.close()
+
+    server = await asyncio.start_server(on_connect, "127.0.0.1", 0)
+    return server, "%s:%d" % server.sockets[0].getsockname()[:2]
+
+
+async def _follow(addresses, seconds, **options):
+    """Follow ``addresses`` for ``seconds``; return whether the aggregator was still running, and its table."""
+    aggregator = Aggregator(addresses, **options)
+    task = asyncio.create_task(aggregator.run())
+    await asyncio.sleep(seconds)
+    running, table = not task.done(), aggregator.fleet_table()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await asyncio.sleep(0.1)  # Let the fake agents see their viewers go
+    return aggregator, running, table
+
+
+def test_fleet_table_marks_silent_and_corrupt_hosts():
+    encoder = DeltaEncoder()
+    encoder.encode(SyntheticProvider(50).sample())
+    corrupt = BODY_HEADER.pack(1.0, 0.0, 0.0, 0, 0, 1000)  # 1000 upserted rows that are not there
+
+    async def main():
+        healthy = await start_simulated_hosts(3, processes=50, interval=0.1)
+        silent_server, silent = await _serve(hello_frame(0.1) + encoder.keyframe())
+        corrupt_server, bad = await _serve(hello_frame(0.1) + encoder.keyframe()
+                                           + FRAME_HEADER.pack(len(corrupt), DELTA) + corrupt)
+        try:
+            return healthy, silent, bad, await _follow(healthy + [silent, bad], 1.5, stale_after=0.3,
+                                                       retry_delay=0.1)
+        finally:
+            silent_server.close()
+            corrupt_server.close()
+
+    healthy, silent, bad, (aggregator, running, rows) = asyncio.run(main())
+
+    assert running  # The corrupt host did not end the other hosts' coroutines
+    table = {row[0]: row for row in rows}
+    assert len(table) == 5
+    for address in healthy:
+        assert table[address][1] == "ok" and table[address][5] == 50
+        assert aggregator.hosts[address].frames >= 5
+    assert table[silent][1] == "stale" and table[silent][5] == 50
+    assert "malformed frame" in aggregator.hosts[bad].error
+    assert aggregator.hosts[bad].reconnects >= 2
+    cpu = [row[3] for row in rows]
+    assert cpu == sorted(cpu, reverse=True)
+
+
+def test_follows_500_hosts_at_one_second_on_one_core():
+    process, addresses = spawn_simulated_hosts(500, processes=200, interval=1.0)
+    try:
+        async def main():
+            aggregator = Aggregator(addresses)
+            task = asyncio.create_task(aggregator.run())
+            await asyncio.sleep(3)  # Connect and receive the keyframes
+            frames = sum(host.frames for host in aggregator.hosts.values())
+            wall, cpu = time.monotonic(), time.process_time()
+            await asyncio.sleep(5)
+            wall, cpu = time.monotonic() - wall, time.process_time() - cpu
+            frames = sum(host.frames for host in aggregator.hosts.values()) - frames
+            counts = aggregator.status_counts()
+            task.cancel()
+            return frames / wall, cpu / wall, counts
+
+        frames_per_second, cores, counts = asyncio.run(main())
+    finally:
+        process.terminate()
+        process.join(5)
+
+    assert counts == {"ok": 500, "stale": 0, "down": 0}
+    assert frames_per_second > 450
+    assert cores < 0.5
@@ -0,0 +1,73 @@
+import numpy as np
+
+from monitor import cgroups
+from monitor.cgroups import UNKNOWN, CgroupTree
+from monitor.records import ProcessRecord
+from monitor.snapshot_store import NameTable, ProcessSnapshot, row_keys
+
+MB = 1024 * 1024
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+
+
+def _snapshot(names, processes):
+    """Return a snapshot of (pid, CPU%, memory MB) rows; every process started at its PID's second."""
+    return ProcessSnapshot.from_records([ProcessRecord(pid, float(pid), f"proc-{pid}", cpu, memory)
+                                         for pid, cpu, memory in processes], names)
+
+
+def _key(pid):
+    return int(row_keys(np.array([pid]), np.array([float(pid)]))[0])
+
+
+def _groups(tree):
+    return {tree.path(key): tree.totals(key) for key in tree.roots()}
+
+
+def test_groups_by_cgroup_with_kernel_and_summed_totals(tmp_path, monkeypatch):
+    proc, cgroup = tmp_path / "proc", tmp_path / "cgroup"
+    _write(proc / "100" / "cgroup", "0::/system.slice/web.service\n")
+    _write(proc / "101" / "cgroup", "0::/system.slice/web.service\n")
+    _write(proc / "200" / "cgroup", "12:cpu,cpuacct:/user.slice\n0::/user.slice\n")  # Hybrid v1/v2 host
+    # No /proc/300/cgroup: the process is grouped as unknown
+    _write(cgroup / "system.slice" / "web.service" / "cpu.stat", "usage_usec 1000000\nuser_usec 800000\n")
+    _write(cgroup / "system.slice" / "web.service" / "memory.current", str(300 * MB))
+    _write(cgroup / "user.slice" / "cpu.stat", "usage_usec 5000000\n")  # No memory.current
+    now = [10.0]
+    monkeypatch.setattr(cgroups.time, "monotonic", lambda: now[0])
+
+    names = NameTable()
+    tree = CgroupTree(proc_root=str(proc), cgroup_root=str(cgroup))
+    tree.update(_snapshot(names, [(100, 5.0, 100.0), (101, 7.0, 50.0), (200, 1.0, 20.0), (300, 2.0, 30.0)]))
+
+    # The first reading of usage_usec has no rate yet, so CPU is the members' sum until the next update
+    assert _groups(tree) == {"/system.slice/web.service": (12.0, 300.0, 2), "/user.slice": (1.0, 20.0, 1),
+                             UNKNOWN: (2.0, 30.0, 1)}
+    web = next(key for key in tree.roots() if tree.path(key) == "/system.slice/web.service")
+    assert sorted(tree.children(web)) == sorted([_key(100), _key(101)])
+    assert tree.parent(_key(200)) != web and tree.snapshot.pid[tree.row(_key(200))] == 200
+
+    # One second later web.service used half a CPU and user.slice none; only PID 200's own values changed
+    _write(cgroup / "system.slice" / "web.service" / "cpu.stat", "usage_usec 1500000\n")
+    now[0] = 11.0
+    tree.update(_snapshot(names, [(100, 5.0, 100.0), (101, 7.0, 50.0), (200, 3.0, 20.0), (300, 2.0, 30.0)]))
+
+    assert _groups(tree) == {"/system.slice/web.service": (50.0, 300.0, 2), "/user.slice": (0.0, 20.0, 1),
+                             UNKNOWN: (2.0, 30.0, 1)}
+    user = next(key for key in tree.roots() if tree.path(key) == "/user.slice")
+    assert tree.changed == {web, user, _key(200)}
+    assert not tree.added and not tree.removed
+
+    # PID 101 exits and PID 102 starts in the same service; the unknown group empties and goes away
+    _write(proc / "102" / "cgroup", "0::/system.slice/web.service\n")
+    now[0] = 12.0
+    tree.update(_snapshot(names, [(100, 5.0, 100.0), (102, 1.0, 10.0), (200, 3.0, 20.0)]))
+
+    unknown = tree.group_key(tree.paths.index(UNKNOWN))
+    assert tree.removed == {_key(101), _key(300), unknown}
+    assert tree.added == {_key(102)}
+    assert sorted(tree.children(web)) == sorted([_key(100), _key(102)])
+    assert len(tree) == 2
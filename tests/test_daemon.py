@@ -0,0 +1,30 @@
+import psutil
+
+from monitor import daemon
+from monitor.collector import Collector
+from monitor.tslog import LogReader
+
+
+class FlakyCollector(Collector):
+    """Fails its second and third samples, as psutil does when a process vanishes mid-scan."""
+
+    def __init__(self, backend=None):
+        super().__init__(backend)
+        self.calls = 0
+
+    def sample(self):
+        self.calls += 1
+        if self.calls in (2, 3):
+            raise psutil.NoSuchProcess(1234)
+        return super().sample()
+
+
+def test_daemon_keeps_recording_after_failed_samples(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(daemon, "Collector", FlakyCollector)
+    args = daemon.parse_args(["--log-dir", str(tmp_path), "--interval", "0", "--count", "3"])
+
+    assert daemon.run(args) == 0
+
+    assert len(list(LogReader(str(tmp_path)).frames())) == 3
+    err = capsys.readouterr().err
+    assert err.count("Sampling failed") == 1 and "NoSuchProcess" in err and "Sampling recovered" in err
@@ -0,0 +1,82 @@
+import gzip
+import time
+import urllib.error
+import urllib.request
+
+import psutil
+import pytest
+
+from monitor.exporter import STALE_TICKS, MetricsExporter
+from monitor.synthetic import SyntheticProvider
+
+
+class FailingCollector:
+    """A synthetic host whose samples start failing with ``error`` after the first one."""
+
+    def __init__(self, error=None):
+        self.provider = SyntheticProvider(200)
+        self.error = error
+        self.samples = 0
+
+    def sample(self):
+        self.samples += 1
+        if self.error is not None and self.samples > 1:
+            raise self.error
+        return self.provider.sample()
+
+
+def scrape(exporter, path="/metrics", gzipped=False):
+    request = urllib.request.Request(f"http://{exporter.address}{path}",
+                                     headers={"Accept-Encoding": "gzip"} if gzipped else {})
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            body = response.read()
+            if response.headers.get("Content-Encoding") == "gzip":
+                body = gzip.decompress(body)
+            return response.status, body.decode()
+    except urllib.error.HTTPError as e:
+        return e.code, e.reason
+
+
+@pytest.fixture
+def serve():
+    exporters = []
+
+    def start(collector, interval):
+        exporter = MetricsExporter("127.0.0.1:0", collector, interval=interval, min_age=0).start()
+        exporters.append(exporter)
+        assert exporter.wait_ready(5)
+        return exporter
+
+    yield start
+    for exporter in exporters:
+        exporter.stop()
+
+
+def test_scrapes_get_the_cached_metrics(serve):
+    exporter = serve(FailingCollector(), interval=60)
+    status, plain = scrape(exporter)
+    assert status == 200
+    assert "monitor_processes 200\n" in plain
+    assert "monitor_process_cpu_percent{pid=" in plain
+    assert scrape(exporter, gzipped=True) == (200, plain)  # The same render, compressed
+    assert exporter.ticks == 1  # Scrapes never collect
+    assert scrape(exporter, "/other")[0] == 404
+
+
+def test_failing_samples_turn_into_503_once_stale(serve):
+    exporter = serve(FailingCollector(psutil.AccessDenied(1)), interval=0.1)
+    assert scrape(exporter)[0] == 200  # A failed sample keeps the previous metrics for a while
+    time.sleep(STALE_TICKS * 0.1 + 0.3)
+    status, reason = scrape(exporter)
+    assert status == 503
+    assert "AccessDenied" in reason
+
+
+@pytest.mark.filterwarnings("ignore::pytest.PytestUnhandledThreadExceptionWarning")
+def test_a_dead_sampler_turns_into_503(serve):
+    exporter = serve(FailingCollector(RuntimeError("bug")), interval=0.1)
+    time.sleep(STALE_TICKS * 0.1 + 0.3)
+    status, reason = scrape(exporter)
+    assert status == 503
+    assert "sampler stopped" in reason
@@ -0,0 +1,23 @@
+import numpy as np
+import psutil
+
+from monitor.rates import RateHistory, SystemRates, device_rows
+
+
+def test_history_without_disks_or_nics(monkeypatch):
+    # Diskless VMs and containers report no disks, and a network namespace may have no interfaces
+    monkeypatch.setattr(psutil, "disk_io_counters", lambda perdisk=False: {})
+    monkeypatch.setattr(psutil, "net_io_counters", lambda pernic=False: {})
+    rates = SystemRates()
+    history = RateHistory(points=4)
+    for timestamp in (1.0, 2.0):
+        sample = rates.sample(timestamp)
+        history.append(sample)
+
+    assert sample.disks == [] and sample.nics == []
+    assert device_rows(sample) == []
+    times, disk, network = history.series()
+    np.testing.assert_array_equal(times, [1.0, 2.0])
+    np.testing.assert_array_equal(disk, np.zeros((2, 2)))
+    np.testing.assert_array_equal(network, np.zeros((2, 2)))
+    assert history.core_matrix().shape == (psutil.cpu_count(), 2)
@@ -0,0 +1,162 @@
+import socket
+import struct
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from monitor.agent import Agent
+from monitor.remote import (BODY_HEADER, DELTA, FRAME_HEADER, HELLO, HELLO_BODY, KEYFRAME, PROTOCOL_MAGIC,
+                            DeltaDecoder, DeltaEncoder, ProtocolError, RemoteFeed, hello_frame)
+from monitor.sampler import ProcessSampler
+from monitor.snapshot_store import row_keys
+from monitor.synthetic import SyntheticProvider
+
+
+class RecordingCollector:
+    """A synthetic host that remembers every snapshot the agent sent, by timestamp."""
+
+    def __init__(self):
+        self.provider = SyntheticProvider(500, churn=0.02, busy=0.1)
+        self.sent = {}
+
+    def sample(self):
+        snapshot = self.provider.sample()
+        self.sent[snapshot.timestamp] = snapshot
+        return snapshot
+
+
+def _sorted_rows(snapshot):
+    order = np.argsort(row_keys(snapshot.pid, snapshot.create_time), kind="stable")
+    names = [snapshot.name(i) for i in order.tolist()]
+    return order, names
+
+
+def assert_same_processes(received, sent):
+    assert (received.cpu_percent, received.memory_percent) == (np.float32(sent.cpu_percent), np.float32(sent.memory_percent))
+    received_order, received_names = _sorted_rows(received)
+    sent_order, sent_names = _sorted_rows(sent)
+    assert received_names == sent_names
+    for column in ("pid", "create_time", "ppid"):
+        np.testing.assert_array_equal(getattr(received, column)[received_order], getattr(sent, column)[sent_order])
+    # Rows are only resent once they change by more than the displayed precision
+    for column, tolerance in (("cpu", 0.05), ("memory_mb", 0.005), ("read_bps", 512), ("write_bps", 512)):
+        np.testing.assert_allclose(getattr(received, column)[received_order], getattr(sent, column)[sent_order],
+                                   rtol=0, atol=tolerance * 1.001)
+
+
+def test_feed_follows_agent_on_loopback():
+    collector = RecordingCollector()
+    agent = Agent("127.0.0.1:0", collector, interval=0.05)
+    thread = threading.Thread(target=agent.serve_forever, daemon=True)
+    thread.start()
+    feed = RemoteFeed(agent.address, timeout=5.0)
+    try:
+        hello = feed()
+        hello_bytes = feed.bytes_received
+        keyframe = feed()
+        keyframe_bytes = feed.bytes_received - hello_bytes
+        delta = feed()
+        delta_bytes = feed.bytes_received - hello_bytes - keyframe_bytes
+    finally:
+        feed.close()
+        agent.stop()
+        thread.join(5)
+
+    assert hello is None
+    assert keyframe is not None and delta is not None
+    assert delta.timestamp > keyframe.timestamp
+    assert_same_processes(keyframe, collector.sent[keyframe.timestamp])
+    assert_same_processes(delta, collector.sent[delta.timestamp])
+    assert delta_bytes < keyframe_bytes / 2  # Only changed rows travel after the keyframe
+
+
+def test_feed_waits_for_an_agent_slower_than_its_timeout():
+    agent = Agent("127.0.0.1:0", RecordingCollector(), interval=0.6)
+    thread = threading.Thread(target=agent.serve_forever, daemon=True)
+    thread.start()
+    feed = RemoteFeed(agent.address, timeout=0.1, retry_delay=0.1)
+    try:
+        assert feed() is None  # The hello, announcing the interval
+        snapshots = [feed() for _ in range(3)]
+    finally:
+        feed.close()
+        agent.stop()
+        thread.join(5)
+
+    # Each read waited for the agent's next tick instead of timing out and reconnecting
+    assert all(snapshot is not None for snapshot in snapshots)
+    assert snapshots[0].timestamp < snapshots[1].timestamp < snapshots[2].timestamp
+
+
+def test_feed_rejects_an_agent_of_another_protocol_version():
+    server = socket.create_server(("127.0.0.1", 0))
+    body = HELLO_BODY.pack(PROTOCOL_MAGIC, 99, 1.0)
+
+    def greet():
+        sock, _ = server.accept()
+        with sock:
+            sock.sendall(FRAME_HEADER.pack(len(body), HELLO) + body)
+            sock.recv(1)
+
+    thread = threading.Thread(target=greet, daemon=True)
+    thread.start()
+    feed = RemoteFeed("127.0.0.1:%d" % server.getsockname()[1], timeout=5.0, retry_delay=0)
+    try:
+        with pytest.raises(ProtocolError, match="protocol version 99"):
+            feed()
+    finally:
+        feed.close()
+        server.close()
+        thread.join(5)
+    assert "protocol version 99" in feed.error
+
+
+def test_decoder_rejects_frames_before_a_hello():
+    encoder = DeltaEncoder()
+    encoder.encode(SyntheticProvider(10).sample())
+    frame = encoder.keyframe()
+    with pytest.raises(ProtocolError, match="hello"):
+        DeltaDecoder().apply(KEYFRAME, frame[FRAME_HEADER.size:])
+    with pytest.raises(ProtocolError, match="not a monitor.agent"):
+        DeltaDecoder().apply(HELLO, struct.pack("<d", 1.0))
+
+
+def test_corrupt_delta_is_reported_and_the_sampler_keeps_running(capsys):
+    encoder = DeltaEncoder()
+    encoder.encode(SyntheticProvider(50).sample())
+    # A delta announcing 1000 upserted rows that are not there
+    body = BODY_HEADER.pack(1.0, 0.0, 0.0, 0, 0, 1000)
+    frames = hello_frame(0.05) + encoder.keyframe() + FRAME_HEADER.pack(len(body), DELTA) + body
+    server = socket.create_server(("127.0.0.1", 0))
+    server.settimeout(5)
+
+    def serve():
+        for _ in range(2):
+            sock, _ = server.accept()
+            with sock:
+                sock.sendall(frames)
+                sock.recv(1)
+
+    thread = threading.Thread(target=serve, daemon=True)
+    thread.start()
+    feed = RemoteFeed("127.0.0.1:%d" % server.getsockname()[1], timeout=5.0, retry_delay=0.05)
+    sampler = ProcessSampler(0, collect=feed, local=False).start()
+    try:
+        deadline = time.monotonic() + 5
+        snapshots = []
+        while len(snapshots) < 2 and time.monotonic() < deadline:
+            snapshot = sampler.poll()
+            if snapshot is not None:
+                snapshots.append(snapshot)
+            time.sleep(0.01)
+    finally:
+        sampler.stop()
+        feed.close()
+        server.close()
+        thread.join(5)
+
+    # The keyframe arrived again after reconnecting, so the sampler survived the corrupt delta
+    assert len(snapshots) == 2 and len(snapshots[1]) == 50
+    assert "malformed frame" in capsys.readouterr().err
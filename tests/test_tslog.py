@@ -0,0 +1,33 @@
+import numpy as np
+
+from monitor.records import ProcessRecord
+from monitor.snapshot_store import NameTable, ProcessSnapshot
+from monitor.tslog import LogReader, LogWriter
+
+
+def _snapshot(names, timestamp, pids):
+    records = [ProcessRecord(pid, 1000.0 + pid, f"proc-{pid}", 1.0, 10.0) for pid in pids]
+    return ProcessSnapshot.from_records(records, names, timestamp, cpu_percent=20.0, memory_percent=30.0)
+
+
+def test_frames_after_an_empty_snapshot_are_read(tmp_path):
+    names = NameTable()
+    writer = LogWriter(str(tmp_path), segment_size=1024 * 1024)
+    for timestamp, pids in ((1.0, [1, 2]), (2.0, []), (3.0, [1, 3])):
+        writer.append(_snapshot(names, timestamp, pids))
+    writer.close()
+
+    reader = LogReader(str(tmp_path))
+    frames = list(reader.frames())
+    assert [frame.timestamp for frame in frames] == [1.0, 2.0, 3.0]
+    assert [frame.pid.tolist() for frame in frames] == [[1, 2], [], [1, 3]]
+    last = reader.snapshot(frames[-1])
+    assert [last.name(i) for i in range(len(last))] == ["proc-1", "proc-3"]
+    np.testing.assert_array_equal(last.create_time, [1001.0, 1003.0])
+
+    # A writer reopening the log resumes after the last frame, not after the empty one
+    writer = LogWriter(str(tmp_path), segment_size=1024 * 1024)
+    writer.append(_snapshot(names, 4.0, [4]))
+    writer.close()
+    reader.refresh()
+    assert [frame.timestamp for frame in reader.frames()] == [1.0, 2.0, 3.0, 4.0]